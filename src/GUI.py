@@ -1,26 +1,20 @@
 import os
-from dotenv import load_dotenv  # pip install python-dotenv
+import json
 import datetime
 import streamlit as st
 import pandas as pd
-import time
-import matplotlib.pyplot as plt
-from PIL import Image, ImageDraw
 import io
-import smtplib  # Para enviar emails
-from email.mime.text import MIMEText  # Para crear el mensaje de email
+import functools
 import streamlit.components.v1 as components  # Para mostrar alertas en HTML
 from streamlit.runtime.scriptrunner import RerunException, RerunData
-
-# ----------------------------------------------------------------------
-# CARGA DE VARIABLES DE ENTORNO
-# ----------------------------------------------------------------------
-# Crea un fichero .env (añádelo a .gitignore) con:
-# EMAIL_USER=tu_usuario@gmail.com
-# EMAIL_PASS=tu_token_o_contraseña
-load_dotenv()
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
+from tiempo import a_ms, serie_a_datetime
+from intervalos import VALID_POSITIONS_BY_ROOM, intervalos_exportacion
+from archivo import ArchivoDiario
+from datos_gui import DatosGUI
+from productor_gui import ProductorFotogramas, Fotograma
+from mapa import RenderizadorMapa
+from lector_csv import LectorIncremental
+from motor_alertas import ALERTAS_CSV, leer_configuracion, guardar_configuracion
 
 # ----------------------------------------------------------------------
 # CONFIGURACIÓN
@@ -30,11 +24,14 @@ st.set_page_config(layout='centered')
 CSV_PATH = "src/logs/predicciones_xgboost.csv"
 MAPA_PATH = "src/fotos/ParteDeAbajo.png"
 ACTIONS_PATH = "src/logs/acciones_detectadas.csv"
+# Archivo por días (archivo.py); si existe, las exportaciones por rango sólo leen los días pedidos
+ARCHIVO_PREDICCIONES = "src/logs/archivo/predicciones"
+ARCHIVO_ACCIONES = "src/logs/archivo/acciones"
+# Intervalos que mantiene el detector de acciones (vista_intervalos.py); desde su primera
+# entrada se exportan de ahí y lo anterior se calcula de las predicciones
+VISTA_INTERVALOS = "src/logs/archivo/intervalos"
 
 TIEMPO_VISIBLE_TRANSICIONES = 10  # segundos que se ven las líneas de transición
-transiciones = []
-ultima_habitacion = None
-ultima_posicion = None
 
 # ESP_POSICIONES = {
 #     "ESP32_1": (100, 360),
@@ -87,252 +84,45 @@ POSICIONES = {
     "Baño_Lavabo":           (1330, 45),
     "Baño_WC":               (1100, 230),
 }
-VALID_POSITIONS_BY_ROOM = {
-    "Dormitorio":   ["Cama", "Escritorio"],
-    "Cocina":       ["Vitroceramica", "Frigorifico", "Fregadero"],
-    "Salon":        ["Mesa", "Sofa"],
-    "Baño":         ["WC", "Lavabo"],
-    "Pasillo":      ["Pasillo"]
-}
 
 # ----------------------------------------------------------------------
 # INICIALIZAR session_state
 # ----------------------------------------------------------------------
-if 'last_alarm_shown' not in st.session_state:
-    st.session_state['last_alarm_shown'] = {}
-if "alert_email" not in st.session_state:
-    st.session_state["alert_email"] = ""
-if "alarmas_configuradas" not in st.session_state:
-    st.session_state["alarmas_configuradas"] = False
+if "lector_alertas" not in st.session_state:
+    # Cada sesión muestra sólo las alertas que el motor escriba a partir de ahora
+    st.session_state["lector_alertas"] = LectorIncremental(ALERTAS_CSV)
+    st.session_state["lector_alertas"].ir_al_final(0)
 
 # ----------------------------------------------------------------------
 # FUNCIONES AUXILIARES
 # ----------------------------------------------------------------------
-def format_timedelta(td):
-    total = int(td.total_seconds())
-    h = total // 3600
-    m = (total % 3600) // 60
-    s = total % 60
-    return f"{h:02d}:{m:02d}:{s:02d}"
-
-def obtener_ultimas_filas_csv(n=5):
-    try:
-        df = pd.read_csv(CSV_PATH)
-        return df.tail(n) if not df.empty else pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error al leer el CSV: {e}")
-        return pd.DataFrame()
-
-def obtener_3_filas_validas():
-    try:
-        df = pd.read_csv(CSV_PATH)
-        df = df[(df["habitacion_predicha"]!="Duda") & (df["posicion_predicha"]!="Duda")]
-        df = df[df.apply(
-            lambda r: r["posicion_predicha"] in VALID_POSITIONS_BY_ROOM.get(r["habitacion_predicha"], []),
-            axis=1
-        )]
-        ult2 = df.tail(2)
-        return ult2 if len(ult2)==2 else None
-    except Exception as e:
-        st.error(f"Error al leer el CSV: {e}")
-        return None
-
-def dibujar_esps(draw, fila):
-    for esp,(x,y) in ESP_POSICIONES.items():
-        if esp in fila:
-            rssi = fila[esp]
-            color = "green" if rssi>=-75 else "yellow" if rssi>=-95 else "red"
-            draw.ellipse((x-6,y-6,x+6,y+6), fill=color)
-
-def dibujar_transiciones(img):
-    overlay = Image.new("RGBA", img.size, (255,255,255,0))
-    od = ImageDraw.Draw(overlay)
-    now = time.time()
-    for x1,y1,x2,y2,t in list(transiciones):
-        e = now - t
-        if e>TIEMPO_VISIBLE_TRANSICIONES:
-            transiciones.remove((x1,y1,x2,y2,t))
-            continue
-        alpha = 255 if e< TIEMPO_VISIBLE_TRANSICIONES/2 else int(255*(1-(e-TIEMPO_VISIBLE_TRANSICIONES/2)/(TIEMPO_VISIBLE_TRANSICIONES/2)))
-        od.line([(x1,y1),(x2,y2)], fill=(255,0,0,alpha), width=3)
-    return Image.alpha_composite(img, overlay)
-
-def dibujar_grafico_rssi(fila):
-    if fila.empty: return None
-    vals = {esp:100+max(v,-100) for esp,v in fila.items() if esp.startswith("ESP32_")}
-    fig,ax = plt.subplots(figsize=(8,2.5))
-    ax.bar(vals.keys(), vals.values())
-    ax.set_ylim(0,100); ax.set_ylabel("RSSI (dBm)"); ax.set_title("Señal ESP32")
-    ax.set_xticks(range(len(vals))); ax.set_xticklabels(vals.keys(), rotation=45)
-    ax.grid(axis="y", linestyle="--", alpha=0.7)
-    return fig
-
-def posicion_estable():
-    v = obtener_3_filas_validas()
-    if v is None: return None
-    h = v["habitacion_predicha"].unique()
-    p = v["posicion_predicha"].unique()
-    return (h[0],p[0]) if len(h)==1 and len(p)==1 else None
-
-def dibujar_mapa(fila):
-    global ultima_habitacion, ultima_posicion, transiciones
-    img = Image.open(MAPA_PATH).convert("RGBA")
-    d = ImageDraw.Draw(img)
-    dibujar_esps(d, fila)
-    nueva = posicion_estable()
-    old_hab,old_pos = ultima_habitacion,ultima_posicion
-    if nueva:
-        ultima_habitacion,ultima_posicion = nueva
-    if ultima_habitacion and ultima_posicion:
-        coords = POSICIONES.get(f"{ultima_habitacion}_{ultima_posicion}",(0,0))
-    else:
-        coords = (0,0)
-    if coords!=(0,0) and old_hab and old_pos:
-        o = POSICIONES.get(f"{old_hab}_{old_pos}",(0,0))
-        if o!=(0,0) and o!=coords:
-            transiciones.append((*o,coords[0],coords[1],time.time()))
-    if coords!=(0,0):
-        x,y = coords; r=14
-        d.ellipse([x-r,y-r,x+r,y+r], fill="blue")
-    return dibujar_transiciones(img)
-
-# ----------------------------------------------------------------------
-# GENERACIÓN DE INTERVALOS (igual que antes)
-# ----------------------------------------------------------------------
-def generar_intervalos_separados(CSV_PATH, dt_inicio, dt_fin, min_filas=3):
-    df = pd.read_csv(CSV_PATH)
-    df["time"] = pd.to_datetime(df["time"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
-    df.dropna(subset=["time"], inplace=True)
-    df = df[(df["habitacion_predicha"]!="Duda") & (df["posicion_predicha"]!="Duda")]
-    df = df[df.apply(lambda r: r["posicion_predicha"] in VALID_POSITIONS_BY_ROOM.get(r["habitacion_predicha"], []), axis=1)]
-    df.sort_values("time", inplace=True); df.reset_index(drop=True, inplace=True)
-
-    intervalos = []
-    clave,inicio,count = None,None,0
-    for _,row in df.iterrows():
-        hab,pos,t = row["habitacion_predicha"],row["posicion_predicha"],row["time"]
-        key = (hab,pos)
-        if clave is None:
-            clave,inicio,count = key,t,1
-        elif key==clave:
-            count+=1
-        else:
-            if count>=min_filas:
-                intervalos.append({"Habitacion":clave[0],"Posicion":clave[1],
-                                   "Fecha_Entrada_dt":inicio,"Fecha_Salida_dt":t})
-            clave,inicio,count = key,t,1
-    if clave and count>=min_filas:
-        tfin = df["time"].iloc[-1]
-        intervalos.append({"Habitacion":clave[0],"Posicion":clave[1],
-                           "Fecha_Entrada_dt":inicio,"Fecha_Salida_dt":tfin})
-
-    df_pos = pd.DataFrame(intervalos)
-    if df_pos.empty: return pd.DataFrame(),pd.DataFrame()
-    mask = (df_pos["Fecha_Salida_dt"]>=dt_inicio)&(df_pos["Fecha_Entrada_dt"]<=dt_fin)
-    df_pos = df_pos[mask].copy()
-    df_pos["Fecha_Entrada_dt"]=df_pos["Fecha_Entrada_dt"].clip(lower=dt_inicio,upper=dt_fin)
-    df_pos["Fecha_Salida_dt"]=df_pos["Fecha_Salida_dt"].clip(lower=dt_inicio,upper=dt_fin)
-    df_pos["Tiempo_en_la_posicion_td"]=df_pos["Fecha_Salida_dt"]-df_pos["Fecha_Entrada_dt"]
-    df_pos.reset_index(drop=True,inplace=True)
-
-    # Agrupar por habitación...
-    chunks=[]; start=0; hab=df_pos.loc[0,"Habitacion"]; ts=df_pos.loc[0,"Fecha_Entrada_dt"]
-    for i in range(1,len(df_pos)):
-        if df_pos.loc[i,"Habitacion"]!=hab:
-            te=df_pos.loc[i-1,"Fecha_Salida_dt"]
-            chunks.append((start,i-1,hab,ts,te))
-            start,hab,ts = i,df_pos.loc[i,"Habitacion"],df_pos.loc[i,"Fecha_Entrada_dt"]
-    te=df_pos.loc[len(df_pos)-1,"Fecha_Salida_dt"]
-    chunks.append((start,len(df_pos)-1,hab,ts,te))
-
-    lista_hab=[]
-    for a,b,h,stt,ett in chunks:
-        lista_hab.append({"Habitacion":h,
-                          "Fecha_Entrada_dt":stt,
-                          "Fecha_Salida_dt":ett,
-                          "Tiempo_en_la_habitacion_td":ett-stt})
-    df_hab = pd.DataFrame(lista_hab)
-    if df_hab.empty: return df_pos, pd.DataFrame()
-
-    # Formateo de salida
-    df_pos["Fecha_Entrada"]=df_pos["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
-    df_pos["Fecha_Salida"]=df_pos["Fecha_Salida_dt"].dt.strftime("%d/%m/%Y %H:%M:%S")
-    df_pos["Tiempo_en_la_posicion"]=df_pos["Tiempo_en_la_posicion_td"].apply(format_timedelta)
-    df_pos = df_pos[["Habitacion","Posicion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_posicion"]]
-
-    df_hab["Fecha_Entrada"]=df_hab["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
-    df_hab["Fecha_Salida"]=df_hab["Fecha_Salida_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
-    df_hab["Tiempo_en_la_habitacion"]=df_hab["Tiempo_en_la_habitacion_td"].apply(format_timedelta)
-    df_hab = df_hab[["Habitacion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_habitacion"]]
+@st.cache_resource
+def obtener_productor():
+    """Lector y dibujante únicos del proceso; todas las sesiones reciben sus fotogramas."""
+    mapa = RenderizadorMapa(MAPA_PATH, ESP_POSICIONES, POSICIONES, TIEMPO_VISIBLE_TRANSICIONES)
+    return ProductorFotogramas(DatosGUI(CSV_PATH, VALID_POSITIONS_BY_ROOM), functools.partial(renderizar, mapa))
 
-    return df_pos, df_hab
+def renderizar(mapa, fila, posicion):
+    """PNG del mapa; lo llama el productor una vez por tick para todas las sesiones."""
+    return mapa.renderizar(fila, posicion)
 
 # ----------------------------------------------------------------------
-# ENVÍO DE EMAIL
+# ALERTAS
 # ----------------------------------------------------------------------
-def enviar_email(mensaje, destino):
-    if not destino: return
-    msg = MIMEText(f"Alerta generada:\n\n{mensaje}")
-    msg['Subject'] = f"[IndoorPositioning] Alerta: {mensaje}"
-    msg['From'] = EMAIL_USER
-    msg['To'] = destino
-    try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.ehlo()
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        st.error(f"Error al enviar email: {e}")
+# Las reglas las evalúa motor_alertas.py, aunque no haya ningún navegador
+# abierto; aquí sólo se editan sus parámetros y se avisa de las nuevas.
+def mostrar_alertas(lector):
+    for alerta in lector.leer():
+        # Como literal JSON (escapando '<' para que no cierre el <script>): el mensaje viene de alertas.json
+        texto = json.dumps(f"Alerta: {alerta['mensaje']}").replace("<", "\\u003c")
+        components.html(f"<script>alert({texto});</script>")
 
-# ----------------------------------------------------------------------
-# LÓGICA DE ALARMAS
-# ----------------------------------------------------------------------
-def lanzar_alarma(mensaje):
-    key = f"alert_sent_{mensaje}"
-    if st.session_state['last_alarm_shown'].get(key, False):
-        return
-    components.html(f"<script>alert('Alerta: {mensaje}');</script>")
-    enviar_email(mensaje, st.session_state.get("alert_email"))
-    st.session_state['last_alarm_shown'][key] = True
-
-def comprobar_alarmas():
-    if not st.session_state["alarmas_configuradas"]:
-        return
-    pe = posicion_estable()
-    if not pe: return
-    hab,_ = pe
-    ahora = datetime.datetime.now().time()
-    hs = st.session_state.get("hora_limite_salida_dormitorio", datetime.time(9,0))
-    he = st.session_state.get("hora_limite_entrada_dormitorio", datetime.time(23,0))
-    tb = st.session_state.get("tiempo_limite_bano", 15)
-    if ahora>hs and hab=="Dormitorio":
-        lanzar_alarma("¡No se ha levantado, va a llegar tarde!")
-    if ahora>he and hab!="Dormitorio":
-        lanzar_alarma("¡Aún no se ha acostado!")
-    if hab=="Baño":
-        if st.session_state["tiempo_entrada_bano"] is None:
-            st.session_state["tiempo_entrada_bano"] = datetime.datetime.now()
-        else:
-            m = (datetime.datetime.now() - st.session_state["tiempo_entrada_bano"]).total_seconds()/60
-            if m>tb:
-                lanzar_alarma("¡Lleva demasiado tiempo en el baño!")
-    else:
-        st.session_state["tiempo_entrada_bano"] = None
+def regla(configuracion, nombre):
+    return next(r for r in configuracion["reglas"] if r["nombre"] == nombre)
 
 # ----------------------------------------------------------------------
 # STREAMLIT APP
 # ----------------------------------------------------------------------
-if "hora_limite_salida_dormitorio" not in st.session_state:
-    st.session_state["hora_limite_salida_dormitorio"] = datetime.time(9,0)
-if "hora_limite_entrada_dormitorio" not in st.session_state:
-    st.session_state["hora_limite_entrada_dormitorio"] = datetime.time(23,0)
-if "tiempo_limite_bano" not in st.session_state:
-    st.session_state["tiempo_limite_bano"] = 15
-if "tiempo_entrada_bano" not in st.session_state:
-    st.session_state["tiempo_entrada_bano"] = None
-
 st.title("Posicionamiento Indoor")
 st.write("Visualización en tiempo real con tiempos de posición y habitación.")
 
@@ -342,17 +132,22 @@ if st.button("ALARMAS"):
 if st.session_state.get("mostrar_alarmas", False):
     st.subheader("Configuración de ALARMAS")
     st.write("Establece horas límite, tiempo en baño y email para alertas:")
+    configuracion = leer_configuracion()
+    levantarse = regla(configuracion, "no_levantado")
+    acostarse = regla(configuracion, "no_acostado")
+    bano = regla(configuracion, "bano_largo")
     with st.form("form_alarmas"):
-        hs = st.time_input("Hora límite SALIR dormitorio", value=st.session_state["hora_limite_salida_dormitorio"])
-        he = st.time_input("Hora límite ENTRAR dormitorio", value=st.session_state["hora_limite_entrada_dormitorio"])
-        tb = st.number_input("Tiempo máximo en baño (min)", min_value=1, max_value=180, value=st.session_state["tiempo_limite_bano"])
-        email = st.text_input("Email para recibir alertas", value=st.session_state["alert_email"])
+        hs = st.time_input("Hora límite SALIR dormitorio", value=datetime.time.fromisoformat(levantarse["desde"]))
+        he = st.time_input("Hora límite ENTRAR dormitorio", value=datetime.time.fromisoformat(acostarse["desde"]))
+        tb = st.number_input("Tiempo máximo en baño (min)", min_value=1, max_value=180, value=int(bano["max_minutos"]))
+        email = st.text_input("Email para recibir alertas", value=configuracion.get("email", ""))
         if st.form_submit_button("Guardar alarmas"):
-            st.session_state["hora_limite_salida_dormitorio"] = hs
-            st.session_state["hora_limite_entrada_dormitorio"] = he
-            st.session_state["tiempo_limite_bano"] = tb
-            st.session_state["alert_email"] = email
-            st.session_state["alarmas_configuradas"] = True
+            # El motor de alertas recarga el fichero al detectar el cambio
+            levantarse["desde"] = hs.strftime("%H:%M")
+            acostarse["desde"] = he.strftime("%H:%M")
+            bano["max_minutos"] = tb
+            configuracion["email"] = email
+            guardar_configuracion(configuracion)
             st.success("¡Alarmas guardadas!")
 
 col_left, col_right = st.columns([3,1])
@@ -366,7 +161,8 @@ with col_right:
     dt_f = datetime.datetime.combine(ff,hf)
     if st.button("Guardar archivo"):
         try:
-            df_pos, df_hab = generar_intervalos_separados(CSV_PATH, dt_i, dt_f)
+            origen = ARCHIVO_PREDICCIONES if os.path.isdir(ARCHIVO_PREDICCIONES) else CSV_PATH
+            df_pos, df_hab = intervalos_exportacion(VISTA_INTERVALOS, origen, dt_i, dt_f)
             if df_pos.empty and df_hab.empty:
                 st.warning("No hay intervalos válidos en ese rango.")
             else:
@@ -385,24 +181,20 @@ with col_right:
                                    file_name="intervalos_habitaciones.xlsx",
                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
-                df_acc = pd.read_csv(
-                    ACTIONS_PATH,
-                    parse_dates=[['Fecha','Hora']],
-                    dayfirst=True,              # porque tu formato es DD/MM/YYYY
-                    encoding='utf-8'
-                )
-                # renombramos la columna Fecha_Hora a time para homogeneidad
-                df_acc.rename(columns={'Fecha_Hora':'time'}, inplace=True)
-
-                # 3.2) Filtramos en base al intervalo dt_i–dt_f
-                df_acc = df_acc[(df_acc['time'] >= dt_i) & (df_acc['time'] <= dt_f)]
+                # 3.2) Acciones del intervalo dt_i–dt_f (time en ms epoch, fin inclusive)
+                if os.path.isdir(ARCHIVO_ACCIONES):
+                    df_acc = ArchivoDiario(ARCHIVO_ACCIONES).leer_rango(a_ms(dt_i), a_ms(dt_f) + 1000)
+                else:
+                    df_acc = pd.read_csv(ACTIONS_PATH, encoding='utf-8')
+                    df_acc = df_acc[(df_acc['time'] >= a_ms(dt_i)) & (df_acc['time'] < a_ms(dt_f) + 1000)]
 
                 if df_acc.empty:
                     st.warning("No hay acciones en ese rango.")
                 else:
-                    # extrae fecha y hora de la columna datetime
-                    df_acc['Fecha'] = df_acc['time'].dt.strftime('%d/%m/%Y')
-                    df_acc['Hora']   = df_acc['time'].dt.strftime('%H:%M:%S')
+                    # fecha y hora legibles sólo al exportar
+                    fechas = serie_a_datetime(df_acc['time'])
+                    df_acc['Fecha'] = fechas.dt.strftime('%d/%m/%Y')
+                    df_acc['Hora']   = fechas.dt.strftime('%H:%M:%S')
 
                     # ahora incluimos Fecha y Hora junto a la Descripción
                     df_desc = df_acc[['Descripción', 'Fecha', 'Hora']]
@@ -425,15 +217,21 @@ mapa_ph = col_left.empty()
 graf_ph = col_left.empty()
 tab_ph  = col_left.empty()
 
+# La sesión sólo envía lo que el productor compartido ya ha leído y dibujado
+productor = obtener_productor()
+enviado = Fotograma(-1, None, None, None, None)
 while True:
-    data = obtener_ultimas_filas_csv(5)
-    if not data.empty:
-        last = data.iloc[-1]
-        mapa_ph.image(dibujar_mapa(last), use_container_width=True)
-        fig = dibujar_grafico_rssi(last)
-        if fig: graf_ph.pyplot(fig)
-        tab_ph.dataframe(data)
-    else:
-        tab_ph.dataframe(data)
-    comprobar_alarmas()
-    time.sleep(1)
+    fotograma = productor.esperar(enviado.version, timeout=2)
+    if fotograma.version != enviado.version:
+        if fotograma.error:
+            st.error(f"Error al leer el CSV: {fotograma.error}")
+        # Sólo se envía al navegador lo que ha cambiado desde el último fotograma de esta sesión
+        if fotograma.mapa and fotograma.mapa is not enviado.mapa:
+            mapa_ph.image(fotograma.mapa, use_container_width=True)
+        if not fotograma.rssi.empty and fotograma.rssi is not enviado.rssi:
+            # Gráfico nativo de Streamlit: se sustituyen los datos del mismo elemento
+            graf_ph.line_chart(fotograma.rssi)
+        if fotograma.tabla is not enviado.tabla:
+            tab_ph.dataframe(fotograma.tabla)
+        enviado = fotograma
+    mostrar_alertas(st.session_state["lector_alertas"])
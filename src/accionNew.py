@@ -1,16 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
-import csv
-import pandas as pd
 import time
-from datetime import datetime, timedelta
-from collections import deque, Counter
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from lector_csv import LectorIncremental
+from bus_predicciones import SuscriptorPredicciones
+from registro_acciones import RegistroAcciones
+from archivo import EscritorArchivo, ESQUEMA_ACCIONES, importar_anteriores
+from vista_intervalos import VistaIntervalos
+from tiempo import a_ms, tiempos_validos
 
 # Rutas de archivos
 INPUT_CSV = 'src/logs/predicciones_xgboost.csv'
 ACTION_LOG = 'src/logs/acciones_detectadas.csv'
+# Archivo Parquet por días con la historia de acciones (None para no guardarlo)
+ACTION_ARCHIVE = 'src/logs/archivo/acciones'
+# Vista de intervalos de posición y habitación que exporta el GUI (None para no mantenerla)
+INTERVAL_VIEW = 'src/logs/archivo/intervalos'
+
+# Política de volcado del log de acciones
+ACTION_LOG_MAX_ROWS = 50      # filas acumuladas antes de escribir
+ACTION_LOG_MAX_SECONDS = 1.0  # segundos máximos que una acción espera en memoria
+ACTION_LOG_FSYNC = False
+
+# Origen de las predicciones: 'bus' (en vivo, desde prediccion.py) o 'csv' (tail de INPUT_CSV)
+FUENTE_PREDICCIONES = 'bus'
 
 # Parámetros de estabilidad y actividad retrasada
 WINDOW_SIZE = 5
@@ -23,31 +41,59 @@ DELAYED_ACTIVITIES = {
     'Mesa de juegos': ('jugando a juegos de mesa', 'Está jugando a juegos de mesa', 'Deja de jugar a juegos de mesa')
 }
 
-# Historial para ventanas deslizantes y control de timestamps
-action_history = {
-    'room_window': deque(maxlen=WINDOW_SIZE),
-    'room_window_timestamps': deque(maxlen=WINDOW_SIZE),
-    'position_window': deque(maxlen=WINDOW_SIZE),
-    'position_window_timestamps': deque(maxlen=WINDOW_SIZE),
-    'last_room': None,
-    'last_position': None,
-    'start_time': None,
-    'current_activity': None,
-    'current_activity_start_time': None,
-    'just_ended_activity': False
-}
 
-# Para asegurar timestamps crecientes en el log
-last_action_time_logged = None
+class Interner:
+    """
+    Traduce etiquetas (habitaciones o posiciones) a enteros pequeños
+    compartidos por todos los detectores. El 0 se reserva para la etiqueta
+    vacía, de modo que sigue evaluándose como falsa.
+    """
+
+    __slots__ = ('ids', 'labels')
+
+    def __init__(self):
+        self.ids = {'': 0}
+        self.labels = ['']
+
+    def id(self, label):
+        i = self.ids.get(label)
+        if i is None:
+            i = self.ids[label] = len(self.labels)
+            self.labels.append(label)
+        return i
+
+
+ROOMS = Interner()
+POSITIONS = Interner()
+BED = POSITIONS.id('Cama')
+DELAYED_BY_POSITION = {POSITIONS.id(pos): activity for pos, activity in DELAYED_ACTIVITIES.items()}
+END_MESSAGE_BY_ACTIVITY = {}
+for _name, _start_msg, _end_msg in DELAYED_ACTIVITIES.values():
+    END_MESSAGE_BY_ACTIVITY.setdefault(_name, _end_msg)
+
+# Escritor del log de acciones (fichero abierto y volcado por lotes)
+action_log = None
+# Intervalos cerrados y abiertos de cada pulsera (vista_intervalos.py)
+interval_view = None
+
+# Un detector por pulsera (dirección BLE); None para CSV sin columna address
+detectors = {}
 
 
 def initialize_log():
     """Inicializa el CSV de acciones borrando el anterior y escribiendo cabecera."""
-    if os.path.exists(ACTION_LOG):
-        os.remove(ACTION_LOG)
-    with open(ACTION_LOG, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Fecha', 'Hora', 'Tipo', 'Descripción'])
+    global action_log, interval_view
+    interval_view = VistaIntervalos(INTERVAL_VIEW) if INTERVAL_VIEW else None
+    if ACTION_ARCHIVE:
+        # Antes de borrar el log: la primera vez, sus acciones pasan al archivo
+        importar_anteriores(ACTION_LOG, ACTION_ARCHIVE, ESQUEMA_ACCIONES)
+    action_log = RegistroAcciones(
+        ACTION_LOG,
+        max_filas=ACTION_LOG_MAX_ROWS,
+        max_segundos=ACTION_LOG_MAX_SECONDS,
+        fsync=ACTION_LOG_FSYNC,
+        archivo=EscritorArchivo(ACTION_ARCHIVE, ESQUEMA_ACCIONES) if ACTION_ARCHIVE else None
+    )
 
 
 def room_enter_message(room: str) -> str:
@@ -72,210 +118,520 @@ def room_exit_message(room: str) -> str:
     }.get(r, f'Sale de {room}')
 
 
-def get_stable_value(window, window_ts):
-    if len(window) < WINDOW_SIZE:
-        return None, None
-    val, _ = Counter(window).most_common(1)[0]
-    # devolvemos la primera aparición de ese valor en la ventana
-    for v, t in zip(window, window_ts):
-        if v == val:
-            return val, t
-    return None, None
-
-
-def confirm_stability(value, window, min_consec, window_ts):
-    if value is None:
-        return None, None
-    tail = list(window)[-min_consec:]
-    tail_ts = list(window_ts)[-min_consec:]
-    if len(tail) == min_consec and all(v == value for v in tail):
-        return value, tail_ts[0]
-    return None, None
-
-
-def log_action(descripcion: str, ts: datetime, action_type: str):
+class StabilityTracker:
     """
-    Escribe una fila en ACTION_LOG con columnas:
-       Fecha (DD/MM/YYYY), Hora (HH:MM:SS), Tipo, Descripción
-    Asegura que cada entrada tenga un timestamp mayor al anterior.
+    Ventana deslizante de ids (habitaciones o posiciones) con la moda y la
+    racha final mantenidas de forma incremental: cada push cuesta O(1) y no
+    reserva memoria salvo al aparecer un id nuevo.
+
+    stable() decide igual que la comprobación original: ventana llena, el
+    último valor es la moda (a igual número de apariciones gana el que
+    aparece antes en la ventana, como Counter.most_common) y se repite en
+    las últimas `min_consec` filas. Un empate con el último valor sólo es
+    posible si 2 * min_consec <= size; en ese caso se guarda además la
+    primera aparición de cada id en la ventana (cada posición del buffer
+    apunta a la siguiente del mismo id) y una lista enlazada de los ids con
+    cada número de apariciones, así que sólo se comparan los ids empatados
+    en la moda, nunca la ventana entera.
     """
-    global last_action_time_logged
-
-    # Si el timestamp no avanza, empujamos 1 segundo adelante
-    if last_action_time_logged and ts <= last_action_time_logged:
-        ts = last_action_time_logged + timedelta(seconds=1)
-    last_action_time_logged = ts
-
-    fecha = ts.strftime('%d/%m/%Y')
-    hora = ts.strftime('%H:%M:%S')
-    with open(ACTION_LOG, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([fecha, hora, action_type, descripcion])
 
-
-def handle_transition(old_room, old_position, new_room, new_position, ts):
+    __slots__ = ('size', 'min_consec', 'values', 'timestamps', 'head', 'filled',
+                 'counts', 'count_freq', 'max_count', 'last', 'run', 'ties')
+
+    def __init__(self, size=None, min_consec=None):
+        self.size = WINDOW_SIZE if size is None else size
+        self.min_consec = MIN_STABLE_CONSECUTIVE if min_consec is None else min_consec
+        self.values = [0] * self.size       # buffer circular; head es la siguiente posición a escribir
+        self.timestamps = [None] * self.size
+        self.head = 0
+        self.filled = 0
+        self.counts = []                    # apariciones de cada id en la ventana
+        self.count_freq = [0] * (self.size + 1)  # cuántos ids tienen cada número de apariciones
+        self.max_count = 0
+        self.last = None
+        self.run = 0                        # longitud de la racha final de valores iguales
+        self.ties = _TieTracker(self.size) if 0 < 2 * self.min_consec <= self.size else None
+
+    def push(self, value, ts):
+        counts = self.counts
+        count_freq = self.count_freq
+        if value >= len(counts):
+            counts.extend([0] * (value + 1 - len(counts)))
+            if self.ties:
+                self.ties.grow(len(counts))
+
+        # Sale el valor más antiguo si la ventana está llena
+        if self.filled == self.size:
+            old = self.values[self.head]
+            c = counts[old]
+            counts[old] = c - 1
+            count_freq[c] -= 1
+            count_freq[c - 1] += 1
+            if c == self.max_count and not count_freq[c]:
+                self.max_count = c - 1
+            if self.ties:
+                self.ties.evict(old, c, self.head)
+        else:
+            self.filled += 1
+
+        c = counts[value]
+        counts[value] = c + 1
+        if c:
+            count_freq[c] -= 1
+        count_freq[c + 1] += 1
+        if c + 1 > self.max_count:
+            self.max_count = c + 1
+        if self.ties:
+            self.ties.add(value, c, self.head)
+
+        self.values[self.head] = value
+        self.timestamps[self.head] = ts
+        self.head = (self.head + 1) % self.size
+        self.run = self.run + 1 if value == self.last else 1
+        self.last = value
+
+    def stable(self):
+        """
+        Devuelve (valor, timestamp) si la ventana es estable, con el timestamp
+        de la primera de las `min_consec` filas finales; si no, (None, None).
+        """
+        k = self.min_consec
+        if self.filled < self.size or not 0 < k <= self.size or self.run < k:
+            return None, None
+        value = self.last
+        c = self.counts[value]
+        if c < self.max_count:
+            return None, None
+        if self.count_freq[c] > 1 and not self.ties.first_of(value, c):
+            return None, None
+        return value, self.timestamps[(self.head - k) % self.size]
+
+
+class _TieTracker:
     """
-    Gestiona la lógica de transiciones:
-      1) Termina la posición anterior
-      2) Sale de la habitación anterior
-      3) Entra en la nueva habitación
-      4) Inicia la nueva posición y posibles actividades retrasadas
+    Primera aparición en la ventana de cada id y listas enlazadas de ids por
+    número de apariciones, para resolver en StabilityTracker los empates en
+    la moda sin recorrer la ventana. Las posiciones son absolutas (número de
+    push), así que se comparan directamente.
     """
-    global action_history
-
-    # 1) Termina posición anterior si cambia
-    if old_position and old_position != new_position:
-        if action_history['current_activity']:
-            end_current_activity(ts)
-        if old_position == 'Cama':
-            log_action('Se levanta de la cama', ts, 'position')
+
+    __slots__ = ('size', 'pushed', 'next_same', 'first', 'last_pos', 'level_head', 'level_next', 'level_prev')
+
+    def __init__(self, size):
+        self.size = size
+        self.pushed = 0
+        self.next_same = [-1] * size        # push de la siguiente aparición del mismo id, por posición del buffer
+        self.first = []
+        self.last_pos = []
+        self.level_head = [-1] * (size + 1)
+        self.level_next = []
+        self.level_prev = []
+
+    def grow(self, n):
+        extra = n - len(self.first)
+        for lista in (self.first, self.last_pos, self.level_next, self.level_prev):
+            lista.extend([-1] * extra)
+
+    def evict(self, value, count, slot):
+        """Sale `value` (tenía `count` apariciones) de la posición `slot`, la más antigua."""
+        self._unlink(value, count)
+        if count > 1:
+            self._link(value, count - 1)
+            self.first[value] = self.next_same[slot]
+
+    def add(self, value, count, slot):
+        """Entra `value` (tenía `count` apariciones) en la posición `slot`."""
+        if count:
+            self._unlink(value, count)
+            self.next_same[self.last_pos[value] % self.size] = self.pushed
         else:
-            if not action_history['just_ended_activity']:
-                log_action(f'Termina en {old_position}', ts, 'position')
-        action_history['just_ended_activity'] = False
-
-    # 2) Salir de la habitación anterior
-    if old_room and old_room != new_room:
-        log_action(room_exit_message(old_room), ts, 'room')
-
-    # 3) Entrar en la nueva habitación
-    if new_room and old_room != new_room:
-        log_action(room_enter_message(new_room), ts, 'room')
-        action_history['last_room'] = new_room
-
-    # 4) Iniciar nueva posición
-    if new_position and old_position != new_position:
-        log_action(f'Está en {new_position}', ts, 'position')
-        action_history['last_position'] = new_position
-        # Marcamos posible inicio de actividad retrasada
-        if new_position in DELAYED_ACTIVITIES:
-            action_history['start_time'] = ts
+            self.first[value] = self.pushed
+        self._link(value, count + 1)
+        self.last_pos[value] = self.pushed
+        self.next_same[slot] = -1
+        self.pushed += 1
+
+    def first_of(self, value, count):
+        """Si `value` aparece antes que los demás ids con `count` apariciones (a lo sumo size // count)."""
+        first = self.first
+        u = self.level_head[count]
+        while u != -1:
+            if first[u] < first[value]:
+                return False
+            u = self.level_next[u]
+        return True
+
+    def _link(self, value, count):
+        h = self.level_head[count]
+        self.level_next[value] = h
+        self.level_prev[value] = -1
+        if h != -1:
+            self.level_prev[h] = value
+        self.level_head[count] = value
+
+    def _unlink(self, value, count):
+        p, n = self.level_prev[value], self.level_next[value]
+        if p != -1:
+            self.level_next[p] = n
         else:
-            action_history['start_time'] = None
-        detect_previous_actions(new_position, ts)
+            self.level_head[count] = n
+        if n != -1:
+            self.level_prev[n] = p
 
 
-def detect_previous_actions(current_position, ts):
+class ActionDetector:
     """
-    Comprueba si ha pasado el tiempo mínimo para actividades retrasadas
-    y genera los eventos de inicio/fin correspondientes.
+    Estado de detección de acciones de una persona. Las habitaciones y
+    posiciones se guardan como enteros de ROOMS y POSITIONS, así que un
+    proceso puede mantener miles de detectores (uno por pulsera).
     """
-    global action_history
-    if current_position in DELAYED_ACTIVITIES:
-        name, start_msg, end_msg = DELAYED_ACTIVITIES[current_position]
-        if action_history['start_time']:
-            elapsed = (ts - action_history['start_time']).total_seconds()
-            if elapsed >= MIN_TIME_STUDYING and not action_history['current_activity']:
-                start_ts = action_history['start_time'] + timedelta(seconds=MIN_TIME_STUDYING)
-                log_action(start_msg, start_ts, 'position')
-                action_history['current_activity'] = name
-                action_history['current_activity_start_time'] = start_ts
-    else:
-        if action_history['current_activity']:
-            end_current_activity(ts)
-        action_history['start_time'] = None
 
+    __slots__ = (
+        'address', 'log',
+        'room_stability', 'position_stability',
+        'last_room', 'last_position', 'start_time',
+        'current_activity', 'current_activity_start_time', 'just_ended_activity',
+        'intervals'
+    )
 
-def end_current_activity(ts):
-    """Finaliza la actividad retrasada en curso."""
-    global action_history
-    for pos, (name, start_msg, end_msg) in DELAYED_ACTIVITIES.items():
-        if name == action_history['current_activity']:
-            log_action(end_msg, ts, 'position')
-            break
-    action_history['current_activity'] = None
-    action_history['current_activity_start_time'] = None
-    action_history['just_ended_activity'] = True
+    def __init__(self, log, address=None, intervals=None):
+        self.address = address
+        self.log = log
+        self.intervals = intervals
+        self.room_stability = StabilityTracker()
+        self.position_stability = StabilityTracker()
+        self.last_room = None
+        self.last_position = None
+        self.start_time = None
+        self.current_activity = None
+        self.current_activity_start_time = None
+        self.just_ended_activity = False
+
+    def log_action(self, descripcion: str, ts: int, action_type: str):
+        """
+        Escribe una fila en el log de acciones con columnas:
+           time (ms epoch), Tipo, Descripción, address
+        Asegura que cada entrada de esta persona tenga un timestamp mayor al anterior.
+        """
+        self.log.escribir(descripcion, ts, action_type, self.address)
+
+    def detect_actions(self, row):
+        """
+        Procesa una fila del CSV de predicciones:
+          - Actualiza ventanas deslizantes
+          - Detecta valores estables
+          - Llama a handle_transition si hay cambio
+        """
+        predicted_room = row['habitacion_predicha']
+        predicted_position = row['posicion_predicha']
+        row_time = a_ms(row['time'])
+        if self.intervals:
+            self.intervals.visto(self.address, row_time)
+
+        # Ventana de habitación
+        if predicted_room != 'Duda':
+            self.room_stability.push(ROOMS.id(predicted_room), row_time)
+        stable_room, stable_room_ts = self.room_stability.stable()
+
+        # Ventana de posición
+        if predicted_position != 'Duda':
+            self.position_stability.push(POSITIONS.id(predicted_position), row_time)
+        stable_position, stable_position_ts = self.position_stability.stable()
+
+        # Si no hay estabilidad, salimos
+        if not stable_room or not stable_position:
+            return
+
+        # Si hay cambio estable, gestionamos transición
+        if stable_room != self.last_room or stable_position != self.last_position:
+            transition_ts = max(stable_room_ts, stable_position_ts)
+            self.handle_transition(self.last_room, self.last_position, stable_room, stable_position, transition_ts)
+
+    def handle_transition(self, old_room, old_position, new_room, new_position, ts):
+        """
+        Gestiona la lógica de transiciones (habitaciones y posiciones como ids):
+          1) Termina la posición anterior
+          2) Sale de la habitación anterior
+          3) Entra en la nueva habitación
+          4) Inicia la nueva posición y posibles actividades retrasadas
+        """
+        # 1) Termina posición anterior si cambia
+        if old_position and old_position != new_position:
+            if self.current_activity:
+                self.end_current_activity(ts)
+            if old_position == BED:
+                self.log_action('Se levanta de la cama', ts, 'position')
+            else:
+                if not self.just_ended_activity:
+                    self.log_action(f'Termina en {POSITIONS.labels[old_position]}', ts, 'position')
+            self.just_ended_activity = False
+
+        # 2) Salir de la habitación anterior
+        if old_room and old_room != new_room:
+            self.log_action(room_exit_message(ROOMS.labels[old_room]), ts, 'room')
+
+        # 3) Entrar en la nueva habitación
+        if new_room and old_room != new_room:
+            self.log_action(room_enter_message(ROOMS.labels[new_room]), ts, 'room')
+            self.last_room = new_room
+
+        # 4) Iniciar nueva posición
+        if new_position and old_position != new_position:
+            self.log_action(f'Está en {POSITIONS.labels[new_position]}', ts, 'position')
+            self.last_position = new_position
+            # Marcamos posible inicio de actividad retrasada
+            if new_position in DELAYED_BY_POSITION:
+                self.start_time = ts
+            else:
+                self.start_time = None
+            self.detect_previous_actions(new_position, ts)
+
+        # 5) Cerrar el intervalo anterior en la vista de intervalos
+        if self.intervals:
+            self.intervals.transicion(self.address, ROOMS.labels[self.last_room],
+                                      POSITIONS.labels[self.last_position], ts)
+
+    def detect_previous_actions(self, current_position, ts):
+        """
+        Comprueba si ha pasado el tiempo mínimo para actividades retrasadas
+        y genera los eventos de inicio/fin correspondientes.
+        """
+        if current_position in DELAYED_BY_POSITION:
+            name, start_msg, end_msg = DELAYED_BY_POSITION[current_position]
+            if self.start_time:
+                elapsed = (ts - self.start_time) / 1000
+                if elapsed >= MIN_TIME_STUDYING and not self.current_activity:
+                    start_ts = self.start_time + MIN_TIME_STUDYING * 1000
+                    self.log_action(start_msg, start_ts, 'position')
+                    self.current_activity = name
+                    self.current_activity_start_time = start_ts
+        else:
+            if self.current_activity:
+                self.end_current_activity(ts)
+            self.start_time = None
 
+    def end_current_activity(self, ts):
+        """Finaliza la actividad retrasada en curso."""
+        end_msg = END_MESSAGE_BY_ACTIVITY.get(self.current_activity)
+        if end_msg:
+            self.log_action(end_msg, ts, 'position')
+        self.current_activity = None
+        self.current_activity_start_time = None
+        self.just_ended_activity = True
 
-def detect_actions(row):
-    """
-    Procesa una fila del CSV de predicciones:
-      - Actualiza ventanas deslizantes
-      - Detecta valores estables
-      - Llama a handle_transition si hay cambio
-    """
-    global action_history
-    predicted_room = row['habitacion_predicha']
-    predicted_position = row['posicion_predicha']
-    row_time = datetime.strptime(row['time'], '%d/%m/%Y %H:%M:%S')
-
-    # Ventana de habitación
-    if predicted_room != 'Duda':
-        action_history['room_window'].append(predicted_room)
-        action_history['room_window_timestamps'].append(row_time)
-    room_val, room_ts = get_stable_value(
-        action_history['room_window'],
-        action_history['room_window_timestamps']
-    )
-    stable_room, stable_room_ts = confirm_stability(
-        room_val,
-        action_history['room_window'],
-        MIN_STABLE_CONSECUTIVE,
-        action_history['room_window_timestamps']
-    )
 
-    # Ventana de posición
-    if predicted_position != 'Duda':
-        action_history['position_window'].append(predicted_position)
-        action_history['position_window_timestamps'].append(row_time)
-    pos_val, pos_ts = get_stable_value(
-        action_history['position_window'],
-        action_history['position_window_timestamps']
-    )
-    stable_position, stable_position_ts = confirm_stability(
-        pos_val,
-        action_history['position_window'],
-        MIN_STABLE_CONSECUTIVE,
-        action_history['position_window_timestamps']
-    )
+def get_detector(address):
+    """Detector de la pulsera `address`, creado la primera vez que aparece."""
+    detector = detectors.get(address)
+    if detector is None:
+        detector = detectors[address] = ActionDetector(action_log, address, interval_view)
+    return detector
 
-    # Si no hay estabilidad, salimos
-    if not stable_room or not stable_position:
-        return
 
-    old_room = action_history['last_room']
-    old_position = action_history['last_position']
+def detect_actions(row):
+    """Procesa una fila de predicciones con el detector de su pulsera."""
+    get_detector(row.get('address')).detect_actions(row)
 
-    # Si hay cambio estable, gestionamos transición
-    if stable_room != old_room or stable_position != old_position:
-        transition_ts = max(stable_room_ts, stable_position_ts)
-        handle_transition(old_room, old_position, stable_room, stable_position, transition_ts)
+
+def stable_windows(values):
+    """
+    Versión vectorizada de StabilityTracker para una columna completa de
+    predicciones (habitación o posición).
+
+    Devuelve, para cada fila, el código del valor estable tras procesarla
+    (-1 si no lo hay), la fila cuyo timestamp daría StabilityTracker.stable() y las
+    etiquetas de los códigos. Reproduce el desempate de Counter.most_common:
+    a igual número de apariciones gana el que aparece antes en la ventana.
+    """
+    n = len(values)
+    W, K = WINDOW_SIZE, MIN_STABLE_CONSECUTIVE
+    sel = np.flatnonzero(values != 'Duda')  # filas que entran en la ventana
+    seq, labels = pd.factorize(values[sel])
+    labels = np.asarray(labels, dtype=object)
+    m = len(seq)
+
+    codes = np.full(n, -1, dtype=np.int64)
+    ts_rows = np.zeros(n, dtype=np.int64)
+    if m < W or not 1 <= K <= W:
+        return codes, ts_rows, labels
+
+    # Longitud de la racha de valores iguales que termina en j
+    j = np.arange(m)
+    new_run = np.ones(m, dtype=bool)
+    new_run[1:] = seq[1:] != seq[:-1]
+    run = j - np.maximum.accumulate(np.where(new_run, j, 0)) + 1
+    stable = (j >= W - 1) & (run >= K)
+    # Con K > W/2 la racha final ya es mayoría; si no, hay que comprobar la moda
+    if 2 * K <= W:
+        stable &= _is_window_mode(seq, len(labels), W)
+
+    # Estado de la ventana en cada fila: el del último valor añadido hasta ella
+    last = np.searchsorted(sel, np.arange(n), side='right') - 1
+    ok = last >= 0
+    last = np.maximum(last, 0)
+    ok &= stable[last]
+    # Un valor estable vacío no cuenta (detect_actions lo trata como falso)
+    ok &= labels[seq[last]] != ''
+    codes[ok] = seq[last[ok]]
+    ts_rows[ok] = sel[last[ok] - K + 1]
+    return codes, ts_rows, labels
+
+
+def _is_window_mode(seq, n_classes, W):
+    """Indica si seq[j] es el most_common(1) de la ventana que termina en j."""
+    m = len(seq)
+    is_mode = np.zeros(m, dtype=bool)
+    j = np.arange(W - 1, m)
+    rows = np.arange(len(j))
+
+    # Apariciones de cada clase en la ventana por diferencia de sumas acumuladas
+    cum = np.zeros((m + 1, n_classes), dtype=np.int32)
+    cum[np.arange(1, m + 1), seq] = 1
+    cum = cum.cumsum(axis=0)
+    counts = cum[j + 1] - cum[j + 1 - W]
+
+    # Primera aparición de cada clase desde el inicio de la ventana
+    starts = j - W + 1
+    first = np.empty((len(j), n_classes), dtype=np.int64)
+    for c in range(n_classes):
+        pos = np.flatnonzero(seq == c)
+        k = np.searchsorted(pos, starts)
+        first[:, c] = np.where(k < len(pos), pos[np.minimum(k, len(pos) - 1)], m)
+
+    x = seq[j]
+    cx = counts[rows, x][:, None]
+    fx = first[rows, x][:, None]
+    beaten = (counts > cx) | ((counts == cx) & (first < fx))
+    is_mode[j] = ~beaten.any(axis=1)
+    return is_mode
+
+
+def replay_predictions(input_csv, output_log):
+    """
+    Reprocesa de una vez un CSV de predicciones archivado y escribe su log de
+    acciones. Las ventanas de cada pulsera se calculan vectorizadas y sólo
+    las filas donde cambia su par estable (habitación, posición) pasan por
+    handle_transition, en el orden original de las filas, así que el log es
+    el mismo que generaría monitor_positions.
+    """
+    global action_log
+    detectors.clear()
+    action_log = RegistroAcciones(output_log, max_filas=10000, max_segundos=float('inf'))
+
+    df = pd.read_csv(input_csv, dtype=str, keep_default_na=False,
+                     usecols=lambda c: c in ('time', 'address', 'habitacion_predicha', 'posicion_predicha'))
+    times, legibles = tiempos_validos(df['time'])
+    if not legibles.all():
+        df, times = df[legibles].reset_index(drop=True), times[legibles]
+    rooms = df['habitacion_predicha'].to_numpy(dtype=object)
+    positions = df['posicion_predicha'].to_numpy(dtype=object)
+    if 'address' in df:
+        groups = df.groupby('address', sort=False).indices.items()
+    else:
+        groups = [(None, np.arange(len(df)))]
+
+    transitions = []
+    for address, idx in groups:
+        room_codes, room_ts_rows, room_labels = stable_windows(rooms[idx])
+        pos_codes, pos_ts_rows, pos_labels = stable_windows(positions[idx])
+
+        # Filas con habitación y posición estables en las que cambia el par
+        rows = np.flatnonzero((room_codes >= 0) & (pos_codes >= 0))
+        pairs = room_codes[rows] * max(len(pos_labels), 1) + pos_codes[rows]
+        changed = np.ones(len(rows), dtype=bool)
+        changed[1:] = pairs[1:] != pairs[:-1]
+
+        group_times = times[idx]
+        for r in rows[changed]:
+            transition_ts = max(group_times[room_ts_rows[r]], group_times[pos_ts_rows[r]])
+            transitions.append((idx[r], address, room_labels[room_codes[r]], pos_labels[pos_codes[r]], transition_ts))
+
+    transitions.sort(key=lambda t: t[0])
+    for _, address, room, position, transition_ts in transitions:
+        detector = get_detector(address)
+        detector.handle_transition(
+            detector.last_room, detector.last_position,
+            ROOMS.id(room), POSITIONS.id(position),
+            int(transition_ts)
+        )
+    action_log.cerrar()
 
 
 def monitor_positions():
     """
     Bucle principal que:
-      - Lee continuamente el CSV de predicciones
+      - Sigue el CSV de predicciones como un tail (sólo lee lo añadido)
       - Procesa sólo las filas nuevas
       - Gestiona errores y tiempos de espera
     """
-    last_processed = 0
+    lector = LectorIncremental(INPUT_CSV)
     while True:
         try:
-            if not os.path.isfile(INPUT_CSV) or os.stat(INPUT_CSV).st_size == 0:
-                time.sleep(1)
-                continue
-
-            df = pd.read_csv(INPUT_CSV)
-            if df.empty:
-                time.sleep(1)
-                continue
-
-            new_rows = df.iloc[last_processed:]
-            if new_rows.empty:
+            new_rows = lector.leer()
+            if not new_rows:
+                action_log.volcar_si_toca()
+                if interval_view:
+                    interval_view.volcar_si_toca()
                 time.sleep(1)
                 continue
 
-            for _, row in new_rows.iterrows():
+            for row in new_rows:
                 detect_actions(row)
-            last_processed += len(new_rows)
 
         except Exception as e:
             print("Error al leer el archivo CSV:", e)
             time.sleep(1)
 
 
+def monitor_bus():
+    """
+    Bucle principal con el bus de predicciones: procesa cada predicción en
+    cuanto se publica y se reconecta si prediccion.py aún no está en marcha
+    o se reinicia.
+    """
+    while True:
+        try:
+            suscriptor = SuscriptorPredicciones()
+        except OSError:
+            time.sleep(1)
+            continue
+        print("Conectado al bus de predicciones")
+        try:
+            while True:
+                # El timeout permite volcar el log aunque no lleguen predicciones
+                prediccion = suscriptor.recibir(timeout=ACTION_LOG_MAX_SECONDS)
+                if prediccion is None:
+                    action_log.volcar_si_toca()
+                    if interval_view:
+                        interval_view.volcar_si_toca()
+                    continue
+                try:
+                    detect_actions(prediccion.como_fila())
+                except Exception as e:
+                    print("Error al procesar una predicción:", e)
+        except (EOFError, OSError):
+            print("Bus de predicciones desconectado, reintentando...")
+        finally:
+            suscriptor.cerrar()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detección de acciones a partir de las predicciones.')
+    parser.add_argument('--replay', metavar='PREDICCIONES_CSV',
+                        help='reprocesa un CSV de predicciones archivado y termina')
+    parser.add_argument('--salida', default=ACTION_LOG, help='log de acciones a generar con --replay')
+    args = parser.parse_args()
+    if args.replay:
+        replay_predictions(args.replay, args.salida)
+        raise SystemExit
+
     initialize_log()
-    monitor_positions()
+    try:
+        if FUENTE_PREDICCIONES == 'bus':
+            monitor_bus()
+        else:
+            monitor_positions()
+    finally:
+        action_log.cerrar()
+        if interval_view:
+            interval_view.cerrar()
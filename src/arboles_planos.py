@@ -0,0 +1,268 @@
+"""
+Evaluación de los modelos XGBoost con arrays planos de NumPy.
+
+Para una sola fila, booster.inplace_predict paga en cada llamada la
+validación de la entrada, la creación del proxy de DMatrix y el reparto
+entre hilos, que con 10 receptores cuesta más que recorrer los árboles.
+Aquí cada booster se exporta una vez a arrays contiguos y se evalúa con
+unas pocas operaciones vectorizadas sobre todos los árboles a la vez:
+
+  - Cada árbol se guarda como árbol binario completo de la profundidad
+    máxima del modelo, en orden de montículo: los hijos del nodo i son
+    2i+1 y 2i+2, así que no hace falta guardar punteros a los hijos. Una
+    hoja que queda por encima de la última profundidad se convierte en un
+    nodo que siempre va a la izquierda (umbral +inf) y su valor se pone en
+    la hoja más a la izquierda de debajo.
+  - Los umbrales salen de los cortes del histograma, así que hay pocas
+    condiciones distintas (receptor, umbral) aunque haya miles de nodos.
+    Para cada fila se evalúan primero todas esas condiciones y cada nodo
+    sólo guarda el índice de la suya.
+  - Todos los árboles avanzan a la vez un nivel por paso, con índices
+    globales: nodo = 2 * nodo + (1 - inicio del árbol) + condicion[nodo].
+  - Los árboles se ordenan por clase, de modo que el margen de cada clase
+    es una suma por filas de la matriz de hojas.
+
+El margen base se calcula comparando con el margen del propio XGBoost, así
+que no depende de cómo guarde base_score cada versión. Con
+`python src/arboles_planos.py` se exportan a .npz los modelos de src/logs;
+cada uno se comprueba antes contra XGBoost y sólo se guarda si da lo mismo
+(si no, se borra el .npz viejo y prediccion.py usa el booster).
+
+Uso (desde la raíz del proyecto):
+    python src/arboles_planos.py [--logs src/logs]
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+
+import numpy as np
+import joblib
+
+# Máxima diferencia de probabilidades con XGBoost para guardar un modelo plano
+TOLERANCIA = 1e-5
+
+MAX_PROFUNDIDAD = 12  # 2^12 nodos por árbol; con más, los arrays dejan de compensar
+
+
+class ArbolesPlanos:
+
+    def __init__(self, caracteristica, umbral, por_defecto_izquierda, hojas, profundidad, arboles_por_clase,
+                 base, objetivo, columnas, clases):
+        self.caracteristica = caracteristica          # (árboles * internos,) int32
+        self.umbral = umbral                          # (árboles * internos,) float32
+        self.por_defecto_izquierda = por_defecto_izquierda  # (árboles * internos,) bool, para NaN
+        self.hojas = hojas                            # (árboles * 2^profundidad,) float32
+        self.profundidad = int(profundidad)
+        self.arboles_por_clase = int(arboles_por_clase)
+        self.base = base                              # (salidas,) float64, margen inicial
+        self.objetivo = str(objetivo)
+        self.columnas = list(columnas)
+        self.clases = np.asarray(clases)              # como XGBClassifier.classes_
+
+        self.salidas = len(base)
+        self.n_arboles = self.salidas * self.arboles_por_clase
+        internos = 2 ** self.profundidad - 1
+        arbol = np.arange(self.n_arboles, dtype=np.intp)
+        self.inicio = arbol * internos
+        self.desplazamiento = 1 - self.inicio
+        # Al salir del último nivel, nodo = árbol * internos + internos + hoja
+        self.a_hoja = arbol - internos
+
+        # Condiciones distintas (receptor, umbral, a dónde va un NaN) e índice de la de cada nodo
+        claves = np.stack([self.caracteristica, self.umbral.view(np.int32), self.por_defecto_izquierda], axis=1)
+        unicas, condicion = np.unique(claves, axis=0, return_inverse=True)
+        self.condicion = condicion.ravel().astype(np.intp)
+        self.cond_caracteristica = unicas[:, 0].astype(np.intp)
+        self.cond_umbral = unicas[:, 1].astype(np.int32).view(np.float32)
+        self.cond_nan_derecha = unicas[:, 2] == 0
+
+    @classmethod
+    def desde_modelo(cls, modelo, X_calibracion=None):
+        """Exporta un XGBClassifier entrenado, con el mismo rango de árboles que usa predict."""
+        try:
+            rondas = modelo.best_iteration + 1
+        except AttributeError:
+            rondas = None
+        return cls.desde_booster(modelo.get_booster(), rondas, modelo.classes_, X_calibracion)
+
+    @classmethod
+    def desde_booster(cls, booster, rondas=None, clases=None, X_calibracion=None):
+        modelo = json.loads(booster.save_raw('json'))['learner']
+        if modelo['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"Sólo se pueden aplanar modelos gbtree, no {modelo['gradient_booster']['name']}")
+        objetivo = modelo['objective']['name']
+        salidas = max(1, int(modelo['learner_model_param']['num_class']))
+        arboles = modelo['gradient_booster']['model']['trees']
+        clase_arbol = modelo['gradient_booster']['model']['tree_info']
+        if rondas is not None:
+            arboles, clase_arbol = arboles[:rondas * salidas], clase_arbol[:rondas * salidas]
+        columnas = booster.feature_names or [f'f{i}' for i in range(booster.num_features())]
+
+        profundidades = [_profundidad(a) for a in arboles]
+        profundidad = max(profundidades, default=0)
+        if profundidad > MAX_PROFUNDIDAD:
+            raise ValueError(f"Árboles de profundidad {profundidad}: demasiado profundos para aplanarlos")
+        orden = sorted(range(len(arboles)), key=lambda i: (clase_arbol[i], i))
+        por_clase = np.bincount(np.asarray(clase_arbol, dtype=np.int64), minlength=salidas)
+        if len(set(por_clase.tolist())) != 1:
+            raise ValueError("No todas las clases tienen el mismo número de árboles")
+
+        internos, n_hojas = 2 ** profundidad - 1, 2 ** profundidad
+        caracteristica = np.zeros((len(arboles), internos), dtype=np.int32)
+        umbral = np.full((len(arboles), internos), np.inf, dtype=np.float32)
+        por_defecto_izquierda = np.ones((len(arboles), internos), dtype=bool)
+        hojas = np.zeros((len(arboles), n_hojas), dtype=np.float32)
+        for k, i in enumerate(orden):
+            _rellenar(arboles[i], profundidad, caracteristica[k], umbral[k], por_defecto_izquierda[k], hojas[k])
+
+        planos = cls(caracteristica.ravel(), umbral.ravel(), por_defecto_izquierda.ravel(), hojas.ravel(),
+                     profundidad, por_clase[0], np.zeros(salidas), objetivo, columnas,
+                     clases if clases is not None else np.arange(max(2, salidas)))
+
+        # Margen base: lo que falta para llegar al margen de XGBoost
+        if X_calibracion is None:
+            X_calibracion = np.random.default_rng(0).uniform(-100, -40, (64, len(columnas))).astype(np.float32)
+        margen = booster.inplace_predict(X_calibracion, predict_type='margin', validate_features=False,
+                                         iteration_range=(0, rondas or 0))
+        planos.base = (margen.reshape(len(X_calibracion), salidas) - planos.margen(X_calibracion)).mean(axis=0)
+        return planos
+
+    def guardar(self, ruta):
+        np.savez(ruta, caracteristica=self.caracteristica, umbral=self.umbral,
+                 por_defecto_izquierda=self.por_defecto_izquierda, hojas=self.hojas,
+                 profundidad=self.profundidad, arboles_por_clase=self.arboles_por_clase, base=self.base,
+                 objetivo=self.objetivo, columnas=np.array(self.columnas), clases=self.clases)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as datos:
+            return cls(**{k: datos[k] for k in datos.files})
+
+    def margen(self, X):
+        """Margen (filas, salidas) de un array (filas, receptores) en el orden de self.columnas."""
+        X = np.asarray(X, dtype=np.float32)
+        filas = len(X)
+        x = X[:, self.cond_caracteristica]
+        derecha = x >= self.cond_umbral
+        if np.isnan(x).any():
+            derecha |= np.isnan(x) & self.cond_nan_derecha
+        if filas == 1:
+            # Una fila: todo en 1-D y en el sitio
+            derecha = derecha[0]
+            nodo = self.inicio.copy()
+            for _ in range(self.profundidad):
+                d = derecha.take(self.condicion.take(nodo))
+                nodo *= 2
+                nodo += self.desplazamiento
+                nodo += d
+        else:
+            derecha = derecha.ravel()
+            desplazamiento_fila = np.arange(filas, dtype=np.intp)[:, None] * len(self.cond_umbral)
+            nodo = np.tile(self.inicio, (filas, 1))
+            for _ in range(self.profundidad):
+                d = derecha.take(self.condicion.take(nodo) + desplazamiento_fila)
+                nodo *= 2
+                nodo += self.desplazamiento
+                nodo += d
+        nodo += self.a_hoja
+        valores = self.hojas.take(nodo).reshape(filas, self.salidas, self.arboles_por_clase)
+        return valores.sum(axis=2, dtype=np.float64) + self.base
+
+    def probabilidades(self, X):
+        """Matriz (filas, clases) igual que predict_proba."""
+        margen = self.margen(X)
+        if self.salidas == 1:
+            p = 1.0 / (1.0 + np.exp(-margen[:, 0]))
+            return np.column_stack((1.0 - p, p))
+        margen -= margen.max(axis=1, keepdims=True)
+        e = np.exp(margen)
+        return e / e.sum(axis=1, keepdims=True)
+
+
+def _profundidad(arbol):
+    izquierda, derecha = arbol['left_children'], arbol['right_children']
+    profundidad, pila = 0, [(0, 0)]
+    while pila:
+        nodo, d = pila.pop()
+        if izquierda[nodo] == -1:
+            profundidad = max(profundidad, d)
+        else:
+            pila.append((izquierda[nodo], d + 1))
+            pila.append((derecha[nodo], d + 1))
+    return profundidad
+
+
+def _rellenar(arbol, profundidad, caracteristica, umbral, por_defecto_izquierda, hojas):
+    """Copia un árbol del JSON de XGBoost al orden de montículo de profundidad fija."""
+    izquierda, derecha = arbol['left_children'], arbol['right_children']
+    internos = 2 ** profundidad - 1
+    pila = [(0, 0, 0)]  # (nodo de XGBoost, posición en el montículo, profundidad)
+    while pila:
+        nodo, posicion, d = pila.pop()
+        if izquierda[nodo] == -1:
+            # Hoja: baja siempre por la izquierda (umbral +inf ya puesto) hasta la última profundidad
+            for _ in range(profundidad - d):
+                posicion = 2 * posicion + 1
+            hojas[posicion - internos] = arbol['split_conditions'][nodo]  # en las hojas, su valor
+            continue
+        caracteristica[posicion] = arbol['split_indices'][nodo]
+        umbral[posicion] = arbol['split_conditions'][nodo]
+        por_defecto_izquierda[posicion] = bool(arbol['default_left'][nodo])
+        pila.append((izquierda[nodo], 2 * posicion + 1, d + 1))
+        pila.append((derecha[nodo], 2 * posicion + 2, d + 1))
+
+
+def ruta_plana(ruta_modelo):
+    return os.path.splitext(ruta_modelo)[0] + '.npz'
+
+
+def comprobar(modelo, planos, X):
+    """Máxima diferencia de probabilidades con predict_proba y si coinciden todas las clases."""
+    esperado = modelo.predict_proba(X)
+    obtenido = planos.probabilidades(X)
+    return float(np.abs(esperado - obtenido).max()), bool((esperado.argmax(1) == obtenido.argmax(1)).all())
+
+
+def exportar(logs, rutas=None, tolerancia=TOLERANCIA):
+    """
+    Aplana los `rutas` (por defecto todos los xgboost_*_model.pkl de `logs`)
+    y guarda cada uno sólo si coincide con XGBoost; si no, borra su .npz
+    anterior para que el cargador use el booster. Devuelve las rutas que
+    no se han podido exportar.
+    """
+    if rutas is None:
+        rutas = sorted(glob.glob(os.path.join(logs, 'xgboost_*_model.pkl')))
+    fallidos = []
+    for ruta in rutas:
+        modelo = joblib.load(ruta)
+        planos = ArbolesPlanos.desde_modelo(modelo)
+        rng = np.random.default_rng(1)
+        X = rng.uniform(-100, -40, (2000, len(planos.columnas))).astype(np.float32)
+        X[rng.random(X.shape) < 0.3] = -150
+        diferencia, mismas = comprobar(modelo, planos, X)
+        print(f"{ruta_plana(ruta)}: {planos.n_arboles} árboles de profundidad {planos.profundidad}, "
+              f"máx. diferencia {diferencia:.1e}, mismas clases: {'sí' if mismas else 'NO'}")
+        if diferencia <= tolerancia and mismas:
+            planos.guardar(ruta_plana(ruta))
+            continue
+        # Un .npz viejo sería más reciente que el .pkl y el cargador lo serviría
+        if os.path.exists(ruta_plana(ruta)):
+            os.remove(ruta_plana(ruta))
+        print("  No coincide con XGBoost: no se guarda y se usará el booster")
+        fallidos.append(ruta)
+    return fallidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', default='src/logs')
+    args = parser.parse_args()
+    if exportar(args.logs):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
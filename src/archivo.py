@@ -0,0 +1,334 @@
+"""
+Archivo histórico de predicciones y acciones en Parquet, particionado por día.
+
+Cada carpeta de archivo tiene una subcarpeta por día (UTC) con uno o varios
+ficheros Parquet y un índice pequeño (indice.json) con el primer y el último
+time (ms epoch) y el número de filas de cada fichero. Las consultas por
+rango sólo abren los ficheros cuyo intervalo del índice se solapa con el
+pedido, así que su coste depende del tamaño del rango y no de toda la
+historia. Las columnas de etiquetas (habitación, posición, tipo de acción)
+se guardan como diccionario y se leen como categorías.
+
+Los archivos de intervalos (vista_intervalos.py) guardan además la entrada
+mínima de cada fichero en el índice, para buscar los que se solapan con un
+rango aunque empiecen días antes.
+
+El escritor acumula filas en memoria y añade un fichero nuevo por volcado;
+los ficheros de un día se fusionan en uno (ordenado por time) cuando se
+juntan demasiados, cuando empieza el día siguiente y al cerrar. Cada
+carpeta tiene un solo escritor; los lectores (el GUI) pueden consultar
+mientras se escribe.
+
+Al abrir el archivo, prediccion.py y accionNew.py pasan a él una sola vez
+las filas de su CSV anteriores a lo ya archivado (importar_anteriores), así
+que la historia de antes de empezar a archivar sigue en las exportaciones.
+Para pasar al archivo un CSV a mano:
+    python src/archivo.py predicciones src/logs/predicciones_xgboost.csv src/logs/archivo/predicciones
+    python src/archivo.py acciones src/logs/acciones_detectadas.csv src/logs/archivo/acciones
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from tiempo import tiempos_validos
+
+MS_POR_DIA = 24 * 3600 * 1000
+INDICE = 'indice.json'
+# Columnas de tiempo del log de acciones anterior al archivo ('DD/MM/YYYY', 'HH:MM:SS')
+COLUMNAS_FECHA = ('Fecha', 'Hora')
+ETIQUETA = pa.dictionary(pa.int32(), pa.string())
+
+ESQUEMA_ACCIONES = pa.schema([
+    ('time', pa.int64()),
+    ('Tipo', ETIQUETA),
+    ('Descripción', pa.string()),
+    ('address', ETIQUETA),
+])
+
+
+# Intervalos cerrados del detector de acciones: time es la salida y entrada el inicio (ms epoch)
+ESQUEMA_INTERVALOS_POSICION = pa.schema([
+    ('time', pa.int64()),
+    ('entrada', pa.int64()),
+    ('address', ETIQUETA),
+    ('Habitacion', ETIQUETA),
+    ('Posicion', ETIQUETA),
+])
+ESQUEMA_INTERVALOS_HABITACION = pa.schema([
+    ('time', pa.int64()),
+    ('entrada', pa.int64()),
+    ('address', ETIQUETA),
+    ('Habitacion', ETIQUETA),
+])
+
+
+def esquema_predicciones(receptores):
+    """Mismas columnas que el CSV de predicciones, con el RSSI en int16."""
+    return pa.schema([(r, pa.int16()) for r in receptores] + [
+        ('time', pa.int64()),
+        ('address', ETIQUETA),
+        ('habitacion_predicha', ETIQUETA),
+        ('posicion_predicha', ETIQUETA),
+    ])
+
+
+def dia_de(ms):
+    """Nombre de la partición (día UTC) de una marca en ms."""
+    return str(np.datetime64(int(ms) // MS_POR_DIA, 'D'))
+
+
+class ArchivoDiario:
+    """Consultas sobre una carpeta de archivo; el índice se relee en cada consulta."""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+
+    def indice(self):
+        try:
+            with open(os.path.join(self.carpeta, INDICE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'siguiente': 0, 'ficheros': {}}
+
+    def dias(self):
+        """Días con datos, en orden."""
+        return sorted({nombre.split('/')[0] for nombre in self.indice()['ficheros']})
+
+    def leer_dias(self, dias, columnas=None):
+        """Todas las filas de los días pedidos, ordenadas por time."""
+        dias = set(dias)
+        return self._leer(lambda nombre, _: nombre.split('/')[0] in dias, columnas)
+
+    def leer_rango(self, desde, hasta, columnas=None):
+        """Filas con desde <= time < hasta (ms epoch), ordenadas por time."""
+        return self._leer(lambda _, info: info[0] < hasta and info[1] >= desde, columnas,
+                          [('time', '>=', desde), ('time', '<', hasta)])
+
+    def leer_solapados(self, desde, hasta, columnas=None):
+        """
+        Intervalos (archivos con columna entrada) que se solapan con
+        desde..hasta: entrada <= hasta y time (salida) >= desde. El índice
+        guarda la entrada mínima de cada fichero, así que sólo se abren los
+        días del rango y los que tienen intervalos que llegan a él.
+        """
+        return self._leer(lambda _, info: info[1] >= desde and info[3] <= hasta, columnas,
+                          [('time', '>=', desde), ('entrada', '<=', hasta)])
+
+    def _leer(self, elegir, columnas, filtros=None, intentos=3):
+        for intento in range(intentos):
+            ficheros = [nombre for nombre, info in sorted(self.indice()['ficheros'].items()) if elegir(nombre, info)]
+            try:
+                tablas = [pq.read_table(os.path.join(self.carpeta, nombre), columns=columnas, filters=filtros)
+                          for nombre in ficheros]
+                break
+            except FileNotFoundError:
+                # El escritor acaba de fusionar ficheros de un día: se vuelve a leer el índice
+                if intento == intentos - 1:
+                    raise
+        if not tablas:
+            return pd.DataFrame(columns=columnas or [])
+        df = pa.concat_tables(tablas, promote_options='permissive').to_pandas()
+        return df.sort_values('time', kind='stable', ignore_index=True)
+
+
+class EscritorArchivo:
+    """
+    Añade filas (listas en el orden de `esquema`) al archivo de `carpeta`.
+    Vuelca cuando se juntan `max_filas` o han pasado `max_segundos` desde el
+    último volcado; un día con más de `max_partes` ficheros se fusiona.
+    """
+
+    def __init__(self, carpeta, esquema, max_filas=10000, max_segundos=60.0, max_partes=32):
+        os.makedirs(carpeta, exist_ok=True)
+        self.carpeta = carpeta
+        self.esquema = esquema
+        self.max_filas = max_filas
+        self.max_segundos = max_segundos
+        self.max_partes = max_partes
+        self.lock = threading.Lock()
+        self.indice = ArchivoDiario(carpeta).indice()
+        self.pendientes = []
+        self.ultimo_volcado = time.monotonic()
+        self.dias_abiertos = set()  # días con ficheros escritos sin fusionar
+
+    def anadir(self, fila):
+        with self.lock:
+            self.pendientes.append(fila)
+            if (len(self.pendientes) >= self.max_filas
+                    or time.monotonic() - self.ultimo_volcado >= self.max_segundos):
+                self._volcar()
+
+    def volcar_si_toca(self):
+        """Vuelca lo pendiente si ha vencido el plazo; llamarlo también en los ratos sin filas."""
+        with self.lock:
+            if self.pendientes and time.monotonic() - self.ultimo_volcado >= self.max_segundos:
+                self._volcar()
+
+    def volcar(self):
+        with self.lock:
+            self._volcar()
+
+    def cerrar(self):
+        with self.lock:
+            self._volcar()
+            for dia in sorted(self.dias_abiertos):
+                self._fusionar(dia)
+            self.dias_abiertos.clear()
+
+    def escribir_tabla(self, tabla):
+        """Escribe de una vez una tabla con el esquema del archivo (importaciones)."""
+        with self.lock:
+            self._volcar()
+            self._escribir(tabla)
+
+    def _volcar(self):
+        if self.pendientes:
+            columnas = list(zip(*self.pendientes))
+            self.pendientes = []
+            self._escribir(pa.Table.from_arrays(
+                [pa.array(col, type=campo.type) for col, campo in zip(columnas, self.esquema)],
+                schema=self.esquema))
+        self.ultimo_volcado = time.monotonic()
+
+    def _escribir(self, tabla):
+        tiempos = tabla.column('time').to_numpy()
+        dias, inversa = np.unique(tiempos // MS_POR_DIA, return_inverse=True)
+        for k, d in enumerate(dias):
+            dia = dia_de(int(d) * MS_POR_DIA)
+            parte = tabla.take(np.flatnonzero(inversa == k)) if len(dias) > 1 else tabla
+            self._nuevo_fichero(dia, parte, 'parte')
+            self.dias_abiertos.add(dia)
+            if len(self._ficheros(dia)) > self.max_partes:
+                self._fusionar(dia)
+        # Los días anteriores al último escrito ya no reciben filas nuevas
+        ultimo = max(self.dias_abiertos, default=None)
+        for dia in sorted(self.dias_abiertos):
+            if dia < ultimo:
+                self._fusionar(dia)
+                self.dias_abiertos.discard(dia)
+        self._guardar_indice()
+
+    def _ficheros(self, dia):
+        return sorted(n for n in self.indice['ficheros'] if n.startswith(dia + '/'))
+
+    def _nuevo_fichero(self, dia, tabla, prefijo):
+        nombre = f"{dia}/{prefijo}-{self.indice['siguiente']:06d}.parquet"
+        self.indice['siguiente'] += 1
+        ruta = os.path.join(self.carpeta, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        pq.write_table(tabla, ruta)
+        tiempos = tabla.column('time')
+        info = [pc.min(tiempos).as_py(), pc.max(tiempos).as_py(), tabla.num_rows]
+        if 'entrada' in tabla.column_names:
+            info.append(pc.min(tabla.column('entrada')).as_py())
+        self.indice['ficheros'][nombre] = info
+
+    def _fusionar(self, dia):
+        """Sustituye los ficheros de un día por uno solo ordenado por time."""
+        viejos = self._ficheros(dia)
+        if len(viejos) < 2:
+            return
+        tabla = pa.concat_tables([pq.read_table(os.path.join(self.carpeta, n), schema=self.esquema) for n in viejos])
+        tabla = tabla.take(pc.sort_indices(tabla, [('time', 'ascending')]))
+        self._nuevo_fichero(dia, tabla.combine_chunks().unify_dictionaries(), 'dia')
+        for n in viejos:
+            del self.indice['ficheros'][n]
+        # Primero el índice nuevo y después el borrado: un lector nunca ve un fichero que falte en el índice
+        self._guardar_indice()
+        for n in viejos:
+            os.remove(os.path.join(self.carpeta, n))
+
+    def _guardar_indice(self):
+        ruta = os.path.join(self.carpeta, INDICE)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f)
+        os.replace(ruta + '.tmp', ruta)
+
+
+def importar_csv(ruta_csv, carpeta, esquema, filas_por_bloque=500_000, hasta=None):
+    """
+    Pasa un CSV de predicciones o de acciones al archivo, por bloques. Con
+    `hasta` (ms epoch) sólo las filas anteriores. Devuelve las filas pasadas.
+    Los logs de acciones antiguos no tienen time sino Fecha y Hora en hora
+    local, y se leen de ahí.
+    """
+    nombres = set(esquema.names) | set(COLUMNAS_FECHA)
+    columnas_csv = pd.read_csv(ruta_csv, nrows=0).columns
+    if 'time' not in columnas_csv and not set(COLUMNAS_FECHA) <= set(columnas_csv):
+        print(f"Aviso: {ruta_csv} no tiene columna time ni {' y '.join(COLUMNAS_FECHA)}; no se importa")
+        return 0
+    escritor = EscritorArchivo(carpeta, esquema, max_partes=10 ** 9)
+    filas = 0
+    for bloque in pd.read_csv(ruta_csv, chunksize=filas_por_bloque, dtype=str, keep_default_na=False,
+                              usecols=lambda c: c in nombres):
+        if 'time' not in bloque:
+            bloque['time'] = bloque['Fecha'] + ' ' + bloque['Hora']
+        # Las filas sin tiempo o con uno ilegible (líneas cortadas) no se archivan
+        tiempos, legibles = tiempos_validos(bloque['time'])
+        bloque, tiempos = bloque[legibles], tiempos[legibles]
+        if hasta is not None:
+            bloque, tiempos = bloque[tiempos < hasta], tiempos[tiempos < hasta]
+        if bloque.empty:
+            continue
+        columnas = {}
+        for campo in esquema:
+            if campo.name == 'time':
+                columnas['time'] = tiempos
+            elif pa.types.is_integer(campo.type):
+                columnas[campo.name] = pd.to_numeric(bloque[campo.name]).to_numpy()
+            elif campo.name in bloque:
+                columnas[campo.name] = bloque[campo.name].to_numpy(dtype=object)
+            else:
+                columnas[campo.name] = np.full(len(bloque), '', dtype=object)
+        escritor.escribir_tabla(pa.Table.from_pydict(columnas, schema=esquema))
+        filas += len(bloque)
+    escritor.cerrar()
+    return filas
+
+
+def importar_anteriores(ruta_csv, carpeta, esquema):
+    """
+    Pasa al archivo las filas del CSV anteriores a la primera archivada,
+    una sola vez por carpeta: el índice recuerda que ya se hizo. Llamarlo
+    antes de abrir el escritor de la carpeta. Si la importación falla sólo
+    avisa y devuelve 0.
+    """
+    indice = ArchivoDiario(carpeta).indice()
+    if indice.get('importado') or not os.path.isfile(ruta_csv):
+        return 0
+    primera = min((info[0] for info in indice['ficheros'].values()), default=None)
+    print(f"Pasando al archivo {carpeta} la historia de {ruta_csv}...")
+    try:
+        filas = importar_csv(ruta_csv, carpeta, esquema, hasta=primera)
+    except Exception as e:
+        # Un CSV antiguo dañado no debe impedir que arranque quien llama; se reintenta al siguiente arranque
+        print(f"Aviso: no se pudo importar {ruta_csv} al archivo: {e}")
+        return 0
+    escritor = EscritorArchivo(carpeta, esquema)
+    escritor.indice['importado'] = ruta_csv
+    escritor._guardar_indice()
+    print(f"{filas} filas importadas")
+    return filas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa un CSV de predicciones o de acciones al archivo por días.')
+    parser.add_argument('tipo', choices=['predicciones', 'acciones'])
+    parser.add_argument('csv')
+    parser.add_argument('carpeta')
+    args = parser.parse_args()
+    if args.tipo == 'acciones':
+        esquema = ESQUEMA_ACCIONES
+    else:
+        cabecera = pd.read_csv(args.csv, nrows=0).columns
+        esquema = esquema_predicciones([c for c in cabecera if c.startswith('ESP32_')])
+    importar_csv(args.csv, args.carpeta, esquema)
@@ -0,0 +1,207 @@
+"""
+Canal local publicación/suscripción para las predicciones.
+
+prediccion.py publica cada predicción en cuanto la calcula y cualquier
+número de procesos (accionNew.py, el GUI, el motor de alertas...) puede
+suscribirse y recibirla al momento, sin sondear el CSV. El transporte es
+multiprocessing.connection sobre localhost, que funciona igual en Windows y
+en Linux. El CSV de predicciones queda como persistencia opcional.
+
+Los registros viajan como JSON (nunca con pickle), así que lo peor que
+puede mandar un proceso que ocupe el puerto es una predicción falsa, no
+código. La clave de la conexión no está en el repositorio: se toma de
+BUS_CLAVE o de RUTA_CLAVE, que se genera al azar la primera vez en cada
+instalación.
+
+Cada suscriptor tiene su propia cola acotada en el publicador: uno lento
+pierde sus registros más antiguos, pero no frena ni al publicador ni a los
+demás suscriptores.
+"""
+
+import os
+import json
+import socket
+import secrets
+import threading
+from collections import deque
+from multiprocessing.connection import Listener, Client
+from typing import NamedTuple
+
+DIRECCION_BUS = ('localhost', 6000)
+RUTA_CLAVE = 'src/logs/clave_bus'
+
+
+def clave_bus(ruta=RUTA_CLAVE):
+    """Clave compartida del bus: BUS_CLAVE del entorno o la de esta instalación (se crea si falta)."""
+    if os.getenv('BUS_CLAVE'):
+        return os.getenv('BUS_CLAVE').encode()
+    try:
+        # Sólo legible por el usuario; O_EXCL: si dos procesos la crean a la vez, uno la lee
+        fd = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(ruta, 'rb') as f:
+            return f.read().strip()
+    clave = secrets.token_hex(32).encode()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(clave)
+    return clave
+
+
+class Prediccion(NamedTuple):
+    """Predicción de una fila cerrada de una pulsera; `time` en ms epoch."""
+    time: int
+    address: str
+    habitacion_predicha: str
+    posicion_predicha: str
+    rssi: dict
+
+    def como_fila(self):
+        """Diccionario con las mismas columnas que una fila del CSV de predicciones."""
+        fila = dict(self.rssi)
+        fila['time'] = self.time
+        fila['address'] = self.address
+        fila['habitacion_predicha'] = self.habitacion_predicha
+        fila['posicion_predicha'] = self.posicion_predicha
+        return fila
+
+    def a_bytes(self):
+        # Los RSSI pueden llegar como escalares de numpy
+        return json.dumps(self, default=lambda valor: valor.item()).encode()
+
+    @classmethod
+    def de_bytes(cls, datos):
+        time, address, habitacion, posicion, rssi = json.loads(datos)
+        return cls(time, address, habitacion, posicion, rssi)
+
+
+class _Suscripcion:
+    """Conexión con un suscriptor y su cola de envío."""
+
+    def __init__(self, conn, capacidad, al_cerrar):
+        self.conn = conn
+        # Sin Nagle: cada registro sale en cuanto se envía
+        try:
+            sock = socket.fromfd(conn.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.close()
+        except OSError:
+            pass
+        self.pendientes = deque(maxlen=capacidad)
+        self.cond = threading.Condition()
+        self.abierta = True
+        self.al_cerrar = al_cerrar
+        threading.Thread(target=self._enviar, name='bus-envio', daemon=True).start()
+
+    def encolar(self, registro):
+        with self.cond:
+            self.pendientes.append(registro)
+            self.cond.notify()
+
+    def cerrar(self):
+        with self.cond:
+            self.abierta = False
+            self.cond.notify()
+
+    def _enviar(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.pendientes and self.abierta:
+                        self.cond.wait()
+                    if not self.abierta:
+                        return
+                    registro = self.pendientes.popleft()
+                self.conn.send_bytes(registro)
+        except (OSError, EOFError):
+            pass
+        finally:
+            self.conn.close()
+            self.al_cerrar(self)
+
+
+class PublicadorPredicciones:
+    """Acepta suscriptores en segundo plano y les reparte cada registro publicado."""
+
+    def __init__(self, direccion=DIRECCION_BUS, authkey=None, capacidad=1000):
+        self.listener = Listener(direccion, backlog=16, authkey=authkey or clave_bus())
+        self.capacidad = capacidad
+        self.suscripciones = []
+        self.lock = threading.Lock()
+        self.cerrado = False
+        self.hilo_aceptar = threading.Thread(target=self._aceptar, name='bus-aceptar', daemon=True)
+        self.hilo_aceptar.start()
+
+    def publicar(self, registro):
+        """Reparte una Prediccion; se serializa una sola vez para todos los suscriptores."""
+        registro = registro.a_bytes()
+        with self.lock:
+            suscripciones = list(self.suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.encolar(registro)
+
+    def suscriptores(self):
+        with self.lock:
+            return len(self.suscripciones)
+
+    def cerrar(self):
+        # accept() no se despierta al cerrar el socket: se le conecta un cliente vacío
+        self.cerrado = True
+        try:
+            socket.create_connection(self.listener.address, timeout=1).close()
+        except OSError:
+            pass
+        self.hilo_aceptar.join(timeout=1)
+        self.listener.close()
+        with self.lock:
+            suscripciones = list(self.suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.cerrar()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self.cerrado:
+                    return
+                # p. ej. un cliente con la clave equivocada
+                print("Suscriptor rechazado en el bus:", e)
+                continue
+            if self.cerrado:
+                conn.close()
+                return
+            with self.lock:
+                self.suscripciones.append(_Suscripcion(conn, self.capacidad, self._retirar))
+
+    def _retirar(self, suscripcion):
+        with self.lock:
+            if suscripcion in self.suscripciones:
+                self.suscripciones.remove(suscripcion)
+
+
+class SuscriptorPredicciones:
+    """Extremo de lectura del bus. Lanza ConnectionRefusedError si no hay publicador."""
+
+    def __init__(self, direccion=DIRECCION_BUS, authkey=None):
+        self.conn = Client(direccion, authkey=authkey or clave_bus())
+
+    def recibir(self, timeout=None):
+        """
+        Devuelve la siguiente Prediccion, o None si vence `timeout` sin
+        recibir nada o si el registro no es una predicción válida.
+        """
+        if timeout is not None and not self.conn.poll(timeout):
+            return None
+        try:
+            return Prediccion.de_bytes(self.conn.recv_bytes())
+        except (ValueError, TypeError):
+            return None
+
+    def __iter__(self):
+        while True:
+            registro = self.recibir()
+            if registro is not None:
+                yield registro
+
+    def cerrar(self):
+        self.conn.close()
@@ -0,0 +1,130 @@
+"""
+Cola acotada entre la recepción MQTT y los hilos de inferencia.
+
+El hilo de red de paho y la rueda de temporizadores sólo ensamblan filas y
+las encolan; un grupo de hilos trabajadores las saca de la cola y ejecuta
+los modelos. Si la cola se llena se descarta la fila más antigua o se
+bloquea al productor, según la política elegida. La profundidad y el
+retraso en cola se exponen para dimensionar el grupo de trabajadores.
+
+Cada trabajador tiene su propia cola. Con `clave` (por ejemplo, la
+dirección de la pulsera) todos los trabajos de una misma clave van siempre
+al mismo trabajador, así que salen en el orden en que llegaron aunque haya
+varios hilos; sin ella cada trabajo va a la cola más corta.
+"""
+
+import threading
+import time
+from collections import deque
+
+POLITICAS = ('descartar_antiguo', 'bloquear')
+
+
+class ColaInferencia:
+    """
+    `crear_procesador()` se llama una vez en cada hilo trabajador y devuelve
+    la función que procesa un trabajo, de modo que cada hilo tiene su propio
+    estado (por ejemplo, su propio vector de entrada del motor).
+    """
+
+    def __init__(self, crear_procesador, hilos=2, capacidad=1000, politica='descartar_antiguo', clave=None):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de cola desconocida: {politica}")
+        self.capacidad = capacidad  # entre todas las colas
+        self.politica = politica
+        self.clave = clave
+        self.colas = [deque() for _ in range(hilos)]
+        self.n_pendientes = 0
+        self.lock = threading.Lock()
+        self.no_vacia = [threading.Condition(self.lock) for _ in range(hilos)]
+        self.no_llena = threading.Condition(self.lock)
+        self.activa = True
+
+        # Contadores para estadisticas()
+        self.encolados = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.lag_n = 0
+
+        self.hilos = [
+            threading.Thread(target=self._trabajar, args=(crear_procesador, i),
+                             name=f'inferencia-{i}', daemon=True)
+            for i in range(hilos)
+        ]
+        for hilo in self.hilos:
+            hilo.start()
+
+    def poner(self, trabajo):
+        """Encola un trabajo aplicando la política de desbordamiento."""
+        with self.lock:
+            if self.n_pendientes >= self.capacidad:
+                if self.politica == 'bloquear':
+                    while self.n_pendientes >= self.capacidad and self.activa:
+                        self.no_llena.wait()
+                else:
+                    # El trabajo más antiguo es el primero de alguna de las colas
+                    mas_antigua = min((c for c in self.colas if c), key=lambda c: c[0][0])
+                    mas_antigua.popleft()
+                    self.n_pendientes -= 1
+                    self.descartados += 1
+            if self.clave is not None:
+                i = hash(self.clave(trabajo)) % len(self.colas)
+            else:
+                i = min(range(len(self.colas)), key=lambda j: len(self.colas[j]))
+            self.colas[i].append((time.monotonic(), trabajo))
+            self.n_pendientes += 1
+            self.encolados += 1
+            self.no_vacia[i].notify()
+
+    def estadisticas(self, reiniciar=False):
+        """Profundidad actual, contadores y retraso en cola (medio y máximo) en ms."""
+        with self.lock:
+            datos = {
+                'profundidad': self.n_pendientes,
+                'encolados': self.encolados,
+                'procesados': self.procesados,
+                'descartados': self.descartados,
+                'lag_medio_ms': 1000 * self.lag_total / self.lag_n if self.lag_n else 0.0,
+                'lag_max_ms': 1000 * self.lag_max,
+            }
+            if reiniciar:
+                self.lag_total, self.lag_max, self.lag_n = 0.0, 0.0, 0
+        return datos
+
+    def detener(self):
+        """Procesa lo que quede en la cola y termina los hilos trabajadores."""
+        with self.lock:
+            self.activa = False
+            for condicion in self.no_vacia:
+                condicion.notify_all()
+            self.no_llena.notify_all()
+        for hilo in self.hilos:
+            hilo.join()
+
+    def _trabajar(self, crear_procesador, i):
+        procesar = crear_procesador()
+        pendientes, no_vacia = self.colas[i], self.no_vacia[i]
+        while True:
+            with self.lock:
+                while not pendientes and self.activa:
+                    no_vacia.wait()
+                if not pendientes:
+                    return
+                encolado, trabajo = pendientes.popleft()
+                self.n_pendientes -= 1
+                lag = time.monotonic() - encolado
+                self.lag_total += lag
+                self.lag_n += 1
+                if lag > self.lag_max:
+                    self.lag_max = lag
+                self.no_llena.notify()
+
+            try:
+                procesar(trabajo)
+            except Exception as e:
+                print("Error en un hilo de inferencia:", e)
+
+            with self.lock:
+                self.procesados += 1
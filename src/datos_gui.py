@@ -0,0 +1,112 @@
+"""
+Fuente de datos del GUI: una única lectura incremental del CSV de
+predicciones por tick.
+
+Guarda en memoria las últimas filas (para la tabla y el mapa), un
+historial acotado del RSSI de cada receptor (para el gráfico) y las dos
+últimas filas válidas, de las que sale la posición estable que usan el mapa
+y las alarmas. Al arrancar sólo se leen los últimos bytes del fichero, así
+que el coste por tick no depende de cuánta historia tenga, y la memoria
+ocupada no crece con el tiempo que lleve abierto el GUI.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from lector_csv import LectorIncremental
+from tiempo import formatear, serie_a_datetime
+
+COLUMNAS_TEXTO = ('address', 'habitacion_predicha', 'posicion_predicha')
+BYTES_INICIALES = 64 * 1024
+MUESTRAS_HISTORIAL = 300  # 15 minutos con una fila cada 3 s
+RSSI_AUSENTE = -150
+
+
+class HistorialRSSI:
+    """
+    Últimas `capacidad` muestras de RSSI por receptor en un buffer circular
+    fijo. Los receptores que no vieron la pulsera (RSSI_AUSENTE) quedan como
+    hueco en el gráfico.
+    """
+
+    def __init__(self, capacidad=MUESTRAS_HISTORIAL):
+        self.capacidad = capacidad
+        self.receptores = None
+        self.valores = None
+        self.tiempos = np.zeros(capacidad, dtype=np.int64)
+        self.siguiente = 0
+        self.n = 0
+        self._tabla = None
+
+    def anadir(self, fila):
+        if self.receptores is None:
+            self.receptores = [c for c in fila if c not in COLUMNAS_TEXTO and c != 'time']
+            self.valores = np.full((self.capacidad, len(self.receptores)), np.nan, dtype=np.float32)
+        i = self.siguiente
+        for j, receptor in enumerate(self.receptores):
+            v = fila.get(receptor)
+            self.valores[i, j] = v if isinstance(v, int) and v > RSSI_AUSENTE else np.nan
+        t = fila.get('time')
+        self.tiempos[i] = t if isinstance(t, int) else 0
+        self.siguiente = (i + 1) % self.capacidad
+        self.n = min(self.n + 1, self.capacidad)
+        self._tabla = None
+
+    def tabla(self):
+        """DataFrame (índice hora local, una columna por receptor) en orden cronológico."""
+        if self._tabla is None:
+            if not self.n:
+                self._tabla = pd.DataFrame()
+            else:
+                orden = np.arange(self.siguiente - self.n, self.siguiente) % self.capacidad
+                self._tabla = pd.DataFrame(self.valores[orden], columns=self.receptores,
+                                           index=serie_a_datetime(self.tiempos[orden]))
+        return self._tabla
+
+
+class DatosGUI:
+
+    def __init__(self, ruta, posiciones_validas, filas_recientes=5, bytes_iniciales=BYTES_INICIALES):
+        self.posiciones_validas = posiciones_validas
+        self.lector = LectorIncremental(ruta)
+        self.lector.ir_al_final(bytes_iniciales)
+        self.recientes = deque(maxlen=filas_recientes)
+        self.validas = deque(maxlen=2)
+        self.posicion_estable = None
+        self.historial = HistorialRSSI()
+        self._tabla = None
+
+    def actualizar(self):
+        """Lee lo añadido al CSV desde el tick anterior; devuelve cuántas filas nuevas hay."""
+        nuevas = self.lector.leer()
+        for fila in nuevas:
+            for columna, valor in fila.items():
+                if columna not in COLUMNAS_TEXTO:
+                    try:
+                        fila[columna] = int(valor)
+                    except ValueError:
+                        pass
+            self.recientes.append(fila)
+            self.historial.anadir(fila)
+            hab, pos = fila.get('habitacion_predicha'), fila.get('posicion_predicha')
+            if hab != 'Duda' and pos != 'Duda' and pos in self.posiciones_validas.get(hab, []):
+                self.validas.append((hab, pos))
+
+        if nuevas:
+            self._tabla = None
+            # Estable si las dos últimas filas válidas coinciden
+            if len(self.validas) == 2 and self.validas[0] == self.validas[1]:
+                self.posicion_estable = self.validas[1]
+            else:
+                self.posicion_estable = None
+        return len(nuevas)
+
+    def ultimas_filas(self):
+        """DataFrame con las filas recientes y la hora ya formateada; se rehace sólo si hay filas nuevas."""
+        if self._tabla is None:
+            self._tabla = pd.DataFrame(list(self.recientes))
+            if 'time' in self._tabla:
+                self._tabla['time'] = [formatear(t) if isinstance(t, int) else t for t in self._tabla['time']]
+        return self._tabla
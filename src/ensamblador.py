@@ -0,0 +1,96 @@
+"""
+Ensamblado de filas de RSSI por pulsera (dirección BLE).
+
+Cada mensaje de un receptor ESP32 trae la dirección de la pulsera que ha
+visto. En lugar de una única fila global, se mantiene una fila abierta por
+dirección, de modo que un mismo proceso puede seguir a muchas personas a la
+vez. Una fila se cierra cuando han informado todos los receptores o cuando
+vence su tiempo de espera.
+"""
+
+import threading
+import time
+from array import array
+
+from temporizadores import RuedaTemporizadores
+from tiempo import ahora_ms
+
+RSSI_AUSENTE = -150
+
+
+class FilaEtiqueta:
+    """
+    Fila abierta de una pulsera: un RSSI por receptor y máscara de receptores
+    vistos. `time` es el instante de apertura en ms epoch.
+    """
+
+    __slots__ = ('address', 'time', 'inicio', 'rssi', 'vistos', 'temporizador')
+
+    def __init__(self, address, n_receptores):
+        self.address = address
+        self.time = ahora_ms()
+        self.inicio = time.monotonic()
+        self.rssi = array('h', [RSSI_AUSENTE]) * n_receptores
+        self.vistos = 0
+        self.temporizador = None
+
+
+class EnsambladorFilas:
+    """
+    Agrupa los mensajes de los receptores en filas por pulsera.
+
+    `al_cerrar(fila)` se llama fuera del cerrojo con la FilaEtiqueta ya
+    retirada, por lo que nadie más la modifica mientras se predice. Los
+    tiempos de espera de todas las filas los atiende una única
+    RuedaTemporizadores, compartida si se pasa `rueda`.
+    """
+
+    def __init__(self, receptores, timeout, al_cerrar, rueda=None):
+        self.receptores = list(receptores)
+        self.indice = {esp: i for i, esp in enumerate(self.receptores)}
+        self.mascara_completa = (1 << len(self.receptores)) - 1
+        self.timeout = timeout
+        self.al_cerrar = al_cerrar
+        self.rueda = rueda or RuedaTemporizadores()
+        self.filas = {}
+        self.lock = threading.Lock()
+
+    def anadir(self, address, receptor, rssi):
+        """Registra la lectura de un receptor; cierra la fila si ya está completa."""
+        i = self.indice.get(receptor)
+        if i is None:
+            return
+        completa = None
+        with self.lock:
+            fila = self.filas.get(address)
+            if fila is None:
+                fila = FilaEtiqueta(address, len(self.receptores))
+                self.filas[address] = fila
+                fila.temporizador = self.rueda.programar(self.timeout, self.cerrar, address, fila)
+            fila.rssi[i] = rssi
+            fila.vistos |= 1 << i
+            if fila.vistos == self.mascara_completa:
+                completa = self._retirar(address)
+        if completa is not None:
+            self.al_cerrar(completa)
+
+    def cerrar(self, address, fila=None):
+        """Cierra la fila abierta de `address` (vencimiento del tiempo de espera)."""
+        with self.lock:
+            actual = self.filas.get(address)
+            # El temporizador puede llegar tarde, cuando ya hay otra fila abierta
+            if actual is None or (fila is not None and actual is not fila):
+                return
+            actual = self._retirar(address)
+        self.al_cerrar(actual)
+
+    def _retirar(self, address):
+        fila = self.filas.pop(address)
+        if fila.temporizador is not None:
+            fila.temporizador.cancel()
+            fila.temporizador = None
+        return fila
+
+    def abiertas(self):
+        """Número de pulseras con una fila pendiente de cerrar."""
+        return len(self.filas)
@@ -0,0 +1,246 @@
+"""
+Intervalos de permanencia por posición y por habitación a partir del CSV
+de predicciones, para la exportación a Excel del GUI.
+
+Todo se hace con operaciones sobre arrays: filtrado de pares válidos con
+una tabla de códigos, rachas por puntos de cambio y agrupación de
+habitaciones por puntos de cambio, en lugar de apply/iterrows/.loc fila a
+fila. El resultado es el mismo que el de la versión por filas que tenía el
+GUI.
+"""
+
+import os
+import bisect
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from archivo import ArchivoDiario, dia_de
+from tiempo import a_ms, tiempos_validos, serie_a_datetime
+from vista_intervalos import leer_abiertos, leer_cerrados, inicio_vista
+
+VALID_POSITIONS_BY_ROOM = {
+    "Dormitorio":   ["Cama", "Escritorio"],
+    "Cocina":       ["Vitroceramica", "Frigorifico", "Fregadero"],
+    "Salon":        ["Mesa", "Sofa"],
+    "Baño":         ["WC", "Lavabo"],
+    "Pasillo":      ["Pasillo"]
+}
+
+
+def formatear_duraciones(td):
+    """Columna de timedelta a texto HH:MM:SS (las horas pueden pasar de 24)."""
+    total = td.dt.total_seconds().astype(np.int64)
+    h, m, s = total // 3600, (total % 3600) // 60, total % 60
+    return h.astype(str).str.zfill(2) + ":" + m.astype(str).str.zfill(2) + ":" + s.astype(str).str.zfill(2)
+
+
+def pares_validos(habitaciones, posiciones, validas=VALID_POSITIONS_BY_ROOM):
+    """Máscara de filas cuya posición pertenece a su habitación (sin 'Duda')."""
+    cod_hab, habs = pd.factorize(habitaciones)
+    cod_pos, poss = pd.factorize(posiciones)
+    # Tabla habitación x posición con los pares permitidos; -1 (NaN) nunca es válido
+    tabla = np.array([[p != "Duda" and p in validas.get(h, []) for p in poss] for h in habs],
+                     dtype=bool).reshape(len(habs), len(poss))
+    ok = (cod_hab >= 0) & (cod_pos >= 0)
+    ok[ok] = tabla[cod_hab[ok], cod_pos[ok]]
+    return ok
+
+
+def inicios_de_racha(*columnas):
+    """Índices donde empieza cada racha de valores iguales en todas las columnas."""
+    cambio = np.zeros(len(columnas[0]), dtype=bool)
+    if len(cambio):
+        cambio[0] = True
+    for c in columnas:
+        cambio[1:] |= c[1:] != c[:-1]
+    return np.flatnonzero(cambio)
+
+
+def _preparar(df, validas):
+    """Filas con time local y par válido, ordenadas por tiempo."""
+    # time viene en ms epoch; se pasa a hora local sólo para los intervalos.
+    # Las filas sin tiempo o con uno ilegible (p. ej. una línea cortada) se descartan
+    ms, legibles = tiempos_validos(df["time"])
+    df = df[legibles].copy()
+    df["time"] = serie_a_datetime(pd.Series(ms[legibles], index=df.index))
+    df = df[pares_validos(df["habitacion_predicha"].to_numpy(), df["posicion_predicha"].to_numpy(), validas)]
+    return df.sort_values("time")
+
+
+def leer_csv(CSV_PATH, validas=VALID_POSITIONS_BY_ROOM):
+    # Sólo las columnas necesarias; las etiquetas como categorías ya vienen codificadas
+    df = pd.read_csv(CSV_PATH, usecols=["time", "habitacion_predicha", "posicion_predicha"],
+                     dtype={"habitacion_predicha": "category", "posicion_predicha": "category"})
+    return _preparar(df, validas)
+
+
+def leer_archivo(carpeta, dt_inicio, dt_fin, validas=VALID_POSITIONS_BY_ROOM):
+    """
+    Lee del archivo por días (archivo.py) sólo los días del rango y los
+    vecinos necesarios para que las rachas que cruzan dt_inicio y dt_fin
+    estén completas: hace falta ver dónde empieza la racha de la última fila
+    anterior al rango y dónde acaba la que contiene dt_fin. Con eso los
+    intervalos del rango salen iguales que leyendo todo el CSV.
+    """
+    archivo = ArchivoDiario(carpeta)
+    dias = archivo.dias()
+    i = bisect.bisect_left(dias, dia_de(a_ms(dt_inicio)))
+    j = bisect.bisect_right(dias, dia_de(a_ms(dt_fin)))
+    leidos = {}
+    while True:
+        for dia in dias[i:j]:
+            if dia not in leidos:
+                leidos[dia] = _preparar(archivo.leer_dias([dia], ["time", "habitacion_predicha", "posicion_predicha"]),
+                                        validas)
+        partes = [leidos[dia] for dia in dias[i:j] if len(leidos[dia])]
+        if not partes:
+            df = pd.DataFrame(columns=["time", "habitacion_predicha", "posicion_predicha"])
+        else:
+            df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+        cod_pos, posiciones = pd.factorize(df["posicion_predicha"])
+        claves = pd.factorize(df["habitacion_predicha"])[0] * len(posiciones) + cod_pos
+        tiempos = df["time"]
+        antes = int((tiempos < dt_inicio).sum())
+        hasta_fin = int((tiempos <= dt_fin).sum())
+        # Completa por detrás si la racha de la última fila anterior al rango no empieza en la primera leída
+        atras = i == 0 or (antes > 0 and (claves[:antes] != claves[antes - 1]).any())
+        # Completa por delante si después de dt_fin hay una fila con otra clave que cierra la racha
+        adelante = j == len(dias) or (hasta_fin < len(df) and (
+            hasta_fin == 0 or (claves[hasta_fin:] != claves[hasta_fin - 1]).any()))
+        if atras and adelante:
+            return df
+        if not atras:
+            i -= 1
+        if not adelante:
+            j += 1
+
+
+def generar_intervalos_separados(CSV_PATH, dt_inicio, dt_fin, min_filas=3, validas=VALID_POSITIONS_BY_ROOM):
+    """
+    Intervalos por posición y por habitación entre dt_inicio y dt_fin
+    (datetime locales). CSV_PATH es el CSV de predicciones o una carpeta del
+    archivo por días; con el archivo sólo se leen los días necesarios.
+    """
+    if os.path.isdir(CSV_PATH):
+        df = leer_archivo(CSV_PATH, dt_inicio, dt_fin, validas)
+    else:
+        df = leer_csv(CSV_PATH, validas)
+
+    # Rachas de (habitación, posición) consecutivas
+    hab = pd.factorize(df["habitacion_predicha"])[0]
+    pos = pd.factorize(df["posicion_predicha"])[0]
+    tiempos = df["time"].to_numpy()
+    n = len(tiempos)
+    inicios = inicios_de_racha(hab, pos)
+    filas_racha = np.diff(np.append(inicios, n))
+    # Una racha acaba cuando empieza la siguiente; la última, en la última fila
+    finales = np.append(inicios[1:], n - 1) if n else inicios
+    largas = filas_racha >= min_filas
+    inicios, finales = inicios[largas], finales[largas]
+    if not len(inicios):
+        return pd.DataFrame(), pd.DataFrame()
+
+    df_pos = pd.DataFrame({
+        "Habitacion": df["habitacion_predicha"].to_numpy()[inicios],
+        "Posicion": df["posicion_predicha"].to_numpy()[inicios],
+        "Fecha_Entrada_dt": tiempos[inicios],
+        "Fecha_Salida_dt": tiempos[finales],
+    })
+    df_pos = _recortar(df_pos, dt_inicio, dt_fin, "Tiempo_en_la_posicion_td")
+    if df_pos.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # Agrupar por habitación: tramos de intervalos consecutivos en la misma habitación
+    tramos = inicios_de_racha(pd.factorize(df_pos["Habitacion"])[0])
+    ultimos = np.append(tramos[1:], len(df_pos)) - 1
+    entrada = df_pos["Fecha_Entrada_dt"].to_numpy()[tramos]
+    salida = df_pos["Fecha_Salida_dt"].to_numpy()[ultimos]
+    df_hab = pd.DataFrame({
+        "Habitacion": df_pos["Habitacion"].to_numpy()[tramos],
+        "Fecha_Entrada_dt": entrada,
+        "Fecha_Salida_dt": salida,
+        "Tiempo_en_la_habitacion_td": salida - entrada,
+    })
+
+    return _formatear(df_pos, df_hab)
+
+
+def _recortar(df, dt_inicio, dt_fin, nombre_td):
+    df = df[(df["Fecha_Salida_dt"]>=dt_inicio)&(df["Fecha_Entrada_dt"]<=dt_fin)].copy()
+    df["Fecha_Entrada_dt"]=df["Fecha_Entrada_dt"].clip(lower=dt_inicio,upper=dt_fin)
+    df["Fecha_Salida_dt"]=df["Fecha_Salida_dt"].clip(lower=dt_inicio,upper=dt_fin)
+    df[nombre_td]=df["Fecha_Salida_dt"]-df["Fecha_Entrada_dt"]
+    return df.reset_index(drop=True)
+
+
+def _formatear(df_pos, df_hab):
+    df_pos["Fecha_Entrada"]=df_pos["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_pos["Fecha_Salida"]=df_pos["Fecha_Salida_dt"].dt.strftime("%d/%m/%Y %H:%M:%S")
+    df_pos["Tiempo_en_la_posicion"]=formatear_duraciones(df_pos["Tiempo_en_la_posicion_td"])
+    df_pos = df_pos[["Habitacion","Posicion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_posicion"]]
+
+    df_hab["Fecha_Entrada"]=df_hab["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_hab["Fecha_Salida"]=df_hab["Fecha_Salida_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_hab["Tiempo_en_la_habitacion"]=formatear_duraciones(df_hab["Tiempo_en_la_habitacion_td"])
+    df_hab = df_hab[["Habitacion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_habitacion"]]
+
+    return df_pos, df_hab
+
+
+def leer_intervalos_materializados(carpeta, dt_inicio, dt_fin, address=None):
+    """
+    Los mismos dos cuadros que generar_intervalos_separados, pero leídos de
+    la vista que mantiene el detector de acciones (vista_intervalos.py):
+    intervalos cerrados que se solapan con el rango más los que siguen
+    abiertos, hasta su última predicción. Con `address` sólo los de esa
+    pulsera. No recorre predicciones, así que el coste depende del número de
+    intervalos del rango.
+    """
+    desde, hasta = a_ms(dt_inicio), a_ms(dt_fin) + 1000
+    cerrados_pos, cerrados_hab = leer_cerrados(carpeta, desde, hasta)
+    abiertos = [(a, *v) for a, v in leer_abiertos(carpeta).items() if v[2] <= hasta]
+
+    def cuadro(cerrados, columnas, abiertos_cols):
+        df = pd.DataFrame(abiertos_cols, columns=["address", *columnas, "entrada", "time"])
+        if len(cerrados):
+            df = pd.concat([cerrados.astype({c: object for c in ["address", *columnas]}), df], ignore_index=True)
+        if address is not None:
+            df = df[df["address"].astype(object) == address]
+        df = df.sort_values(["entrada", "time"], kind="stable")
+        return pd.DataFrame({
+            **{c: df[c].to_numpy(dtype=object) for c in columnas},
+            "Fecha_Entrada_dt": serie_a_datetime(df["entrada"].to_numpy()).to_numpy(),
+            "Fecha_Salida_dt": serie_a_datetime(df["time"].to_numpy()).to_numpy(),
+        })
+
+    df_pos = cuadro(cerrados_pos, ["Habitacion", "Posicion"],
+                    [(a, h, p, e_pos, visto) for a, h, p, _, e_pos, visto in abiertos])
+    df_hab = cuadro(cerrados_hab, ["Habitacion"],
+                    [(a, h, e_hab, visto) for a, h, _, e_hab, _, visto in abiertos])
+    df_pos = _recortar(df_pos, dt_inicio, dt_fin, "Tiempo_en_la_posicion_td")
+    df_hab = _recortar(df_hab, dt_inicio, dt_fin, "Tiempo_en_la_habitacion_td")
+    if df_pos.empty and df_hab.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    return _formatear(df_pos, df_hab)
+
+
+def intervalos_exportacion(vista, origen, dt_inicio, dt_fin):
+    """
+    Intervalos para la exportación del GUI: de la vista del detector
+    (`vista`) desde su primera entrada y, para lo anterior, calculados de
+    las predicciones (`origen`, CSV o archivo por días). Un intervalo que
+    cruza el inicio de la vista sale partido en dos filas.
+    """
+    inicio = inicio_vista(vista) if os.path.isdir(vista) else None
+    if inicio is None:
+        return generar_intervalos_separados(origen, dt_inicio, dt_fin)
+    corte = datetime.fromtimestamp(inicio / 1000)
+    if corte <= dt_inicio:
+        return leer_intervalos_materializados(vista, dt_inicio, dt_fin)
+    if corte > dt_fin:
+        return generar_intervalos_separados(origen, dt_inicio, dt_fin)
+    antes = generar_intervalos_separados(origen, dt_inicio, corte - timedelta(milliseconds=1))
+    despues = leer_intervalos_materializados(vista, corte, dt_fin)
+    return tuple(pd.concat([a, d], ignore_index=True) for a, d in zip(antes, despues))
@@ -0,0 +1,84 @@
+"""
+Lectura incremental (tail) de un CSV que otro proceso va ampliando.
+
+Recuerda el desplazamiento en bytes de lo ya leído y en cada llamada sólo
+analiza las líneas completas añadidas desde entonces, así que el coste por
+consulta depende de las filas nuevas y no del tamaño del fichero. Si el
+fichero se trunca o se sustituye por otro (rotación), vuelve a empezar
+desde su cabecera.
+
+Se sondea con os.stat en lugar de inotify porque los lanzadores del
+proyecto son de Windows; una consulta sin cambios cuesta una llamada al
+sistema.
+"""
+
+import csv
+import os
+
+
+class LectorIncremental:
+    """Devuelve como diccionarios las filas nuevas de `ruta` en cada leer()."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.offset = 0
+        self.cabecera = None
+        self.resto = b''
+        self.identidad = None
+
+    def ir_al_final(self, max_bytes):
+        """
+        Se salta la historia del fichero: la siguiente leer() devuelve sólo las
+        filas completas de sus últimos `max_bytes` y después lo que se añada.
+        """
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            return
+        with open(self.ruta, 'rb') as f:
+            cabecera = f.readline()
+            if not cabecera.endswith(b'\n'):
+                return
+            inicio = max(len(cabecera), st.st_size - max_bytes)
+            # Desde el byte anterior, readline termina justo al final de la línea a medias
+            f.seek(inicio - 1)
+            f.readline()
+            self.offset = f.tell()
+        self.cabecera = next(csv.reader([cabecera.decode('utf-8')]))
+        self.resto = b''
+        self.identidad = (st.st_dev, st.st_ino)
+
+    def leer(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            return []
+
+        identidad = (st.st_dev, st.st_ino)
+        if self.identidad is not None and (identidad != self.identidad or st.st_size < self.offset):
+            # Fichero rotado o truncado: se lee el nuevo desde el principio
+            self.reiniciar()
+        self.identidad = identidad
+        if st.st_size == self.offset:
+            return []
+
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.offset)
+            datos = f.read()
+        self.offset += len(datos)
+
+        # Sólo se analizan líneas completas; el trozo final espera a la siguiente llamada
+        datos = self.resto + datos
+        corte = datos.rfind(b'\n')
+        if corte < 0:
+            self.resto = datos
+            return []
+        self.resto = datos[corte + 1:]
+
+        filas = csv.reader(datos[:corte + 1].decode('utf-8').splitlines())
+        if self.cabecera is None:
+            self.cabecera = next(filas, None)
+        return [dict(zip(self.cabecera, fila)) for fila in filas if fila]
@@ -0,0 +1,127 @@
+"""
+Dibujo del plano del GUI por capas.
+
+El plano se carga y convierte a RGBA una sola vez; en cada fotograma se
+copia esa capa base y encima sólo se pintan los elementos dinámicos, que
+son pequeños: los puntos de RSSI de los receptores, el marcador de posición
+y las líneas de transición que se desvanecen (cada una en un parche del
+tamaño de su recuadro, no en una capa del tamaño del plano). Si el estado
+visible no ha cambiado desde el fotograma anterior no se dibuja ni se
+codifica nada: se devuelven los mismos bytes PNG.
+"""
+
+import io
+import time
+
+from PIL import Image, ImageDraw
+
+RADIO_RECEPTOR = 6
+RADIO_POSICION = 14
+ANCHO_TRANSICION = 3
+
+
+def color_rssi(rssi):
+    return "green" if rssi >= -75 else "yellow" if rssi >= -95 else "red"
+
+
+class RenderizadorMapa:
+
+    def __init__(self, ruta_plano, posiciones_esp, posiciones, tiempo_visible=10):
+        self.base = Image.open(ruta_plano).convert("RGBA")
+        self.posiciones_esp = posiciones_esp
+        self.posiciones = posiciones
+        self.tiempo_visible = tiempo_visible
+        self.ultima_habitacion = None
+        self.ultima_posicion = None
+        self.transiciones = []  # (x1, y1, x2, y2, instante)
+        self.clave = None
+        self.png = None
+        # Estadísticas: fotogramas pedidos, codificados, bytes PNG generados y tiempo total
+        self.fotogramas = 0
+        self.codificados = 0
+        self.bytes_codificados = 0
+        self.segundos = 0.0
+
+    def renderizar(self, fila, nueva, ahora=None):
+        """PNG del plano para la última fila y la posición estable `nueva` (o None)."""
+        inicio = time.perf_counter()
+        ahora = time.time() if ahora is None else ahora
+        self.fotogramas += 1
+
+        receptores = tuple(
+            (x, y, color_rssi(fila[esp])) for esp, (x, y) in self.posiciones_esp.items() if esp in fila
+        )
+        marcador = self._actualizar_posicion(nueva, ahora)
+        lineas = self._lineas_visibles(ahora)
+
+        clave = (receptores, marcador, lineas)
+        if clave != self.clave:
+            img = self.base.copy()
+            d = ImageDraw.Draw(img)
+            for x, y, color in receptores:
+                r = RADIO_RECEPTOR
+                d.ellipse((x - r, y - r, x + r, y + r), fill=color)
+            if marcador:
+                x, y = marcador
+                r = RADIO_POSICION
+                d.ellipse([x - r, y - r, x + r, y + r], fill="blue")
+            for linea in lineas:
+                self._pintar_linea(img, *linea)
+
+            buf = io.BytesIO()
+            img.save(buf, format="PNG")
+            self.png = buf.getvalue()
+            self.clave = clave
+            self.codificados += 1
+            self.bytes_codificados += len(self.png)
+
+        self.segundos += time.perf_counter() - inicio
+        return self.png
+
+    def estadisticas(self):
+        return {
+            'fotogramas': self.fotogramas,
+            'codificados': self.codificados,
+            'bytes_codificados': self.bytes_codificados,
+            'ms_por_fotograma': self.segundos / self.fotogramas * 1e3 if self.fotogramas else 0.0,
+        }
+
+    def _actualizar_posicion(self, nueva, ahora):
+        """Recuerda la última posición estable, anota la transición si cambia y devuelve el marcador."""
+        old_hab, old_pos = self.ultima_habitacion, self.ultima_posicion
+        if nueva:
+            self.ultima_habitacion, self.ultima_posicion = nueva
+        if self.ultima_habitacion and self.ultima_posicion:
+            coords = self.posiciones.get(f"{self.ultima_habitacion}_{self.ultima_posicion}", (0, 0))
+        else:
+            coords = (0, 0)
+        if coords != (0, 0) and old_hab and old_pos:
+            o = self.posiciones.get(f"{old_hab}_{old_pos}", (0, 0))
+            if o != (0, 0) and o != coords:
+                self.transiciones.append((*o, coords[0], coords[1], ahora))
+        return coords if coords != (0, 0) else None
+
+    def _lineas_visibles(self, ahora):
+        """Líneas de transición aún visibles con su opacidad; retira las caducadas."""
+        mitad = self.tiempo_visible / 2
+        lineas = []
+        for x1, y1, x2, y2, t in list(self.transiciones):
+            e = ahora - t
+            if e > self.tiempo_visible:
+                self.transiciones.remove((x1, y1, x2, y2, t))
+                continue
+            alpha = 255 if e < mitad else int(255 * (1 - (e - mitad) / mitad))
+            lineas.append((x1, y1, x2, y2, alpha))
+        return tuple(lineas)
+
+    def _pintar_linea(self, img, x1, y1, x2, y2, alpha):
+        # Parche del tamaño del recuadro de la línea, con margen para el grosor
+        m = ANCHO_TRANSICION
+        x0, y0 = min(x1, x2) - m, min(y1, y2) - m
+        parche = Image.new("RGBA", (abs(x2 - x1) + 2 * m + 1, abs(y2 - y1) + 2 * m + 1), (255, 255, 255, 0))
+        ImageDraw.Draw(parche).line([(x1 - x0, y1 - y0), (x2 - x0, y2 - y0)],
+                                    fill=(255, 0, 0, alpha), width=ANCHO_TRANSICION)
+        # alpha_composite no admite destinos negativos: se recorta el parche
+        origen = (max(0, -x0), max(0, -y0))
+        if origen[0] < parche.width and origen[1] < parche.height:
+            img.alpha_composite(parche, dest=(max(0, x0), max(0, y0)), source=origen)
@@ -0,0 +1,393 @@
+"""
+Motor de alertas por reglas sobre el flujo de predicciones (CEP), fuera
+del GUI.
+
+Se suscribe al bus de predicciones (bus_predicciones.py) y evalúa para cada
+pulsera las reglas de alertas.json:
+
+  - permanencia: lleva más de `max_minutos` en una habitación (o posición).
+  - franja:      entre `desde` y `hasta` (hora local, puede pasar de la
+                 medianoche) está en la habitación (`debe_estar` false) o
+                 fuera de ella (`debe_estar` true). Una vez por franja.
+  - sin_senal:   no llega ninguna predicción de la pulsera en `max_segundos`.
+
+Todo se evalúa en tiempo de evento (el time de las predicciones) y de forma
+incremental: cada regla guarda su estado por pulsera y los plazos van a un
+montículo con cancelación perezosa, así que una predicción sólo cuesta una
+consulta por regla sin_senal y las reglas de habitación sólo se evalúan
+cuando cambia la habitación estable (`confirmacion` predicciones seguidas
+iguales). Al recargar alertas.json cada regla que sigue existiendo (mismo
+nombre y tipo) conserva su estado: no se repiten alertas ya enviadas y las
+permanencias siguen contando desde la entrada. Las alertas se añaden a
+ALERTAS_CSV, que el GUI muestra, y se envían por email si la configuración
+tiene destino (notificaciones.py, en segundo plano: el motor nunca espera al
+servidor de correo).
+
+Uso (desde la raíz del proyecto):
+    python src/motor_alertas.py
+"""
+
+import os
+import csv
+import json
+import time
+import heapq
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from bus_predicciones import SuscriptorPredicciones
+from notificaciones import DespachadorNotificaciones
+from tiempo import ahora_ms, formatear
+
+CONFIGURACION = 'src/alertas.json'
+ALERTAS_CSV = 'src/logs/alertas.csv'
+CABECERA = ['time', 'regla', 'address', 'mensaje']
+INTERVALO_RELOJ = 1.0  # segundos entre avances del reloj sin predicciones
+DISPARADA = 'disparada'  # estado de una regla ya disparada en la racha actual
+
+CONFIGURACION_POR_DEFECTO = {
+    "confirmacion": 2,
+    "email": "",
+    "reglas": [
+        {"tipo": "franja", "nombre": "no_levantado", "habitacion": "Dormitorio",
+         "desde": "09:00", "hasta": "00:00", "debe_estar": False,
+         "mensaje": "¡No se ha levantado, va a llegar tarde!"},
+        {"tipo": "franja", "nombre": "no_acostado", "habitacion": "Dormitorio",
+         "desde": "23:00", "hasta": "00:00", "debe_estar": True,
+         "mensaje": "¡Aún no se ha acostado!"},
+        {"tipo": "permanencia", "nombre": "bano_largo", "habitacion": "Baño", "max_minutos": 15,
+         "mensaje": "¡Lleva demasiado tiempo en el baño!"},
+        {"tipo": "sin_senal", "nombre": "sin_senal", "max_segundos": 120,
+         "mensaje": "No se detecta señal de la pulsera"},
+    ],
+}
+
+
+class Alerta(NamedTuple):
+    time: int
+    regla: str
+    address: str
+    mensaje: str
+
+
+class Sujeto:
+    """
+    Estado de una pulsera: habitación y posición estables (con el time en
+    que se entró en cada una) y estado de cada regla.
+    """
+
+    __slots__ = ('address', 'habitacion', 'posicion', 'entrada_habitacion', 'entrada_posicion',
+                 'candidato', 'repeticiones', 'visto', 'estado')
+
+    def __init__(self, address):
+        self.address = address
+        self.habitacion = None
+        self.posicion = None
+        self.entrada_habitacion = None
+        self.entrada_posicion = None
+        self.candidato = None
+        self.repeticiones = 0
+        self.visto = 0
+        self.estado = {}
+
+
+class Permanencia:
+    """Alerta si la pulsera sigue `max_minutos` en la habitación (y posición, si se da)."""
+
+    def __init__(self, nombre, mensaje, habitacion, max_minutos, posicion=None):
+        self.nombre = nombre
+        self.mensaje = mensaje
+        self.habitacion = habitacion
+        self.posicion = posicion
+        self.plazo = int(max_minutos * 60 * 1000)
+
+    def cambio(self, motor, sujeto, ts):
+        dentro = sujeto.habitacion == self.habitacion and self.posicion in (None, sujeto.posicion)
+        if not dentro:
+            sujeto.estado.pop(self.nombre, None)
+        elif self.nombre not in sujeto.estado:
+            # El plazo cuenta desde que entró, no desde ts (que tras recargar las reglas es posterior)
+            entrada = sujeto.entrada_habitacion if self.posicion is None else sujeto.entrada_posicion
+            sujeto.estado[self.nombre] = motor.programar(entrada + self.plazo, self, sujeto)
+
+    def recargar(self, motor, sujeto):
+        if sujeto.estado.get(self.nombre) is not DISPARADA:
+            sujeto.estado.pop(self.nombre, None)
+        self.cambio(motor, sujeto, motor.ahora)
+
+    def vencer(self, motor, sujeto, ts, token):
+        if sujeto.estado.get(self.nombre) == token:
+            sujeto.estado[self.nombre] = DISPARADA
+            motor.disparar(self, sujeto, ts)
+
+
+class Franja:
+    """Alerta si dentro de la franja horaria local está (o no está) en la habitación."""
+
+    def __init__(self, nombre, mensaje, habitacion, desde, hasta, debe_estar=False):
+        self.nombre = nombre
+        self.mensaje = mensaje
+        self.habitacion = habitacion
+        self.desde = _minutos(desde)
+        self.hasta = _minutos(hasta)
+        self.debe_estar = debe_estar
+
+    def iniciar(self, motor, ts):
+        motor.programar(self._siguiente_inicio(ts), self, None)
+
+    def cambio(self, motor, sujeto, ts):
+        ocurrencia = self._ocurrencia(ts)
+        if ocurrencia is None or sujeto.habitacion is None:
+            return
+        if (sujeto.habitacion == self.habitacion) != self.debe_estar and sujeto.estado.get(self.nombre) != ocurrencia:
+            sujeto.estado[self.nombre] = ocurrencia
+            motor.disparar(self, sujeto, ts)
+
+    def recargar(self, motor, sujeto):
+        # El estado guardado es la ocurrencia ya avisada: no se repite
+        self.cambio(motor, sujeto, motor.ahora)
+
+    def vencer(self, motor, sujeto, ts, token):
+        # Empieza la franja: se evalúa a todas las pulseras y se programa la siguiente
+        for s in motor.sujetos.values():
+            self.cambio(motor, s, ts)
+        motor.programar(self._siguiente_inicio(ts + 60000), self, None)
+
+    def _ocurrencia(self, ts):
+        """Día (ordinal) en que empezó la franja que contiene ts, o None si ts está fuera."""
+        local = datetime.fromtimestamp(ts / 1000)
+        minuto = local.hour * 60 + local.minute
+        if self.desde < self.hasta or self.hasta == 0:
+            dentro = minuto >= self.desde and (self.hasta == 0 or minuto < self.hasta)
+            return local.toordinal() if dentro else None
+        if minuto >= self.desde:
+            return local.toordinal()
+        if minuto < self.hasta:
+            return local.toordinal() - 1
+        return None
+
+    def _siguiente_inicio(self, ts):
+        local = datetime.fromtimestamp(ts / 1000)
+        inicio = local.replace(hour=self.desde // 60, minute=self.desde % 60, second=0, microsecond=0)
+        if inicio < local:
+            inicio += timedelta(days=1)
+        return int(inicio.timestamp() * 1000)
+
+
+class SinSenal:
+    """Alerta si no llega ninguna predicción de la pulsera en `max_segundos`; una vez por corte."""
+
+    def __init__(self, nombre, mensaje, max_segundos):
+        self.nombre = nombre
+        self.mensaje = mensaje
+        self.plazo = int(max_segundos * 1000)
+
+    def senal(self, motor, sujeto, ts):
+        estado = sujeto.estado.get(self.nombre)
+        if estado is None or estado is DISPARADA:
+            sujeto.estado[self.nombre] = motor.programar(ts + self.plazo, self, sujeto)
+
+    def recargar(self, motor, sujeto):
+        # Si ya avisó del corte actual no vuelve a avisar; si no, el plazo cuenta desde la última señal
+        if sujeto.estado.get(self.nombre) is not DISPARADA:
+            sujeto.estado[self.nombre] = motor.programar(sujeto.visto + self.plazo, self, sujeto)
+
+    def vencer(self, motor, sujeto, ts, token):
+        if sujeto.estado.get(self.nombre) != token:
+            return
+        if sujeto.visto + self.plazo <= ts:
+            sujeto.estado[self.nombre] = DISPARADA
+            motor.disparar(self, sujeto, ts)
+        else:
+            # Hubo señal después de programarlo: se reprograma desde la última
+            sujeto.estado[self.nombre] = motor.programar(sujeto.visto + self.plazo, self, sujeto)
+
+
+TIPOS = {'permanencia': Permanencia, 'franja': Franja, 'sin_senal': SinSenal}
+
+
+def _minutos(hhmm):
+    h, m = hhmm.split(':')
+    return (int(h) * 60 + int(m)) % (24 * 60)
+
+
+def crear_reglas(configuracion):
+    reglas = []
+    for r in configuracion['reglas']:
+        r = dict(r)
+        reglas.append(TIPOS[r.pop('tipo')](**r))
+    return reglas
+
+
+def leer_configuracion(ruta=CONFIGURACION):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return json.loads(json.dumps(CONFIGURACION_POR_DEFECTO))
+
+
+def guardar_configuracion(configuracion, ruta=CONFIGURACION):
+    """Escritura atómica: el motor nunca lee un fichero a medias."""
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(configuracion, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + '.tmp', ruta)
+
+
+class MotorAlertas:
+    """
+    Evalúa las reglas sobre las predicciones que recibe en prediccion() y
+    llama a al_disparar(Alerta) por cada alerta. El reloj es el time de los
+    eventos; avanzar() lo mueve sin predicciones (vencen plazos).
+    """
+
+    def __init__(self, reglas, confirmacion=2, al_disparar=print):
+        self.confirmacion = confirmacion
+        self.al_disparar = al_disparar
+        self.sujetos = {}
+        self.plazos = []  # montículo de (vence, secuencia, regla, sujeto, token)
+        self.secuencia = 0
+        self.ahora = None
+        self.evaluaciones = 0
+        self.cambiar_reglas(reglas)
+
+    def cambiar_reglas(self, reglas):
+        """
+        Sustituye las reglas conservando la habitación estable de cada
+        pulsera y el estado de las reglas que siguen (mismo nombre y tipo):
+        lo ya disparado no se repite y los plazos se recalculan desde la
+        entrada o la última señal con los valores nuevos.
+        """
+        anteriores = {r.nombre: type(r) for r in getattr(self, 'reglas', [])}
+        siguen = {r.nombre for r in reglas if anteriores.get(r.nombre) is type(r)}
+        self.reglas = reglas
+        self.reglas_senal = [r for r in reglas if hasattr(r, 'senal')]
+        self.reglas_cambio = [r for r in reglas if hasattr(r, 'cambio')]
+        # Los plazos pendientes apuntan a las reglas viejas; recargar() los vuelve a programar
+        self.plazos = []
+        for sujeto in self.sujetos.values():
+            sujeto.estado = {n: e for n, e in sujeto.estado.items() if n in siguen}
+        if self.ahora is not None:
+            self._iniciar(self.ahora)
+            for sujeto in self.sujetos.values():
+                for regla in self.reglas:
+                    regla.recargar(self, sujeto)
+
+    def prediccion(self, address, habitacion, posicion, ts):
+        self.avanzar(ts)
+        sujeto = self.sujetos.get(address)
+        if sujeto is None:
+            sujeto = self.sujetos[address] = Sujeto(address)
+        if ts > sujeto.visto:
+            sujeto.visto = ts
+        for regla in self.reglas_senal:
+            regla.senal(self, sujeto, ts)
+        self.evaluaciones += len(self.reglas_senal)
+
+        if habitacion == 'Duda' or posicion == 'Duda':
+            return
+        par = (habitacion, posicion)
+        if par == sujeto.candidato:
+            sujeto.repeticiones += 1
+        else:
+            sujeto.candidato = par
+            sujeto.repeticiones = 1
+        if sujeto.repeticiones == self.confirmacion and par != (sujeto.habitacion, sujeto.posicion):
+            if habitacion != sujeto.habitacion:
+                sujeto.entrada_habitacion = ts
+            sujeto.entrada_posicion = ts
+            sujeto.habitacion, sujeto.posicion = par
+            for regla in self.reglas_cambio:
+                regla.cambio(self, sujeto, ts)
+            self.evaluaciones += len(self.reglas_cambio)
+
+    def avanzar(self, ts):
+        """Mueve el reloj a ts y atiende los plazos vencidos."""
+        if self.ahora is None:
+            self.ahora = ts
+            self._iniciar(ts)
+        if ts < self.ahora:
+            return
+        self.ahora = ts
+        while self.plazos and self.plazos[0][0] <= ts:
+            vence, _, regla, sujeto, token = heapq.heappop(self.plazos)
+            regla.vencer(self, sujeto, vence, token)
+            self.evaluaciones += 1
+
+    def programar(self, vence, regla, sujeto):
+        """Plazo para regla.vencer; el token sirve para reconocerlo (cancelar = olvidar el token)."""
+        self.secuencia += 1
+        token = self.secuencia
+        heapq.heappush(self.plazos, (vence, token, regla, sujeto, token))
+        return token
+
+    def disparar(self, regla, sujeto, ts):
+        self.al_disparar(Alerta(ts, regla.nombre, sujeto.address, regla.mensaje))
+
+    def _iniciar(self, ts):
+        for regla in self.reglas:
+            if hasattr(regla, 'iniciar'):
+                regla.iniciar(self, ts)
+
+
+def main():
+    from dotenv import load_dotenv  # pip install python-dotenv
+    load_dotenv()
+
+    configuracion = leer_configuracion()
+    escribir_cabecera = not os.path.isfile(ALERTAS_CSV)
+    salida = open(ALERTAS_CSV, 'a', newline='', encoding='utf-8')
+    writer = csv.writer(salida)
+    if escribir_cabecera:
+        writer.writerow(CABECERA)
+        salida.flush()
+
+    despachador = DespachadorNotificaciones(usuario=os.getenv("EMAIL_USER"), clave=os.getenv("EMAIL_PASS"))
+
+    def al_disparar(alerta):
+        print(f"{formatear(alerta.time)} - {alerta.address} - ALERTA {alerta.regla}: {alerta.mensaje}")
+        writer.writerow(alerta)
+        salida.flush()
+        despachador.enviar(configuracion.get('email'), alerta)
+
+    motor = MotorAlertas(crear_reglas(configuracion), configuracion.get('confirmacion', 2), al_disparar)
+    modificado = os.path.getmtime(CONFIGURACION) if os.path.isfile(CONFIGURACION) else None
+    reloj = time.monotonic()
+    try:
+        while True:
+            try:
+                suscriptor = SuscriptorPredicciones()
+            except OSError:
+                time.sleep(1)
+                continue
+            print("Conectado al bus de predicciones")
+            try:
+                while True:
+                    prediccion = suscriptor.recibir(timeout=INTERVALO_RELOJ)
+                    if prediccion is not None:
+                        motor.prediccion(prediccion.address, prediccion.habitacion_predicha,
+                                         prediccion.posicion_predicha, prediccion.time)
+                    if time.monotonic() - reloj < INTERVALO_RELOJ:
+                        continue
+                    reloj = time.monotonic()
+                    # El reloj sigue aunque no lleguen predicciones: vencen permanencias y cortes de señal
+                    motor.avanzar(ahora_ms())
+                    # Cambios de configuración desde el GUI
+                    if os.path.isfile(CONFIGURACION) and os.path.getmtime(CONFIGURACION) != modificado:
+                        modificado = os.path.getmtime(CONFIGURACION)
+                        configuracion.clear()
+                        configuracion.update(leer_configuracion())
+                        motor.confirmacion = configuracion.get('confirmacion', 2)
+                        motor.cambiar_reglas(crear_reglas(configuracion))
+                        print("Reglas de alertas recargadas")
+            except (EOFError, OSError):
+                print("Bus de predicciones desconectado, reintentando...")
+            finally:
+                suscriptor.cerrar()
+    finally:
+        despachador.cerrar()
+        salida.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Motor de inferencia rápido para la predicción de habitación y posición.
+
+Sustituye el camino DataFrame -> predict_proba -> predict -> inverse_transform
+por una única llamada al booster por modelo sobre un vector float32
+preasignado. La clase ganadora se obtiene con argmax sobre las
+probabilidades y se traduce con un array de etiquetas precalculado.
+Con planos=True se usan los modelos exportados por arboles_planos.py en
+lugar del booster. MotorJerarquico cambia el modelo de posición único por
+uno pequeño por habitación, que sólo se evalúa para la habitación predicha.
+"""
+
+import os
+import json
+
+import numpy as np
+import joblib
+
+from arboles_planos import ArbolesPlanos, ruta_plana
+
+# Valor que se usa cuando un receptor no ha visto la pulsera
+RSSI_AUSENTE = -150
+
+
+class ClasificadorRapido:
+    """Envuelve un XGBClassifier entrenado para puntuar filas ya vectorizadas."""
+
+    def __init__(self, modelo, label_encoder):
+        self.booster = modelo.get_booster()
+        self.missing = modelo.missing
+        self.binario = modelo.n_classes_ == 2
+        # Mismo rango de árboles que usa el wrapper de sklearn
+        try:
+            self.iteration_range = (0, modelo.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+        # índice de clase -> etiqueta original (equivale a inverse_transform)
+        self.etiquetas = np.asarray(label_encoder.classes_)[modelo.classes_].tolist()
+        self.columnas = list(self.booster.feature_names or [])
+
+    def probabilidades(self, X):
+        """Devuelve la matriz (n_filas, n_clases) igual que predict_proba."""
+        proba = self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            missing=self.missing,
+            validate_features=False
+        )
+        if self.binario:
+            proba = np.column_stack((1.0 - proba, proba))
+        return proba
+
+    def clasificar(self, X):
+        """Devuelve (etiqueta, probabilidad máxima) de la primera fila de X."""
+        proba = self.probabilidades(X)[0]
+        idx = int(proba.argmax())
+        return self.etiquetas[idx], float(proba[idx])
+
+
+class ClasificadorPlano(ClasificadorRapido):
+    """Como ClasificadorRapido, pero evaluando los árboles exportados (ArbolesPlanos)."""
+
+    def __init__(self, planos, label_encoder):
+        self.planos = planos
+        self.etiquetas = np.asarray(label_encoder.classes_)[planos.clases].tolist()
+        self.columnas = planos.columnas
+
+    def probabilidades(self, X):
+        return self.planos.probabilidades(X)
+
+
+class MotorInferencia:
+    """
+    Predice habitación y posición para una fila de RSSI con las mismas reglas
+    que prediccion.py: umbrales de confianza independientes, posición "Duda"
+    si la habitación es "Duda" y coherencia posición/habitación.
+    """
+
+    def __init__(self, clasificador_habitacion, clasificador_posicion,
+                 posiciones_por_habitacion, umbral_habitacion, umbral_posicion,
+                 columnas=None):
+        self.habitacion = clasificador_habitacion
+        self.posicion = clasificador_posicion
+        self.posiciones_por_habitacion = posiciones_por_habitacion
+        self.umbral_habitacion = umbral_habitacion
+        self.umbral_posicion = umbral_posicion
+
+        # Orden fijo de receptores: el del booster, o el indicado si no lo guarda
+        self.columnas = list(columnas or clasificador_habitacion.columnas)
+        if not self.columnas:
+            raise ValueError("El modelo no guarda nombres de columnas; indica 'columnas'")
+        self.indices = [(esp, i) for i, esp in enumerate(self.columnas)]
+        self.vector = np.full((1, len(self.columnas)), RSSI_AUSENTE, dtype=np.float32)
+
+        # Si el modelo de posición se entrenó con otro orden, se reordena
+        columnas_pos = clasificador_posicion.columnas if clasificador_posicion is not None else None
+        if columnas_pos and columnas_pos != self.columnas:
+            self.permutacion_posicion = np.array([self.columnas.index(c) for c in columnas_pos])
+        else:
+            self.permutacion_posicion = None
+
+    @classmethod
+    def desde_ficheros(cls, ruta_modelo_habitacion, ruta_encoder_habitacion,
+                       ruta_modelo_posicion, ruta_encoder_posicion, planos=False, **kwargs):
+        """
+        Carga los modelos y LabelEncoders guardados por xgboostmodel.py. Con
+        planos=True usa el .npz de arboles_planos.py de cada modelo si existe
+        y es más reciente que el .pkl.
+        """
+        habitacion = _cargar_clasificador(ruta_modelo_habitacion, ruta_encoder_habitacion, planos)
+        posicion = _cargar_clasificador(ruta_modelo_posicion, ruta_encoder_posicion, planos)
+        return cls(habitacion, posicion, **kwargs)
+
+    def copia(self):
+        """Motor con los mismos boosters y su propio vector, para usarlo desde otro hilo."""
+        return MotorInferencia(
+            self.habitacion, self.posicion,
+            posiciones_por_habitacion=self.posiciones_por_habitacion,
+            umbral_habitacion=self.umbral_habitacion,
+            umbral_posicion=self.umbral_posicion,
+            columnas=self.columnas
+        )
+
+    def predecir(self, fila):
+        """Rellena el vector preasignado con la fila {receptor: rssi} y predice."""
+        vector = self.vector[0]
+        for esp, i in self.indices:
+            vector[i] = fila.get(esp, RSSI_AUSENTE)
+        return self.predecir_vector(self.vector)
+
+    def predecir_valores(self, valores):
+        """Predice a partir de una secuencia de RSSI ya ordenada como self.columnas."""
+        self.vector[0, :] = valores
+        return self.predecir_vector(self.vector)
+
+    def predecir_vector(self, X):
+        """Predice a partir de un array (1, n_receptores) en el orden de self.columnas."""
+        habitacion, proba_hab = self.habitacion.clasificar(X)
+        if proba_hab < self.umbral_habitacion:
+            habitacion = "Duda"
+
+        X_pos = X if self.permutacion_posicion is None else X[:, self.permutacion_posicion]
+        posicion, proba_pos = self.posicion.clasificar(X_pos)
+        if proba_pos < self.umbral_posicion:
+            posicion = "Duda"
+
+        # La posición es "Duda" si la habitación es "Duda" o no es coherente con ella
+        if habitacion == "Duda":
+            posicion = "Duda"
+        elif posicion not in self.posiciones_por_habitacion.get(habitacion, []):
+            posicion = "Duda"
+
+        return habitacion, posicion
+
+
+class MotorJerarquico(MotorInferencia):
+    """
+    Primero la habitación y después la posición con el modelo de esa
+    habitación (xgboostmodel.entrenar_por_habitacion), que sólo conoce sus
+    posiciones: la posición nunca es incoherente con la habitación y, si la
+    habitación es "Duda", no se evalúa ningún modelo de posición.
+
+    `posiciones[habitacion]` es un clasificador, o la etiqueta si la
+    habitación sólo tiene una posición.
+    """
+
+    def __init__(self, clasificador_habitacion, posiciones, posiciones_por_habitacion,
+                 umbral_habitacion, umbral_posicion, columnas=None):
+        super().__init__(clasificador_habitacion, None, posiciones_por_habitacion,
+                         umbral_habitacion, umbral_posicion, columnas)
+        self.posiciones = posiciones
+        for habitacion, clasificador in posiciones.items():
+            if not isinstance(clasificador, str) and clasificador.columnas not in ([], self.columnas):
+                raise ValueError(f"El modelo de posición de '{habitacion}' usa otro orden de receptores")
+
+    @classmethod
+    def desde_ficheros(cls, ruta_modelo_habitacion, ruta_encoder_habitacion, ruta_indice_posiciones,
+                       planos=False, **kwargs):
+        """Carga el modelo de habitación y los de posición del índice que escribe xgboostmodel.py."""
+        habitacion = _cargar_clasificador(ruta_modelo_habitacion, ruta_encoder_habitacion, planos)
+        carpeta = os.path.dirname(ruta_indice_posiciones)
+        with open(ruta_indice_posiciones, encoding='utf-8') as f:
+            indice = json.load(f)
+        posiciones = {}
+        for nombre, entrada in indice.items():
+            if 'constante' in entrada:
+                posiciones[nombre] = entrada['constante']
+            else:
+                posiciones[nombre] = _cargar_clasificador(os.path.join(carpeta, entrada['modelo']),
+                                                          os.path.join(carpeta, entrada['encoder']), planos)
+        return cls(habitacion, posiciones, **kwargs)
+
+    def copia(self):
+        return MotorJerarquico(
+            self.habitacion, self.posiciones,
+            posiciones_por_habitacion=self.posiciones_por_habitacion,
+            umbral_habitacion=self.umbral_habitacion,
+            umbral_posicion=self.umbral_posicion,
+            columnas=self.columnas
+        )
+
+    def predecir_vector(self, X):
+        habitacion, proba_hab = self.habitacion.clasificar(X)
+        if proba_hab < self.umbral_habitacion:
+            return "Duda", "Duda"
+
+        clasificador = self.posiciones.get(habitacion)
+        if clasificador is None:
+            return habitacion, "Duda"
+        if isinstance(clasificador, str):
+            posicion = clasificador
+        else:
+            posicion, proba_pos = clasificador.clasificar(X)
+            if proba_pos < self.umbral_posicion:
+                posicion = "Duda"
+
+        # Las posiciones del modelo salen de los datos; se mantiene el filtro de siempre
+        if posicion not in self.posiciones_por_habitacion.get(habitacion, []):
+            posicion = "Duda"
+        return habitacion, posicion
+
+
+def _cargar_clasificador(ruta_modelo, ruta_encoder, planos):
+    ruta = ruta_plana(ruta_modelo)
+    if planos and os.path.isfile(ruta) and os.path.getmtime(ruta) >= os.path.getmtime(ruta_modelo):
+        return ClasificadorPlano(ArbolesPlanos.cargar(ruta), joblib.load(ruta_encoder))
+    if planos:
+        print(f"{ruta} no existe o es anterior al modelo; se usa el booster (python src/arboles_planos.py)")
+    return ClasificadorRapido(joblib.load(ruta_modelo), joblib.load(ruta_encoder))
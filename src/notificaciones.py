@@ -0,0 +1,226 @@
+"""
+Envío de las alertas por email en segundo plano.
+
+enviar() sólo deja la alerta en una cola acotada y vuelve al momento; un
+hilo propio se encarga de la entrega:
+
+  - Agrupa las alertas de un mismo destinatario que llegan en `ventana`
+    segundos en un solo email, y las repetidas (misma regla, pulsera y
+    mensaje) en una sola línea con el número de veces.
+  - Reutiliza la sesión SMTP (STARTTLS y login una vez) mientras haya
+    envíos y la cierra tras `inactividad` segundos sin usarla; si el
+    servidor la ha cortado, se vuelve a conectar.
+  - Si el envío falla por un error temporal, reintenta el lote con espera
+    exponencial (hasta `reintentos` veces); con un error permanente (5xx)
+    lo descarta.
+  - Limita a `max_por_periodo` emails por destinatario cada `periodo`
+    segundos; lo que llegue mientras tanto se sigue agrupando y sale en el
+    siguiente email permitido.
+
+`conectar` permite sustituir la conexión (p. ej. un servidor SMTP local de
+pruebas, ver rendimiento/bench_notificaciones.py).
+"""
+
+import time
+import smtplib
+import threading
+from collections import deque
+from email.mime.text import MIMEText
+
+from tiempo import formatear
+
+
+class Lote:
+    """Alertas pendientes de un destinatario; las repetidas comparten entrada."""
+
+    __slots__ = ('alertas', 'desde', 'listo_en', 'intentos')
+
+    def __init__(self, ahora):
+        self.alertas = {}  # (regla, address, mensaje) -> [primera alerta, repeticiones, última alerta]
+        self.desde = ahora
+        self.listo_en = 0.0
+        self.intentos = 0
+
+    def anadir(self, alerta):
+        clave = (alerta.regla, alerta.address, alerta.mensaje)
+        entrada = self.alertas.get(clave)
+        if entrada is None:
+            self.alertas[clave] = [alerta, 1, alerta]
+        else:
+            entrada[1] += 1
+            entrada[2] = alerta
+
+    def mensaje(self, remitente, destino):
+        lineas = []
+        for primera, veces, ultima in self.alertas.values():
+            linea = f"{formatear(primera.time)} - {primera.address} - {primera.mensaje}"
+            if veces > 1:
+                linea += f" (x{veces}, última {formatear(ultima.time, '%H:%M:%S')})"
+            lineas.append(linea)
+        if len(self.alertas) == 1:
+            asunto = f"[IndoorPositioning] Alerta: {next(iter(self.alertas.values()))[0].mensaje}"
+        else:
+            asunto = f"[IndoorPositioning] {len(self.alertas)} alertas"
+        msg = MIMEText("Alertas generadas:\n\n" + "\n".join(lineas))
+        msg['Subject'] = asunto
+        msg['From'] = remitente
+        msg['To'] = destino
+        return msg
+
+
+class DespachadorNotificaciones:
+
+    def __init__(self, servidor='smtp.gmail.com', puerto=587, usuario=None, clave=None, remitente=None,
+                 starttls=True, ventana=5.0, max_por_periodo=20, periodo=3600.0, reintentos=5,
+                 espera_inicial=2.0, espera_max=300.0, inactividad=60.0, capacidad=1000, conectar=None):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self.clave = clave
+        self.remitente = remitente or usuario
+        self.starttls = starttls
+        self.ventana = ventana
+        self.max_por_periodo = max_por_periodo
+        self.periodo = periodo
+        self.reintentos = reintentos
+        self.espera_inicial = espera_inicial
+        self.espera_max = espera_max
+        self.inactividad = inactividad
+        self.conectar = conectar or self._conectar
+        self.entrada = deque(maxlen=capacidad)
+        self.cond = threading.Condition()  # entrada, lotes y stats; el envío SMTP va fuera del lock
+        self.abierto = True
+        self.lotes = {}
+        self.envios = {}  # destino -> instantes de los últimos envíos (límite por periodo)
+        self.sesion = None
+        self.ultimo_uso = 0.0
+        self.stats = dict(alertas=0, emails=0, conexiones=0, reintentos=0, descartadas=0, perdidas_cola=0)
+        self.hilo = threading.Thread(target=self._bucle, name='notificaciones', daemon=True)
+        self.hilo.start()
+
+    def enviar(self, destino, alerta):
+        """Encola la alerta para `destino`; nunca espera a la entrega."""
+        if not destino:
+            return
+        with self.cond:
+            if len(self.entrada) == self.entrada.maxlen:
+                self.stats['perdidas_cola'] += 1
+            self.entrada.append((destino, alerta))
+            self.cond.notify()
+
+    def estadisticas(self):
+        with self.cond:
+            return dict(self.stats, pendientes=len(self.entrada) + sum(len(l.alertas) for l in self.lotes.values()))
+
+    def cerrar(self, timeout=10):
+        """Intenta entregar lo pendiente (sin esperar la ventana) y para el hilo."""
+        with self.cond:
+            self.abierto = False
+            self.cond.notify()
+        self.hilo.join(timeout)
+
+    def _conectar(self):
+        sesion = smtplib.SMTP(self.servidor, self.puerto, timeout=30)
+        sesion.ehlo()
+        if self.starttls:
+            sesion.starttls()
+            sesion.ehlo()
+        if self.usuario:
+            sesion.login(self.usuario, self.clave)
+        return sesion
+
+    def _bucle(self):
+        while True:
+            with self.cond:
+                espera = self._siguiente_espera()
+                if not self.entrada and self.abierto:
+                    self.cond.wait(espera)
+                abierto = self.abierto
+                nuevas = list(self.entrada)
+                self.entrada.clear()
+                ahora = time.monotonic()
+                for destino, alerta in nuevas:
+                    lote = self.lotes.get(destino)
+                    if lote is None:
+                        lote = self.lotes[destino] = Lote(ahora)
+                    lote.anadir(alerta)
+                    self.stats['alertas'] += 1
+
+            for destino in list(self.lotes):
+                lote = self.lotes[destino]
+                if abierto and ahora < max(lote.desde + self.ventana, lote.listo_en, self._permitido_en(destino, ahora)):
+                    continue
+                self._entregar(destino, lote, ahora, ultimo_intento=not abierto)
+
+            if self.sesion and (not abierto or ahora - self.ultimo_uso >= self.inactividad):
+                self._cerrar_sesion()
+            if not abierto:
+                return
+
+    def _siguiente_espera(self):
+        """Segundos hasta que algún lote pueda salir o toque cerrar la sesión ociosa."""
+        ahora = time.monotonic()
+        vencimientos = [max(l.desde + self.ventana, l.listo_en, self._permitido_en(d, ahora))
+                        for d, l in self.lotes.items()]
+        if self.sesion:
+            vencimientos.append(self.ultimo_uso + self.inactividad)
+        if not vencimientos:
+            return None
+        return max(0.0, min(vencimientos) - ahora)
+
+    def _permitido_en(self, destino, ahora):
+        envios = self.envios.get(destino)
+        if not envios:
+            return 0.0
+        while envios and envios[0] <= ahora - self.periodo:
+            envios.popleft()
+        return envios[0] + self.periodo if len(envios) >= self.max_por_periodo else 0.0
+
+    def _entregar(self, destino, lote, ahora, ultimo_intento=False):
+        msg = lote.mensaje(self.remitente, destino)
+        try:
+            self._enviar_mensaje(msg)
+        except (smtplib.SMTPException, OSError) as e:
+            self._cerrar_sesion()
+            permanente = isinstance(e, smtplib.SMTPRecipientsRefused) or (
+                isinstance(e, smtplib.SMTPResponseException) and 500 <= e.smtp_code < 600)
+            lote.intentos += 1
+            if permanente or ultimo_intento or lote.intentos > self.reintentos:
+                print(f"Email de alertas a {destino} descartado: {e}")
+                with self.cond:
+                    self.stats['descartadas'] += sum(v[1] for v in lote.alertas.values())
+                    del self.lotes[destino]
+            else:
+                self._contar('reintentos')
+                lote.listo_en = ahora + min(self.espera_max, self.espera_inicial * 2 ** (lote.intentos - 1))
+            return
+        with self.cond:
+            del self.lotes[destino]
+            self.envios.setdefault(destino, deque()).append(ahora)
+            self.stats['emails'] += 1
+
+    def _enviar_mensaje(self, msg):
+        if self.sesion is None:
+            self.sesion = self.conectar()
+            self._contar('conexiones')
+        try:
+            self.sesion.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # El servidor cerró la sesión reutilizada: una conexión nueva y un intento más
+            self.sesion = self.conectar()
+            self._contar('conexiones')
+            self.sesion.send_message(msg)
+        self.ultimo_uso = time.monotonic()
+
+    def _contar(self, contador):
+        with self.cond:
+            self.stats[contador] += 1
+
+    def _cerrar_sesion(self):
+        if self.sesion is None:
+            return
+        try:
+            self.sesion.quit()
+        except (smtplib.SMTPException, OSError):
+            self.sesion.close()
+        self.sesion = None
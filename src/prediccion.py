@@ -1,11 +1,18 @@
 import paho.mqtt.client as mqtt
 import json
-import pandas as pd
+import csv
 import threading
-import joblib
-from datetime import datetime
 import os
 
+from motor_inferencia import MotorInferencia, MotorJerarquico
+from ensamblador import EnsambladorFilas
+from temporizadores import RuedaTemporizadores
+from cola_inferencia import ColaInferencia
+from bus_predicciones import PublicadorPredicciones, Prediccion
+from tiempo import formatear
+from archivo import EscritorArchivo, esquema_predicciones, importar_anteriores
+from vitalidad import TablaVitalidad
+
 # Configuración del broker MQTT
 MQTT_BROKER = "192.168.0.190"
 MQTT_PORT = 1883
@@ -18,11 +25,8 @@ MODEL_HABITACION_PATH = 'src/logs/xgboost_habitacion_model.pkl'
 ENCODER_HABITACION_PATH = 'src/logs/xgboost_label_encoder_habitacion.pkl'
 MODEL_POSICION_PATH = 'src/logs/xgboost_posicion_model.pkl'
 ENCODER_POSICION_PATH = 'src/logs/xgboost_label_encoder_posicion.pkl'
-
-model_habitacion = joblib.load(MODEL_HABITACION_PATH)
-label_encoder_habitacion = joblib.load(ENCODER_HABITACION_PATH)
-model_posicion = joblib.load(MODEL_POSICION_PATH)
-label_encoder_posicion = joblib.load(ENCODER_POSICION_PATH)
+# Índice de los modelos de posición por habitación que entrena xgboostmodel.py
+INDICE_POSICIONES_PATH = 'src/logs/xgboost_posicion_por_habitacion.json'
 
 # Diccionario de posiciones posibles por habitación
 posiciones_por_habitacion = {
@@ -36,14 +40,50 @@ posiciones_por_habitacion = {
 umbral_confianza_habitacion = 0.40
 umbral_confianza_posicion = 0.00
 
-# Archivo donde se guardarán las predicciones
+# Árboles exportados por arboles_planos.py (.npz junto a cada .pkl); si no
+# están o son anteriores al modelo se usa el booster
+ARBOLES_PLANOS = True
+
+# Posición con el modelo pequeño de la habitación predicha (MotorJerarquico)
+# en vez del modelo de todas las posiciones, si ya están entrenados
+POSICION_POR_HABITACION = True
+
+# Motor de inferencia: un vector float32 preasignado y una llamada al booster por modelo
+if POSICION_POR_HABITACION and os.path.isfile(INDICE_POSICIONES_PATH):
+    motor = MotorJerarquico.desde_ficheros(
+        MODEL_HABITACION_PATH, ENCODER_HABITACION_PATH, INDICE_POSICIONES_PATH,
+        planos=ARBOLES_PLANOS,
+        posiciones_por_habitacion=posiciones_por_habitacion,
+        umbral_habitacion=umbral_confianza_habitacion,
+        umbral_posicion=umbral_confianza_posicion
+    )
+else:
+    motor = MotorInferencia.desde_ficheros(
+        MODEL_HABITACION_PATH, ENCODER_HABITACION_PATH,
+        MODEL_POSICION_PATH, ENCODER_POSICION_PATH,
+        planos=ARBOLES_PLANOS,
+        posiciones_por_habitacion=posiciones_por_habitacion,
+        umbral_habitacion=umbral_confianza_habitacion,
+        umbral_posicion=umbral_confianza_posicion
+    )
+
+# Archivo donde se guardarán las predicciones (persistencia opcional; los
+# consumidores en vivo las reciben por el bus de predicciones)
 OUTPUT_CSV = 'src/logs/predicciones_xgboost.csv'
+GUARDAR_CSV = True
+# Archivo Parquet por días para las exportaciones por rango del GUI (archivo.py)
+ARCHIVO_PREDICCIONES = 'src/logs/archivo/predicciones'
+GUARDAR_ARCHIVO = True
 
 # Estructuras de datos globales
-current_row = None
-row_lock = threading.RLock()
-timeout_thread = None
+salida_lock = threading.Lock()  # el CSV se comparte entre los hilos de inferencia
 TIMEOUT_SECONDS = 3
+
+# Cola entre la recepción MQTT y los hilos de inferencia
+HILOS_INFERENCIA = 2
+CAPACIDAD_COLA = 1000
+POLITICA_COLA = 'descartar_antiguo'  # o 'bloquear' para frenar la lectura MQTT
+INTERVALO_ESTADISTICAS = 30  # segundos entre informes de la cola
 esp32_ids = {
     'receivers/1': 'ESP32_1',
     'receivers/2': 'ESP32_2',
@@ -58,6 +98,12 @@ esp32_ids = {
 }
 all_esp32_ids = list(esp32_ids.values())
 
+# Vitalidad de receptores y pulseras (vitalidad.py): segundos sin mensajes
+# antes de avisar de un receptor caído o de una pulsera que nadie ve
+PLAZO_RECEPTOR = 30
+PLAZO_PULSERA = 60
+EVENTOS_VITALIDAD_CSV = 'src/logs/vitalidad.csv'
+
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         print("Conectado al broker MQTT")
@@ -66,8 +112,6 @@ def on_connect(client, userdata, flags, rc):
         print("Error al conectar, código de error:", rc)
 
 def on_message(client, userdata, msg):
-    global current_row, timeout_thread
-
     try:
         data = json.loads(msg.payload.decode())
         esp32_id = esp32_ids.get(msg.topic)
@@ -76,93 +120,99 @@ def on_message(client, userdata, msg):
             return
 
         rssi = int(data.get('rssi', -150))  # Valor predeterminado para RSSI
+        address = data.get('address', 'desconocida')  # Pulsera vista por el receptor
 
-        with row_lock:
-            if current_row is None:
-                current_row = {esp_id: -150 for esp_id in all_esp32_ids}
-                current_row['time'] = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-                print("Nueva fila creada")
-
-                # Iniciar temporizador
-                timeout_thread = threading.Timer(TIMEOUT_SECONDS, predict_position)
-                timeout_thread.start()
-
-            current_row[esp32_id] = rssi
+        vitalidad.visto(esp32_id, address)
 
-            # Si se reciben todos los datos antes del timeout, forzar predicción
-            if all(value != -150 for key, value in current_row.items() if key != 'time'):
-                print("Todos los datos recibidos antes del timeout.")
-                predict_position()
+        # La fila de cada pulsera se cierra sola al completarse o al vencer el timeout
+        # y pasa a la cola de inferencia; aquí nunca se ejecutan los modelos
+        ensamblador.anadir(address, esp32_id, rssi)
 
     except Exception as e:
         print("Error al procesar el mensaje:", e)
 
-def predict_position():
-    global current_row, timeout_thread
-
-    with row_lock:
-        if current_row is not None:
-            df = pd.DataFrame([current_row])
-
-            try:
-                feature_columns = [col for col in df.columns if col.startswith('ESP32_')]
-                X = df[feature_columns]
-
-                # Predicción habitación con probabilidades
-                prediction_habitacion_proba = model_habitacion.predict_proba(X)
-                max_proba_hab = prediction_habitacion_proba.max(axis=1)[0]
-
-                if max_proba_hab >= umbral_confianza_habitacion:
-                    # Confianza suficiente en la habitación
-                    prediction_habitacion = model_habitacion.predict(X)
-                    predicted_habitacion_label = label_encoder_habitacion.inverse_transform(prediction_habitacion)[0]
-                else:
-                    # No hay suficiente confianza en la habitación
-                    predicted_habitacion_label = "Duda"
-
-                # Predicción posición con probabilidades
-                prediction_posicion_proba = model_posicion.predict_proba(X)
-                max_proba_pos = prediction_posicion_proba.max(axis=1)[0]
-
-                if max_proba_pos >= umbral_confianza_posicion:
-                    # Confianza suficiente en la posición
-                    prediction_posicion = model_posicion.predict(X)
-                    predicted_posicion_label = label_encoder_posicion.inverse_transform(prediction_posicion)[0]
-                else:
-                    # Confianza insuficiente en la posición
-                    predicted_posicion_label = "Duda"
-
-               #CAMBIO PARA QUE LA POSICIÓN SEA DUDA SI LA HABITACIÓN ES DUDA     
-                # Fuerza la posición a "Duda" si la habitación es "Duda"
-                if predicted_habitacion_label == "Duda":
-                    predicted_posicion_label = "Duda"
-                else:
-                    # Si la habitación no es duda, verificamos coherencia
-                    posiciones_validas = posiciones_por_habitacion.get(predicted_habitacion_label, [])
-                    if predicted_posicion_label not in posiciones_validas and predicted_posicion_label != "Duda":
-                        predicted_posicion_label = "Duda"
-
-                # Añadir las predicciones al DataFrame
-                df['habitacion_predicha'] = predicted_habitacion_label
-                df['posicion_predicha'] = predicted_posicion_label
-
-                # Mostrar las predicciones
-                timestamp = df['time'].iloc[0]
-                print(f"{timestamp} - Habitación predicha: {predicted_habitacion_label}, Posición predicha: {predicted_posicion_label}")
-
-                # Guardar la fila en el archivo CSV
-                if not os.path.isfile(OUTPUT_CSV):
-                    df.to_csv(OUTPUT_CSV, index=False, mode='w')
-                else:
-                    df.to_csv(OUTPUT_CSV, index=False, mode='a', header=False)
-
-            except Exception as e:
-                print("Error al realizar la predicción:", e)
-
-            current_row = None
-            if timeout_thread is not None:
-                timeout_thread.cancel()
-                timeout_thread = None
+def crear_predictor():
+    """Devuelve la función de predicción de un hilo de inferencia, con su propio motor."""
+    motor_hilo = motor.copia()
+
+    def predict_position(fila):
+        """Predice y guarda una fila ya cerrada (FilaEtiqueta) de una pulsera."""
+        try:
+            predicted_habitacion_label, predicted_posicion_label = motor_hilo.predecir_valores(fila.rssi)
+
+            # Mostrar las predicciones
+            print(f"{formatear(fila.time)} - {fila.address} - Habitación predicha: {predicted_habitacion_label}, Posición predicha: {predicted_posicion_label}")
+
+            # Publicar en el bus para los consumidores en vivo
+            publicador.publicar(Prediccion(
+                fila.time, fila.address, predicted_habitacion_label, predicted_posicion_label,
+                dict(zip(ensamblador.receptores, fila.rssi))
+            ))
+
+            salida = list(fila.rssi) + [fila.time, fila.address, predicted_habitacion_label, predicted_posicion_label]
+            if archivo:
+                archivo.anadir(salida)
+
+            if not GUARDAR_CSV:
+                return
+
+            # Guardar la fila en el archivo CSV
+            with salida_lock:
+                escribir_cabecera = not os.path.isfile(OUTPUT_CSV)
+                with open(OUTPUT_CSV, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    if escribir_cabecera:
+                        writer.writerow(ensamblador.receptores + ['time', 'address', 'habitacion_predicha', 'posicion_predicha'])
+                    writer.writerow(salida)
+
+        except Exception as e:
+            print("Error al realizar la predicción:", e)
+
+    return predict_position
+
+def registrar_vitalidad(evento):
+    """Muestra y guarda un evento de la tabla de vitalidad."""
+    print(f"{formatear(evento.time)} - {evento.tipo}: {evento.nombre} ({evento.segundos:.0f} s)")
+    with salida_lock:
+        escribir_cabecera = not os.path.isfile(EVENTOS_VITALIDAD_CSV)
+        with open(EVENTOS_VITALIDAD_CSV, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if escribir_cabecera:
+                writer.writerow(['time', 'tipo', 'nombre', 'segundos'])
+            writer.writerow([evento.time, evento.tipo, evento.nombre, round(evento.segundos, 1)])
+
+def informar_cola():
+    """Muestra la profundidad y el retraso de la cola y se vuelve a programar."""
+    e = cola.estadisticas(reiniciar=True)
+    print(f"Cola de inferencia: profundidad={e['profundidad']}, lag medio={e['lag_medio_ms']:.1f} ms, "
+          f"lag máx={e['lag_max_ms']:.1f} ms, procesadas={e['procesados']}, descartadas={e['descartados']}")
+    caidos = vitalidad.estado()['receptores_caidos']
+    if caidos:
+        print(f"Receptores sin señal: {', '.join(caidos)}")
+    if archivo:
+        archivo.volcar_si_toca()  # también en los ratos sin predicciones
+    rueda.programar(INTERVALO_ESTADISTICAS, informar_cola)
+
+publicador = PublicadorPredicciones()
+archivo = None
+if GUARDAR_ARCHIVO:
+    # La primera vez, las predicciones del CSV de antes de archivar
+    importar_anteriores(OUTPUT_CSV, ARCHIVO_PREDICCIONES, esquema_predicciones(motor.columnas))
+    archivo = EscritorArchivo(ARCHIVO_PREDICCIONES, esquema_predicciones(motor.columnas))
+# Las filas de una pulsera van siempre al mismo hilo, para que se publiquen y
+# guarden en orden (los detectores por pulsera no admiten tiempos hacia atrás)
+cola = ColaInferencia(crear_predictor, HILOS_INFERENCIA, CAPACIDAD_COLA, POLITICA_COLA,
+                      clave=lambda fila: fila.address)
+
+# Un único hilo atiende los tiempos de espera de todas las filas abiertas
+rueda = RuedaTemporizadores()
+rueda.programar(INTERVALO_ESTADISTICAS, informar_cola)
+
+# Última vez vista de cada receptor y pulsera; las caídas las vence la misma rueda
+vitalidad = TablaVitalidad(all_esp32_ids, PLAZO_RECEPTOR, PLAZO_PULSERA, registrar_vitalidad, rueda)
+
+# Filas abiertas por pulsera, en el mismo orden de receptores que usa el motor
+ensamblador = EnsambladorFilas(motor.columnas, TIMEOUT_SECONDS, cola.poner, rueda)
 
 client = mqtt.Client()
 client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
@@ -179,4 +229,8 @@ try:
     client.loop_forever()
 except KeyboardInterrupt:
     print("\nInterrupción del programa por el usuario. Cerrando conexión...")
-    client.disconnect()
\ No newline at end of file
+    client.disconnect()
+    cola.detener()  # terminar las predicciones ya encoladas
+    publicador.cerrar()
+    if archivo:
+        archivo.cerrar()
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Productor de fotogramas del GUI, compartido por todas las sesiones.
+
+Un único hilo por proceso lee el CSV (DatosGUI), dibuja el mapa y, si algo
+ha cambiado, publica el resultado como un Fotograma
+inmutable. Cada pestaña del navegador sólo espera al siguiente fotograma y
+lo envía a sus placeholders, así que el coste de lectura y dibujo no crece
+con el número de personas mirando. En el GUI se crea una sola vez con st.cache_resource.
+"""
+
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+
+class Fotograma(NamedTuple):
+    version: int
+    tabla: pd.DataFrame
+    mapa: Optional[bytes]        # PNG
+    rssi: pd.DataFrame           # historial de RSSI por receptor, para el gráfico
+    posicion_estable: Optional[tuple]
+    error: Optional[str] = None
+
+
+class ProductorFotogramas:
+    """
+    `renderizar(fila, posicion_estable)` devuelve el PNG del mapa para la
+    última fila; se llama una vez por tick desde el hilo del productor y debe
+    devolver el mismo objeto bytes si la imagen no ha cambiado, para no
+    reenviarla a las sesiones.
+    """
+
+    def __init__(self, datos, renderizar, intervalo=1.0):
+        self.datos = datos
+        self.renderizar = renderizar
+        self.intervalo = intervalo
+        self.cond = threading.Condition()
+        self.fotograma = Fotograma(0, pd.DataFrame(), None, pd.DataFrame(), None)
+        self.activo = True
+        self.hilo = threading.Thread(target=self._bucle, name='gui-productor', daemon=True)
+        self.hilo.start()
+
+    def esperar(self, version, timeout=None):
+        """Devuelve el primer fotograma posterior a `version`, o el actual si vence `timeout`."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.fotograma.version > version or not self.activo, timeout)
+            return self.fotograma
+
+    def detener(self):
+        with self.cond:
+            self.activo = False
+            self.cond.notify_all()
+        self.hilo.join(timeout=5)
+
+    def _bucle(self):
+        while self.activo:
+            inicio = time.monotonic()
+            self._producir()
+            # Espera al siguiente tick; detener() la interrumpe
+            with self.cond:
+                self.cond.wait_for(lambda: not self.activo,
+                                   max(0.0, self.intervalo - (time.monotonic() - inicio)))
+
+    def _producir(self):
+        anterior = self.fotograma
+        try:
+            self.datos.actualizar()
+            tabla = self.datos.ultimas_filas()
+            posicion = self.datos.posicion_estable
+            # El mapa se pide en cada tick aunque no haya filas nuevas: las transiciones se desvanecen
+            mapa = self.renderizar(tabla.iloc[-1], posicion) if not tabla.empty else None
+            rssi = self.datos.historial.tabla()
+            if (tabla is anterior.tabla and mapa is anterior.mapa and rssi is anterior.rssi
+                    and posicion == anterior.posicion_estable and anterior.error is None):
+                return
+            fotograma = Fotograma(anterior.version + 1, tabla, mapa, rssi, posicion)
+        except Exception as e:
+            fotograma = anterior._replace(version=anterior.version + 1, error=str(e))
+        with self.cond:
+            self.fotograma = fotograma
+            self.cond.notify_all()
@@ -0,0 +1,84 @@
+"""
+Escritor del CSV de acciones detectadas.
+
+Mantiene el fichero abierto y acumula las filas en memoria; las vuelca al
+disco cuando se juntan `max_filas` o la fila pendiente más antigua lleva
+`max_segundos` esperando, con fsync opcional. Conserva la garantía de timestamps
+estrictamente crecientes en el log para cada persona (pulsera).
+
+La columna time va en ms epoch, como en el resto del pipeline; la fecha y
+la hora legibles se generan al mostrarlo o exportarlo (tiempo.formatear).
+
+Con `archivo` (un archivo.EscritorArchivo) cada acción se guarda también en
+el archivo Parquet por días, que conserva la historia entre ejecuciones y
+permite al GUI exportar un rango sin leer todo el log.
+"""
+
+import csv
+import os
+import time
+
+CABECERA = ['time', 'Tipo', 'Descripción', 'address']
+
+
+class RegistroAcciones:
+
+    def __init__(self, ruta, nuevo=True, max_filas=50, max_segundos=1.0, fsync=False, archivo=None):
+        """Con `nuevo` se sustituye el log anterior; si no, se añade al existente."""
+        self.max_filas = max_filas
+        self.max_segundos = max_segundos
+        self.fsync = fsync
+        self.archivo = archivo
+        self.f = open(ruta, 'w' if nuevo else 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.f)
+        self.pendientes = []
+        self.primer_pendiente = None  # instante en que llegó la fila pendiente más antigua
+        # Para asegurar timestamps crecientes en el log, por pulsera
+        self.last_action_time_logged = {}
+        if self.f.tell() == 0:
+            self.pendientes.append(CABECERA)
+            self.volcar()
+
+    def escribir(self, descripcion, ts, action_type, address=None):
+        """
+        Añade una fila time (ms epoch), Tipo, Descripción, address.
+        Si el timestamp no avanza respecto a la fila anterior de la misma
+        pulsera, lo empuja 1 segundo. Devuelve el timestamp finalmente registrado.
+        """
+        anterior = self.last_action_time_logged.get(address)
+        if anterior and ts <= anterior:
+            ts = anterior + 1000
+        self.last_action_time_logged[address] = ts
+
+        if not self.pendientes:
+            self.primer_pendiente = time.monotonic()
+        self.pendientes.append([ts, action_type, descripcion, address or ''])
+        if self.archivo:
+            self.archivo.anadir(self.pendientes[-1])
+        if len(self.pendientes) >= self.max_filas:
+            self.volcar()
+        else:
+            self.volcar_si_toca()
+        return ts
+
+    def volcar_si_toca(self):
+        """Vuelca lo pendiente si ha vencido el plazo; llamarlo también en los ratos sin acciones."""
+        if self.pendientes and time.monotonic() - self.primer_pendiente >= self.max_segundos:
+            self.volcar()
+        if self.archivo:
+            self.archivo.volcar_si_toca()
+
+    def volcar(self):
+        if self.pendientes:
+            self.writer.writerows(self.pendientes)
+            self.pendientes.clear()
+            self.f.flush()
+            if self.fsync:
+                os.fsync(self.f.fileno())
+        self.primer_pendiente = None
+
+    def cerrar(self):
+        self.volcar()
+        self.f.close()
+        if self.archivo:
+            self.archivo.cerrar()
@@ -0,0 +1,105 @@
+"""
+Rendimiento del motor de alertas (motor_alertas.py) con muchas pulseras.
+
+Primero comprueba un caso conocido con una pulsera: entra en el baño y se
+queda 20 minutos (una alerta de permanencia), sigue en el dormitorio
+pasadas las 9:00 (una alerta de franja) y deja de enviar señal (una alerta
+de sin_senal). Después simula --horas horas (la décima parte con más de
+1000 pulseras) para cada número de pulseras de --sujetos, cada una con una
+predicción cada 3 s, cambios de habitación y cortes de señal, con las
+reglas por defecto más --reglas-extra reglas de permanencia y sin_senal, y
+mide predicciones y evaluaciones de reglas por segundo.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_alertas.py [--sujetos 100 1000 10000] [--horas 1]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from motor_alertas import (MotorAlertas, CONFIGURACION_POR_DEFECTO, crear_reglas,  # noqa: E402
+                           Permanencia, SinSenal)
+
+PARES = [('Dormitorio', 'Cama'), ('Salon', 'Sofa'), ('Cocina', 'Fregadero'), ('Baño', 'WC'), ('Pasillo', 'Pasillo')]
+
+
+def ms(fecha):
+    return int(fecha.timestamp() * 1000)
+
+
+def caso_conocido():
+    alertas = []
+    motor = MotorAlertas(crear_reglas(CONFIGURACION_POR_DEFECTO), al_disparar=alertas.append)
+    t = ms(datetime.datetime(2025, 3, 10, 8, 0))
+    for k in range(20 * 20):  # 20 minutos en el baño
+        motor.prediccion('a', 'Baño', 'WC', t + 3000 * k)
+    t += 20 * 60000
+    for k in range(90 * 20):  # hasta las 9:50 en el dormitorio
+        motor.prediccion('a', 'Dormitorio', 'Cama', t + 3000 * k)
+    motor.avanzar(t + 90 * 60000 + 10 * 60000)  # 10 minutos sin señal
+    reglas = sorted(a.regla for a in alertas)
+    ok = reglas == ['bano_largo', 'no_levantado', 'sin_senal']
+    print(f"Caso conocido: {', '.join(reglas)} -> {'bien' if ok else 'MAL'}")
+    return ok
+
+
+def medir(n_sujetos, horas, reglas_extra, rng):
+    configuracion = dict(CONFIGURACION_POR_DEFECTO)
+    reglas = crear_reglas(configuracion)
+    for i in range(reglas_extra):
+        if i % 2:
+            reglas.append(SinSenal(f'sin_senal_{i}', 'Sin señal', 60 + i))
+        else:
+            reglas.append(Permanencia(f'permanencia_{i}', 'Demasiado tiempo', PARES[i % len(PARES)][0], 5 + i))
+    alertas = []
+    motor = MotorAlertas(reglas, al_disparar=alertas.append)
+
+    sujetos = [f'{i:012x}' for i in range(n_sujetos)]
+    estado = {s: rng.randrange(len(PARES)) for s in sujetos}
+    silencio = {s: 0 for s in sujetos}
+    inicio = ms(datetime.datetime(2025, 3, 10, 6, 0))
+    pasos = int(horas * 1200)
+    predicciones = 0
+    t0 = time.perf_counter()
+    for paso in range(pasos):
+        base = inicio + 3000 * paso
+        for i, s in enumerate(sujetos):
+            if silencio[s]:
+                silencio[s] -= 1
+                continue
+            r = rng.random()
+            if r < 0.003:
+                estado[s] = rng.randrange(len(PARES))
+            elif r < 0.0035:
+                silencio[s] = 100  # 5 minutos sin señal
+            hab, pos = PARES[estado[s]] if r > 0.02 else ('Duda', 'Duda')
+            motor.prediccion(s, hab, pos, base + i * 3000 // n_sujetos)
+            predicciones += 1
+    t = time.perf_counter() - t0
+    return predicciones, motor.evaluaciones, len(alertas), t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sujetos', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--horas', type=float, default=1)
+    parser.add_argument('--reglas-extra', type=int, default=8)
+    args = parser.parse_args()
+
+    if not caso_conocido():
+        sys.exit(1)
+    rng = random.Random(0)
+    print(f"{'sujetos':>8} {'predicciones':>13} {'pred/s':>10} {'evaluaciones/s':>15} {'alertas':>8}")
+    for n in args.sujetos:
+        horas = args.horas if n <= 1000 else args.horas / 10
+        predicciones, evaluaciones, alertas, t = medir(n, horas, args.reglas_extra, rng)
+        print(f"{n:>8} {predicciones:>13} {predicciones / t:>10.0f} {evaluaciones / t:>15.0f} {alertas:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Árboles planos (arboles_planos.py) frente a XGBoost para puntuar una fila.
+
+Entrena sobre datos sintéticos (ver bench_busqueda.py) los dos modelos con
+los parámetros de xgboostmodel.py (habitación 300 árboles de profundidad 4,
+posición 600 de profundidad 6, por clase), o usa los de --logs, y los
+exporta. Comprueba con --filas filas que las probabilidades coinciden con
+predict_proba y que MotorInferencia da las mismas etiquetas con y sin
+árboles planos. Después mide la latencia por fila (p50/p99) de:
+
+  - predict_proba del XGBClassifier (el wrapper de sklearn),
+  - ClasificadorRapido (inplace_predict sobre el booster, lo que usa hoy
+    prediccion.py),
+  - ArbolesPlanos con una fila y con lotes de --lote filas.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_arboles_planos.py [--filas 3000] [--lote 16] [--logs src/logs]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import xgboostmodel  # noqa: E402
+from arboles_planos import ArbolesPlanos, comprobar, exportar, ruta_plana  # noqa: E402
+from motor_inferencia import MotorInferencia, ClasificadorRapido, RSSI_AUSENTE  # noqa: E402
+from bench_busqueda import datos_sinteticos, POSICIONES_POR_HABITACION  # noqa: E402
+
+OBJETIVOS = ('habitacion', 'posicion')
+
+
+def entrenar_sinteticos(carpeta):
+    ruta = os.path.join(carpeta, 'datos.csv')
+    datos_sinteticos(20000).to_csv(ruta, index=False)
+    xgboostmodel.entrenar(*xgboostmodel.cargar_datos(ruta), carpeta=carpeta)
+
+
+def filas_prueba(n, columnas, semilla=2):
+    rng = np.random.default_rng(semilla)
+    X = rng.uniform(-100, -40, (n, columnas)).astype(np.float32)
+    X[rng.random(X.shape) < 0.3] = RSSI_AUSENTE
+    return X
+
+
+def latencias(funcion, X, lote=1):
+    tiempos = []
+    for i in range(0, len(X) - lote + 1, lote):
+        t0 = time.perf_counter()
+        funcion(X[i:i + lote])
+        tiempos.append((time.perf_counter() - t0) / lote)
+    tiempos = np.array(tiempos[10:]) * 1e6  # sin las primeras (calentamiento)
+    return np.percentile(tiempos, 50), np.percentile(tiempos, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', default=None, help='carpeta con los .pkl; por defecto se entrenan sintéticos')
+    parser.add_argument('--filas', type=int, default=3000)
+    parser.add_argument('--lote', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        logs = args.logs
+        if logs is None:
+            entrenar_sinteticos(carpeta)
+            logs = carpeta
+        ok = not exportar(logs)
+        print()
+
+        rutas = [os.path.join(logs, f'xgboost_{o}_model.pkl') for o in OBJETIVOS]
+        encoders = [os.path.join(logs, f'xgboost_label_encoder_{o}.pkl') for o in OBJETIVOS]
+        for objetivo, ruta, ruta_encoder in zip(OBJETIVOS, rutas, encoders):
+            modelo = joblib.load(ruta)
+            planos = ArbolesPlanos.cargar(ruta_plana(ruta))
+            rapido = ClasificadorRapido(modelo, joblib.load(ruta_encoder))
+            X = filas_prueba(args.filas, len(planos.columnas))
+            diferencia, mismas = comprobar(modelo, planos, X)
+            ok &= mismas and diferencia < 1e-5
+            print(f"{objetivo}: {planos.n_arboles} árboles, profundidad {planos.profundidad}; "
+                  f"máx. diferencia con predict_proba {diferencia:.1e}, mismas clases: {'sí' if mismas else 'NO'}")
+            for nombre, funcion, lote in (('XGBClassifier.predict_proba', modelo.predict_proba, 1),
+                                          ('ClasificadorRapido', rapido.probabilidades, 1),
+                                          ('ArbolesPlanos', planos.probabilidades, 1),
+                                          (f'ArbolesPlanos (lote {args.lote})', planos.probabilidades, args.lote)):
+                p50, p99 = latencias(funcion, X, lote)
+                print(f"  {nombre:<28} p50 {p50:8.1f} µs/fila  p99 {p99:8.1f} µs/fila")
+
+        # Mismas etiquetas finales con el motor completo
+        comun = dict(posiciones_por_habitacion=POSICIONES_POR_HABITACION, umbral_habitacion=0.40, umbral_posicion=0.0)
+        booster = MotorInferencia.desde_ficheros(rutas[0], encoders[0], rutas[1], encoders[1], **comun)
+        plano = MotorInferencia.desde_ficheros(rutas[0], encoders[0], rutas[1], encoders[1], planos=True, **comun)
+        X = filas_prueba(args.filas, len(booster.columnas), semilla=3)
+        distintas = sum(booster.predecir_valores(x) != plano.predecir_valores(x) for x in X)
+        t_booster = latencias(lambda x: booster.predecir_valores(x[0]), X)
+        t_plano = latencias(lambda x: plano.predecir_valores(x[0]), X)
+        ok &= distintas == 0
+        print(f"\nMotorInferencia (habitación + posición): {distintas} etiquetas distintas; "
+              f"booster p50 {t_booster[0]:.1f} µs p99 {t_booster[1]:.1f} µs, "
+              f"planos p50 {t_plano[0]:.1f} µs p99 {t_plano[1]:.1f} µs")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Exportación de un día con el archivo Parquet por días (archivo.py) frente a
+leer el CSV completo, con historias de distinta longitud.
+
+Para cada número de días de --dias genera un CSV de predicciones sintético
+(una fila cada 3 s, con rachas, filas "Duda" y pares no válidos) y uno de
+acciones, los importa al archivo y exporta un día del medio por las dos
+vías: intervalos de posición y habitación (generar_intervalos_separados) y
+acciones del rango. Comprueba que los resultados son idénticos. Con el
+archivo el tiempo no debería crecer con la historia.
+
+Antes mide el escritor en vivo: añade un día de filas una a una con volcados
+pequeños, para forzar la fusión de ficheros, y comprueba que no se pierde
+ninguna.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_archivo.py [--dias 7 30 90]
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from archivo import (ArchivoDiario, EscritorArchivo, ESQUEMA_ACCIONES, esquema_predicciones,  # noqa: E402
+                     importar_csv, MS_POR_DIA)
+from intervalos import VALID_POSITIONS_BY_ROOM, generar_intervalos_separados  # noqa: E402
+from tiempo import a_ms  # noqa: E402
+
+RECEPTORES = [f'ESP32_{i}' for i in range(1, 11)]
+FILAS_POR_DIA = 28800
+INICIO = 1735689600000  # 1/1/2025 UTC
+
+
+def generar_predicciones(ruta, dias, semilla=0):
+    rng = np.random.default_rng(semilla)
+    n = dias * FILAS_POR_DIA
+    pares = [(h, p) for h, ps in VALID_POSITIONS_BY_ROOM.items() for p in ps]
+    pares += [('Duda', 'Duda'), ('Salon', 'Duda'), ('Cocina', 'Cama')]
+    rachas = rng.integers(1, 200, size=n // 2 + 1)
+    idx = np.repeat(rng.integers(len(pares), size=len(rachas)), rachas)[:n]
+    df = pd.DataFrame({r: rng.integers(-100, -40, size=n) for r in RECEPTORES})
+    df['time'] = INICIO + 3000 * np.arange(n) + rng.integers(0, 1000, size=n)
+    df['address'] = 'e34ce8b466a0'
+    df['habitacion_predicha'] = [pares[i][0] for i in idx]
+    df['posicion_predicha'] = [pares[i][1] for i in idx]
+    df.to_csv(ruta, index=False)
+    return df
+
+
+def generar_acciones(ruta, dias, semilla=1):
+    rng = np.random.default_rng(semilla)
+    n = dias * 720
+    pd.DataFrame({
+        'time': INICIO + np.cumsum(rng.integers(1000, 240000, size=n)),
+        'Tipo': rng.choice(['Entrada', 'Salida', 'Actividad'], size=n),
+        'Descripción': rng.choice(['Entra en la Cocina', 'Sale del Baño', 'Está estudiando'], size=n),
+        'address': 'e34ce8b466a0',
+    }).to_csv(ruta, index=False)
+
+
+def medir_escritor(carpeta):
+    esquema = esquema_predicciones(RECEPTORES)
+    escritor = EscritorArchivo(carpeta, esquema, max_filas=500, max_partes=8)
+    filas = [[-70] * len(RECEPTORES) + [INICIO + 3000 * k, 'e34ce8b466a0', 'Salon', 'Sofa']
+             for k in range(FILAS_POR_DIA + 1000)]
+    t0 = time.perf_counter()
+    for fila in filas:
+        escritor.anadir(fila)
+    escritor.cerrar()
+    t = time.perf_counter() - t0
+    archivo = ArchivoDiario(carpeta)
+    leidas = archivo.leer_dias(archivo.dias())
+    ok = leidas['time'].tolist() == [f[len(RECEPTORES)] for f in filas]
+    print(f"Escritor: {t / len(filas) * 1e6:.1f} µs/fila, {len(archivo.indice()['ficheros'])} ficheros, "
+          f"filas {'completas' if ok else 'PERDIDAS'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, nargs='+', default=[7, 30, 90])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        if not medir_escritor(os.path.join(carpeta, 'vivo')):
+            sys.exit(1)
+
+        print(f"{'días':>5} {'importar s':>11} {'CSV int. s':>11} {'archivo int. s':>15} "
+              f"{'CSV acc. s':>11} {'archivo acc. s':>15}  idénticos")
+        for dias in args.dias:
+            pred_csv = os.path.join(carpeta, f'pred_{dias}.csv')
+            acc_csv = os.path.join(carpeta, f'acc_{dias}.csv')
+            pred_dir = os.path.join(carpeta, f'pred_{dias}')
+            acc_dir = os.path.join(carpeta, f'acc_{dias}')
+            generar_predicciones(pred_csv, dias)
+            generar_acciones(acc_csv, dias)
+
+            t0 = time.perf_counter()
+            importar_csv(pred_csv, pred_dir, esquema_predicciones(RECEPTORES))
+            importar_csv(acc_csv, acc_dir, ESQUEMA_ACCIONES)
+            t_importar = time.perf_counter() - t0
+
+            # Un día local del medio de la historia
+            medio = datetime.datetime.fromtimestamp((INICIO + dias // 2 * MS_POR_DIA) / 1000)
+            dt_i = medio.replace(hour=0, minute=0, second=0, microsecond=0)
+            dt_f = dt_i.replace(hour=23, minute=59, second=59)
+
+            t0 = time.perf_counter()
+            por_csv = generar_intervalos_separados(pred_csv, dt_i, dt_f)
+            t_csv = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            por_archivo = generar_intervalos_separados(pred_dir, dt_i, dt_f)
+            t_archivo = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            acc = pd.read_csv(acc_csv, encoding='utf-8')
+            acc = acc[(acc['time'] >= a_ms(dt_i)) & (acc['time'] < a_ms(dt_f) + 1000)]
+            t_acc_csv = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            acc_archivo = ArchivoDiario(acc_dir).leer_rango(a_ms(dt_i), a_ms(dt_f) + 1000)
+            t_acc_archivo = time.perf_counter() - t0
+
+            iguales = all(a.equals(b) and list(a.dtypes) == list(b.dtypes) for a, b in zip(por_csv, por_archivo))
+            iguales &= acc.astype(str).reset_index(drop=True).equals(acc_archivo.astype(str))
+            print(f"{dias:>5} {t_importar:>11.2f} {t_csv:>11.2f} {t_archivo:>15.3f} "
+                  f"{t_acc_csv:>11.3f} {t_acc_archivo:>15.3f}  {'sí' if iguales else 'NO'}")
+            if not iguales:
+                sys.exit(1)
+            os.remove(pred_csv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Latencia del bus de predicciones desde que se publica un registro hasta que
+lo recibe cada suscriptor.
+
+Arranca un publicador y N procesos suscriptores en esta misma máquina,
+publica registros a un ritmo fijo y cada suscriptor informa de la latencia
+p50/p99 que ha observado.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_bus.py [--suscriptores 1 4] [--registros 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bus_predicciones import PublicadorPredicciones, SuscriptorPredicciones, Prediccion  # noqa: E402
+
+DIRECCION = ('localhost', 6099)
+RSSI = {f'ESP32_{i}': -70 for i in range(1, 11)}
+
+
+def suscriptor(n_registros, resultados):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    s = SuscriptorPredicciones(DIRECCION)
+    latencias = []
+    for _ in range(n_registros):
+        registro = s.recibir()
+        latencias.append((time.time_ns() - registro.time) / 1e9)
+    s.cerrar()
+    resultados.put(latencias)
+
+
+def medir(n_suscriptores, n_registros, intervalo):
+    publicador = PublicadorPredicciones(DIRECCION)
+    resultados = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=suscriptor, args=(n_registros, resultados))
+                for _ in range(n_suscriptores)]
+    for p in procesos:
+        p.start()
+    while publicador.suscriptores() < n_suscriptores:
+        time.sleep(0.05)
+
+    for _ in range(n_registros):
+        # El campo time lleva el instante de publicación (en ns, no ms) para medir la latencia
+        publicador.publicar(Prediccion(time.time_ns(), 'e34ce8b466a0', 'Salon', 'Sofa', RSSI))
+        time.sleep(intervalo)
+
+    latencias = np.concatenate([resultados.get() for _ in procesos]) * 1e3
+    for p in procesos:
+        p.join()
+    publicador.cerrar()
+    return np.percentile(latencias, 50), np.percentile(latencias, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suscriptores', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--registros', type=int, default=500)
+    parser.add_argument('--intervalo', type=float, default=0.002, help='segundos entre publicaciones')
+    args = parser.parse_args()
+
+    print(f"{'suscriptores':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for n in args.suscriptores:
+        p50, p99 = medir(n, args.registros, args.intervalo)
+        print(f"{n:>12} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Búsqueda de parámetros de xgboostmodel.py (--buscar) frente a la búsqueda
+directa con XGBClassifier: un fit por combinación, pliegue y objetivo, con
+los objetivos uno detrás de otro.
+
+Genera un conjunto sintético con las habitaciones y posiciones de
+prediccion.py (cada posición con su huella de RSSI en los 10 receptores,
+ruido y receptores que no la ven), ejecuta las dos búsquedas con la misma
+rejilla y los mismos pliegues y comprueba que dan la misma precisión media
+para cada candidato. Con --datos se usa un CSV real con las columnas de
+DatosparaEntrenar.csv.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_busqueda.py [--filas 6000] [--pliegues 3] [--procesos N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+from xgboost import XGBClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import xgboostmodel  # noqa: E402
+from motor_inferencia import RSSI_AUSENTE  # noqa: E402
+
+RECEPTORES = [f'ESP32_{i}' for i in range(1, 11)]
+POSICIONES_POR_HABITACION = {
+    "Dormitorio": ["Cama", "Escritorio"],
+    "Salon": ["Sofa", "Mesa de juegos"],
+    "Cocina": ["Frigorifico", "Fregadero", "Vitroceramica"],
+    "Baño": ["WC", "Lavabo"]
+}
+REJILLA = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [3, 6],
+    'learning_rate': [0.05, 0.1],
+    'subsample': [0.8],
+    'colsample_bytree': [0.8],
+}
+
+
+def datos_sinteticos(filas, semilla=0, ruido=8.0, ausentes=0.1, semilla_filas=None, desplazamiento=0.0):
+    """
+    DataFrame con las columnas de DatosparaEntrenar.csv (RSSI de cada
+    receptor, Habitacion, Posicion). Las huellas sólo dependen de `semilla`:
+    con otra `semilla_filas` salen filas nuevas de la misma casa, y
+    `desplazamiento` (dB por receptor) simula un receptor movido.
+    """
+    rng = np.random.default_rng(semilla)
+    pares = [(h, p) for h, ps in POSICIONES_POR_HABITACION.items() for p in ps]
+    # Las posiciones de una habitación comparten buena parte de su huella
+    huella_hab = {h: rng.uniform(-95, -45, len(RECEPTORES)) for h in POSICIONES_POR_HABITACION}
+    huellas = np.array([huella_hab[h] + rng.normal(0, 6, len(RECEPTORES)) for h, _ in pares]) + desplazamiento
+    if semilla_filas is not None:
+        rng = np.random.default_rng(semilla_filas)
+    idx = rng.integers(len(pares), size=filas)
+    rssi = np.rint(huellas[idx] + rng.normal(0, ruido, (filas, len(RECEPTORES))))
+    rssi[rng.random(rssi.shape) < ausentes] = RSSI_AUSENTE
+    df = pd.DataFrame(rssi.astype(int), columns=RECEPTORES)
+    df['Habitacion'] = [pares[i][0] for i in idx]
+    df['Posicion'] = [pares[i][1] for i in idx]
+    return df
+
+
+def busqueda_directa(df_filtered, features, rejilla, pliegues):
+    """Un XGBClassifier por candidato, pliegue y objetivo."""
+    X = df_filtered[features]
+    filas = []
+    for objetivo, columna in (('Habitacion', 'habitacion_encoded'), ('Posicion', 'posicion_encoded')):
+        y = df_filtered[columna].to_numpy()
+        divisor = StratifiedKFold(n_splits=pliegues, shuffle=True, random_state=42)
+        for entrenamiento, prueba in divisor.split(X, y):
+            for valores in itertools.product(*rejilla.values()):
+                parametros = dict(zip(rejilla, valores))
+                modelo = XGBClassifier(**parametros, random_state=xgboostmodel.SEMILLA, eval_metric='mlogloss',
+                                       n_jobs=os.cpu_count())
+                modelo.fit(X.iloc[entrenamiento], y[entrenamiento])
+                filas.append(dict(objetivo=objetivo, **parametros,
+                                  precision=modelo.score(X.iloc[prueba], y[prueba])))
+    return pd.DataFrame(filas).groupby(['objetivo'] + list(rejilla))['precision'].mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datos', default=None)
+    parser.add_argument('--filas', type=int, default=6000)
+    parser.add_argument('--pliegues', type=int, default=3)
+    parser.add_argument('--procesos', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = args.datos
+        if ruta is None:
+            ruta = os.path.join(carpeta, 'datos.csv')
+            datos_sinteticos(args.filas).to_csv(ruta, index=False)
+        df_filtered, features, _, _, _ = xgboostmodel.cargar_datos(ruta)
+
+        t0 = time.perf_counter()
+        directa = busqueda_directa(df_filtered, features, REJILLA, args.pliegues)
+        t_directa = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        informe, _ = xgboostmodel.buscar(df_filtered, features, REJILLA, args.pliegues, args.procesos,
+                                         os.path.join(carpeta, 'informe.csv'))
+        t_buscar = time.perf_counter() - t0
+
+    nueva = informe.set_index(['objetivo'] + list(REJILLA))['precision_media']
+    diferencia = (nueva.reindex(directa.index) - directa).abs().max()
+    print(f"\n{len(df_filtered)} filas, {len(directa)} candidatos, {args.pliegues} pliegues, {os.cpu_count()} CPU")
+    print(f"Búsqueda directa (XGBClassifier):  {t_directa:.1f} s")
+    print(f"xgboostmodel --buscar (con latencias): {t_buscar:.1f} s  ({t_directa / t_buscar:.1f}x)")
+    print(f"Máxima diferencia de precisión media: {diferencia:.2e} -> {'bien' if diferencia < 1e-9 else 'MAL'}")
+    if not diferencia < 1e-9:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Memoria por persona y rendimiento de muchos ActionDetector en un proceso.
+
+Crea N detectores (uno por pulsera), les pasa filas intercaladas hasta
+llenar sus ventanas y mide con tracemalloc la memoria que ocupa cada uno,
+además de las filas por segundo procesadas.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_detectores.py [--sujetos 100 1000 10000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import accionNew  # noqa: E402
+
+PARES = [('Dormitorio', 'Cama'), ('Salon', 'Sofa'), ('Cocina', 'Fregadero'), ('Baño', 'WC')]
+
+
+class LogNulo:
+    """Sustituye al RegistroAcciones para medir sólo el detector."""
+
+    def escribir(self, descripcion, ts, action_type, address=None):
+        return ts
+
+
+def alimentar(n_sujetos, filas_por_sujeto):
+    """Crea los detectores y les pasa las filas; devuelve los detectores y la duración."""
+    log = LogNulo()
+    direcciones = [f'{i:012x}' for i in range(n_sujetos)]
+    detectores = {a: accionNew.ActionDetector(log, a) for a in direcciones}
+    t = 1735689600000  # 01/01/2025, en ms epoch
+
+    inicio = time.perf_counter()
+    for k in range(filas_por_sujeto):
+        ts = t + 3000 * k
+        for i, a in enumerate(direcciones):
+            # Cada sujeto cambia de sitio cada 20 filas
+            hab, pos = PARES[(i + k // 20) % len(PARES)]
+            detectores[a].detect_actions({'time': ts, 'habitacion_predicha': hab, 'posicion_predicha': pos})
+    return detectores, time.perf_counter() - inicio
+
+
+def medir(n_sujetos, filas_por_sujeto):
+    # Rendimiento sin tracemalloc, que lo frena mucho
+    _, duracion = alimentar(n_sujetos, filas_por_sujeto)
+
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    detectores, _ = alimentar(n_sujetos, filas_por_sujeto)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    del detectores
+    return memoria / n_sujetos, n_sujetos * filas_por_sujeto / duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sujetos', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--filas', type=int, default=40, help='filas por sujeto')
+    args = parser.parse_args()
+
+    print(f"{'sujetos':>8} {'bytes/sujeto':>13} {'filas/s':>10}")
+    for n in args.sujetos:
+        bytes_sujeto, filas_s = medir(n, args.filas)
+        print(f"{n:>8} {bytes_sujeto:>13.0f} {filas_s:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Prueba de carga del ensamblado de filas por pulsera.
+
+Simula N pulseras vistas por los 10 receptores e inyecta los mensajes
+intercalados (como llegarían del broker) en EnsambladorFilas. Para cada
+número de pulseras muestra el rendimiento en mensajes/s y filas/s y la
+latencia por pulsera desde el primer mensaje de la fila hasta que termina su
+predicción, junto con los hilos vivos al terminar (no debe crecer con el
+número de filas pendientes).
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_etiquetas.py [--etiquetas 1 10 100 500] [--logs src/logs]
+
+Sin --logs se usa un predictor de coste nulo y se mide sólo el ensamblado.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ensamblador import EnsambladorFilas  # noqa: E402
+
+RECEPTORES = [f'ESP32_{i}' for i in range(1, 11)]
+
+
+def cargar_predictor(logs):
+    if not logs:
+        return lambda valores: ('Duda', 'Duda')
+    from motor_inferencia import MotorInferencia
+    motor = MotorInferencia.desde_ficheros(
+        os.path.join(logs, 'xgboost_habitacion_model.pkl'),
+        os.path.join(logs, 'xgboost_label_encoder_habitacion.pkl'),
+        os.path.join(logs, 'xgboost_posicion_model.pkl'),
+        os.path.join(logs, 'xgboost_label_encoder_posicion.pkl'),
+        posiciones_por_habitacion={},
+        umbral_habitacion=0.40,
+        umbral_posicion=0.00
+    )
+    return motor.predecir_valores
+
+
+def ejecutar(n_etiquetas, rondas, predecir):
+    latencias = []
+    lock = threading.Lock()
+
+    def al_cerrar(fila):
+        with lock:
+            predecir(fila.rssi)
+            latencias.append(time.monotonic() - fila.inicio)
+
+    ensamblador = EnsambladorFilas(RECEPTORES, 60, al_cerrar)
+    direcciones = [f'{i:012x}' for i in range(n_etiquetas)]
+    rng = np.random.default_rng(n_etiquetas)
+    rssi = rng.integers(-100, -40, size=(rondas, len(RECEPTORES), n_etiquetas)).tolist()
+
+    t0 = time.perf_counter()
+    for r in range(rondas):
+        for j, esp in enumerate(RECEPTORES):
+            valores = rssi[r][j]
+            for k, address in enumerate(direcciones):
+                ensamblador.anadir(address, esp, valores[k])
+    total = time.perf_counter() - t0
+
+    mensajes = rondas * len(RECEPTORES) * n_etiquetas
+    hilos = threading.active_count()
+    ensamblador.rueda.detener()
+    lat = np.array(latencias) * 1e3
+    return mensajes / total, len(latencias) / total, np.percentile(lat, 50), np.percentile(lat, 99), hilos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--etiquetas', type=int, nargs='+', default=[1, 10, 100, 500, 1000])
+    parser.add_argument('--rondas', type=int, default=50)
+    parser.add_argument('--logs', default=None, help='carpeta con los modelos para incluir la inferencia')
+    args = parser.parse_args()
+
+    predecir = cargar_predictor(args.logs)
+    print(f"{'pulseras':>9} {'mensajes/s':>12} {'filas/s':>10} {'lat p50 ms':>11} {'lat p99 ms':>11} {'hilos':>6}")
+    for n in args.etiquetas:
+        msg_s, filas_s, p50, p99, hilos = ejecutar(n, args.rondas, predecir)
+        print(f"{n:>9} {msg_s:>12.0f} {filas_s:>10.0f} {p50:>11.2f} {p99:>11.2f} {hilos:>6}")
+
+
+if __name__ == '__main__':
+    main()
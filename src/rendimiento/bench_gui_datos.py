@@ -0,0 +1,99 @@
+"""
+Coste por tick de la fuente de datos del GUI frente a la lectura anterior.
+
+Para CSV de predicciones de una hora, un día y una semana (una fila cada
+3 s) se añaden unas filas por tick y se mide lo que cuesta obtener la tabla
+de últimas filas y la posición estable con DatosGUI y con el camino
+anterior del GUI (pd.read_csv + tail, más otro read_csv filtrado para la
+posición estable, que además se pedía dos veces: mapa y alarmas). El
+primero debe mantenerse plano; el segundo crece con el fichero.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_gui_datos.py [--filas 1200 28800 201600] [--ticks 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from datos_gui import DatosGUI  # noqa: E402
+
+POSICIONES_VALIDAS = {
+    "Dormitorio": ["Cama", "Escritorio"],
+    "Cocina": ["Vitroceramica", "Frigorifico", "Fregadero"],
+    "Salon": ["Mesa", "Sofa"],
+    "Baño": ["WC", "Lavabo"],
+}
+CABECERA = [f'ESP32_{i}' for i in range(1, 11)] + ['time', 'address', 'habitacion_predicha', 'posicion_predicha']
+FILAS = [
+    ','.join(['-70'] * 10 + ['1735722000000', 'e34ce8b466a0', 'Salon', 'Sofa']) + '\n',
+    ','.join(['-80'] * 10 + ['1735722003000', 'e34ce8b466a0', 'Duda', 'Duda']) + '\n',
+    ','.join(['-65'] * 10 + ['1735722006000', 'e34ce8b466a0', 'Cocina', 'Fregadero']) + '\n',
+]
+
+
+# Camino anterior del GUI, copiado para comparar
+def tick_anterior(ruta):
+    df = pd.read_csv(ruta)
+    data = df.tail(5)
+    for _ in range(2):  # posicion_estable() desde dibujar_mapa y desde comprobar_alarmas
+        df = pd.read_csv(ruta)
+        df = df[(df["habitacion_predicha"] != "Duda") & (df["posicion_predicha"] != "Duda")]
+        df = df[df.apply(
+            lambda r: r["posicion_predicha"] in POSICIONES_VALIDAS.get(r["habitacion_predicha"], []),
+            axis=1
+        )]
+        df.tail(2)
+    return data
+
+
+def tick_nuevo(datos):
+    datos.actualizar()
+    datos.ultimas_filas()
+    return datos.posicion_estable
+
+
+def medir(n_filas, ticks, por_tick):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'predicciones.csv')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(','.join(CABECERA) + '\n')
+            f.write(''.join(FILAS) * (n_filas // len(FILAS)))
+
+        datos = DatosGUI(ruta, POSICIONES_VALIDAS)
+        tick_nuevo(datos)  # puesta al día inicial (últimos bytes del fichero)
+        t_nuevo = t_anterior = 0.0
+        for k in range(ticks):
+            with open(ruta, 'a', encoding='utf-8') as f:
+                f.write(''.join(FILAS[(k + i) % len(FILAS)] for i in range(por_tick)))
+
+            t0 = time.perf_counter()
+            tick_nuevo(datos)
+            t_nuevo += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            tick_anterior(ruta)
+            t_anterior += time.perf_counter() - t0
+        return t_nuevo / ticks * 1e3, t_anterior / ticks * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[1200, 28800, 201600])
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--por-tick', type=int, default=2, help='filas nuevas entre ticks')
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'DatosGUI ms/tick':>17} {'anterior ms/tick':>17}")
+    for n in args.filas:
+        nuevo, anterior = medir(n, args.ticks, args.por_tick)
+        print(f"{n:>8} {nuevo:>17.3f} {anterior:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Reentrenamiento incremental de xgboostmodel.py (--incremental) frente al
+entrenamiento completo.
+
+Para cada caso de --casos (filas:nuevas) hace el entrenamiento completo
+sobre un CSV sintético (ver bench_busqueda.py) y guarda la huella. Después
+simula lo que añade save2.0.py:
+
+  1. Una sesión de calibración de `nuevas` filas con dos receptores movidos
+     (su RSSI cambia --movido dB), que el modelo guardado clasifica peor. Se
+     mide --incremental frente a rehacer todo y se comprueba que se guarda
+     una versión nueva y que, sobre --prueba filas nuevas con los
+     receptores movidos, ningún objetivo (tampoco los modelos de posición
+     por habitación) empeora y alguno mejora.
+  2. Filas con las etiquetas barajadas: la precisión empeora, así que no
+     se guarda nada y la huella no avanza.
+  3. Sin filas nuevas: no se entrena.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_incremental.py [--casos 6000:400,10000:300,20000:600] [--movido 20]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import xgboostmodel  # noqa: E402
+from bench_busqueda import datos_sinteticos, RECEPTORES  # noqa: E402
+
+OBJETIVOS = ('Habitacion', 'Posicion')
+EVALUADOS = OBJETIVOS + (xgboostmodel.POR_HABITACION,)
+
+
+def anadir(ruta, df):
+    """Como save2.0.py: filas al final, sin cabecera."""
+    df.to_csv(ruta, mode='a', header=False, index=False)
+
+
+def precisiones(carpeta, df):
+    """
+    Precisión de los modelos guardados en `carpeta` sobre `df`, por
+    objetivo; la de los modelos por habitación, dando la habitación real.
+    """
+    columnas = xgboostmodel.leer_huella(carpeta)['columnas']
+    resultado = {}
+    for objetivo in OBJETIVOS:
+        modelo = joblib.load(xgboostmodel._ruta_modelo(carpeta, objetivo))
+        codificador = joblib.load(os.path.join(carpeta, f'xgboost_label_encoder_{objetivo.lower()}.pkl'))
+        resultado[objetivo] = float((modelo.predict(df[columnas]) == codificador.transform(df[objetivo])).mean())
+    resultado[xgboostmodel.POR_HABITACION] = xgboostmodel._precision_por_habitacion(
+        xgboostmodel.cargar_por_habitacion(carpeta), df, columnas)
+    return resultado
+
+
+def caso(filas, nuevas, args):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'datos.csv')
+        datos_sinteticos(filas).to_csv(ruta, index=False)
+        t0 = time.perf_counter()
+        xgboostmodel.entrenar(*xgboostmodel.cargar_datos(ruta), carpeta=carpeta)
+        print(f"Entrenamiento inicial ({filas} filas): {time.perf_counter() - t0:.1f} s\n")
+
+        # 1. Calibración con dos receptores movidos
+        desplazamiento = np.zeros(len(RECEPTORES))
+        desplazamiento[[2, 7]] = [args.movido, -args.movido]
+        anadir(ruta, datos_sinteticos(nuevas, semilla_filas=1, desplazamiento=desplazamiento))
+        movidas = datos_sinteticos(args.prueba, semilla_filas=3, desplazamiento=desplazamiento)
+        antes = precisiones(carpeta, movidas)
+        completo = os.path.join(carpeta, 'completo')
+        os.makedirs(completo)
+        t0 = time.perf_counter()
+        guardado = xgboostmodel.entrenar_incremental(ruta, args.rondas, carpeta=carpeta)
+        t_incremental = time.perf_counter() - t0
+        huella = xgboostmodel.leer_huella(carpeta)
+        despues = precisiones(carpeta, movidas)
+        t0 = time.perf_counter()
+        xgboostmodel.entrenar(*xgboostmodel.cargar_datos(ruta), carpeta=completo)
+        t_completo = time.perf_counter() - t0
+        rehecho = precisiones(completo, movidas)
+        ok_1 = (guardado and huella['version'] == 2 and huella['bytes'] == os.path.getsize(ruta)
+                and all(despues[o] >= antes[o] - xgboostmodel.TOLERANCIA for o in EVALUADOS)
+                and any(despues[o] > antes[o] for o in EVALUADOS))
+        print(f"\nCalibración de {nuevas} filas: incremental {t_incremental:.1f} s, completo {t_completo:.1f} s "
+              f"({t_completo / t_incremental:.0f}x)")
+        for o in EVALUADOS:
+            print(f"  '{o}' con los receptores movidos ({args.prueba} filas): {antes[o] * 100:.2f}% -> "
+                  f"{despues[o] * 100:.2f}% (completo {rehecho[o] * 100:.2f}%)")
+        print(f"  -> {'bien' if ok_1 else 'MAL'}\n")
+
+        # 2. Etiquetas barajadas (pares habitación/posición válidos, en otras filas): no debe guardarse
+        malas = datos_sinteticos(nuevas, semilla_filas=2)
+        malas[['Habitacion', 'Posicion']] = malas[['Habitacion', 'Posicion']].sample(frac=1, random_state=0).to_numpy()
+        anadir(ruta, malas)
+        shutil.copy2(os.path.join(carpeta, xgboostmodel.HUELLA), os.path.join(carpeta, 'huella_antes.json'))
+        guardado = xgboostmodel.entrenar_incremental(ruta, args.rondas, carpeta=carpeta)
+        ok_2 = not guardado and xgboostmodel.leer_huella(carpeta) == huella
+        print(f"Etiquetas barajadas -> {'bien' if ok_2 else 'MAL'}\n")
+
+        # 3. Sin filas nuevas desde la huella (se quitan las barajadas)
+        with open(ruta, 'r+b') as f:
+            f.truncate(huella['bytes'])
+        ok_3 = not xgboostmodel.entrenar_incremental(ruta, args.rondas, carpeta=carpeta)
+        print(f"Sin filas nuevas -> {'bien' if ok_3 else 'MAL'}")
+        return ok_1, ok_2, ok_3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', default='6000:400,10000:300,20000:600', help='filas:nuevas separados por comas')
+    parser.add_argument('--movido', type=float, default=20.0, help='dB que cambia el RSSI de los receptores movidos')
+    parser.add_argument('--prueba', type=int, default=3000)
+    parser.add_argument('--rondas', type=int, default=50)
+    args = parser.parse_args()
+
+    resultados = {}
+    for texto in args.casos.split(','):
+        filas, nuevas = map(int, texto.split(':'))
+        print(f"===== {filas} filas, {nuevas} nuevas =====")
+        resultados[texto] = caso(filas, nuevas, args)
+        print()
+    print("Resumen (calibración, etiquetas barajadas, sin filas nuevas):")
+    for texto, oks in resultados.items():
+        print(f"  {texto}: {', '.join('bien' if ok else 'MAL' for ok in oks)}")
+    if not all(all(oks) for oks in resultados.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark del motor de inferencia frente al camino original de prediccion.py.
+
+Genera filas de RSSI sintéticas, las predice con el camino pandas de siempre
+(DataFrame + predict_proba + predict + inverse_transform) y con
+MotorInferencia, comprueba que las etiquetas son idénticas y muestra la
+latencia por fila de cada uno.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_inferencia.py [--filas 2000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import joblib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from motor_inferencia import MotorInferencia, ClasificadorRapido, RSSI_AUSENTE  # noqa: E402
+
+RECEPTORES = [f'ESP32_{i}' for i in range(1, 11)]
+POSICIONES_POR_HABITACION = {
+    "Dormitorio": ["Cama", "Escritorio"],
+    "Salon": ["Sofa", "Mesa de juegos"],
+    "Cocina": ["Frigorifico", "Fregadero", "Vitroceramica"],
+    "Baño": ["WC", "Lavabo"]
+}
+UMBRAL_HABITACION = 0.40
+UMBRAL_POSICION = 0.00
+
+
+def filas_sinteticas(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    rssi = rng.integers(-100, -40, size=(n, len(RECEPTORES)))
+    rssi[rng.random((n, len(RECEPTORES))) < 0.3] = RSSI_AUSENTE
+    filas = []
+    for valores in rssi:
+        fila = {esp: int(v) for esp, v in zip(RECEPTORES, valores)}
+        fila['time'] = '01/01/2025 00:00:00'
+        filas.append(fila)
+    return filas
+
+
+def prediccion_pandas(fila, modelos):
+    """Copia del camino original de predict_position (sin escritura a CSV)."""
+    model_habitacion, label_encoder_habitacion, model_posicion, label_encoder_posicion = modelos
+    df = pd.DataFrame([fila])
+    feature_columns = [col for col in df.columns if col.startswith('ESP32_')]
+    X = df[feature_columns]
+
+    if model_habitacion.predict_proba(X).max(axis=1)[0] >= UMBRAL_HABITACION:
+        hab = label_encoder_habitacion.inverse_transform(model_habitacion.predict(X))[0]
+    else:
+        hab = "Duda"
+
+    if model_posicion.predict_proba(X).max(axis=1)[0] >= UMBRAL_POSICION:
+        pos = label_encoder_posicion.inverse_transform(model_posicion.predict(X))[0]
+    else:
+        pos = "Duda"
+
+    if hab == "Duda":
+        pos = "Duda"
+    elif pos not in POSICIONES_POR_HABITACION.get(hab, []) and pos != "Duda":
+        pos = "Duda"
+    return hab, pos
+
+
+def medir(funcion, filas):
+    resultados, tiempos = [], []
+    for fila in filas:
+        t0 = time.perf_counter()
+        resultados.append(funcion(fila))
+        tiempos.append(time.perf_counter() - t0)
+    return resultados, np.array(tiempos) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=2000)
+    parser.add_argument('--logs', default='src/logs')
+    args = parser.parse_args()
+
+    modelos = (
+        joblib.load(os.path.join(args.logs, 'xgboost_habitacion_model.pkl')),
+        joblib.load(os.path.join(args.logs, 'xgboost_label_encoder_habitacion.pkl')),
+        joblib.load(os.path.join(args.logs, 'xgboost_posicion_model.pkl')),
+        joblib.load(os.path.join(args.logs, 'xgboost_label_encoder_posicion.pkl')),
+    )
+    motor = MotorInferencia(
+        ClasificadorRapido(modelos[0], modelos[1]),
+        ClasificadorRapido(modelos[2], modelos[3]),
+        posiciones_por_habitacion=POSICIONES_POR_HABITACION,
+        umbral_habitacion=UMBRAL_HABITACION,
+        umbral_posicion=UMBRAL_POSICION
+    )
+
+    filas = filas_sinteticas(args.filas)
+    original, t_original = medir(lambda f: prediccion_pandas(f, modelos), filas)
+    rapido, t_rapido = medir(motor.predecir, filas)
+
+    distintas = sum(1 for a, b in zip(original, rapido) if a != b)
+    print(f"Filas: {len(filas)}  Etiquetas distintas: {distintas}")
+    for nombre, t in (('pandas', t_original), ('motor', t_rapido)):
+        print(f"{nombre:>7}: media {t.mean():8.1f} us  p50 {np.percentile(t, 50):8.1f} us  "
+              f"p99 {np.percentile(t, 99):8.1f} us")
+    print(f"Aceleración (p50): x{np.percentile(t_original, 50) / np.percentile(t_rapido, 50):.1f}")
+    if distintas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
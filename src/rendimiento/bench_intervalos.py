@@ -0,0 +1,159 @@
+"""
+Compara intervalos.generar_intervalos_separados (vectorizado) con la versión
+por filas que tenía el GUI (apply + iterrows + bucle con .loc): comprueba que
+las dos tablas exportadas son idénticas y mide cuánto tarda cada una.
+
+Genera CSV de predicciones sintéticos con rachas de longitud variable,
+filas "Duda", pares habitación/posición no válidos, segundos repetidos y
+alguna fila desordenada. El rango exportado recorta el principio y el final
+para cubrir el recorte de intervalos. La versión por filas sólo se ejecuta
+hasta --max-anterior filas (con millones tarda varios minutos).
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_intervalos.py [--filas 100000 1000000 3000000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from intervalos import VALID_POSITIONS_BY_ROOM, generar_intervalos_separados  # noqa: E402
+from tiempo import serie_a_ms, serie_a_datetime  # noqa: E402
+
+
+# Versión anterior del GUI, copiada para comparar
+def format_timedelta(td):
+    total = int(td.total_seconds())
+    h = total // 3600
+    m = (total % 3600) // 60
+    s = total % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def generar_intervalos_anterior(CSV_PATH, dt_inicio, dt_fin, min_filas=3):
+    df = pd.read_csv(CSV_PATH)
+    df.dropna(subset=["time"], inplace=True)
+    df["time"] = serie_a_datetime(serie_a_ms(df["time"]))
+    df = df[(df["habitacion_predicha"]!="Duda") & (df["posicion_predicha"]!="Duda")]
+    df = df[df.apply(lambda r: r["posicion_predicha"] in VALID_POSITIONS_BY_ROOM.get(r["habitacion_predicha"], []), axis=1)]
+    df.sort_values("time", inplace=True); df.reset_index(drop=True, inplace=True)
+
+    intervalos = []
+    clave,inicio,count = None,None,0
+    for _,row in df.iterrows():
+        hab,pos,t = row["habitacion_predicha"],row["posicion_predicha"],row["time"]
+        key = (hab,pos)
+        if clave is None:
+            clave,inicio,count = key,t,1
+        elif key==clave:
+            count+=1
+        else:
+            if count>=min_filas:
+                intervalos.append({"Habitacion":clave[0],"Posicion":clave[1],
+                                   "Fecha_Entrada_dt":inicio,"Fecha_Salida_dt":t})
+            clave,inicio,count = key,t,1
+    if clave and count>=min_filas:
+        tfin = df["time"].iloc[-1]
+        intervalos.append({"Habitacion":clave[0],"Posicion":clave[1],
+                           "Fecha_Entrada_dt":inicio,"Fecha_Salida_dt":tfin})
+
+    df_pos = pd.DataFrame(intervalos)
+    if df_pos.empty: return pd.DataFrame(),pd.DataFrame()
+    mask = (df_pos["Fecha_Salida_dt"]>=dt_inicio)&(df_pos["Fecha_Entrada_dt"]<=dt_fin)
+    df_pos = df_pos[mask].copy()
+    df_pos["Fecha_Entrada_dt"]=df_pos["Fecha_Entrada_dt"].clip(lower=dt_inicio,upper=dt_fin)
+    df_pos["Fecha_Salida_dt"]=df_pos["Fecha_Salida_dt"].clip(lower=dt_inicio,upper=dt_fin)
+    df_pos["Tiempo_en_la_posicion_td"]=df_pos["Fecha_Salida_dt"]-df_pos["Fecha_Entrada_dt"]
+    df_pos.reset_index(drop=True,inplace=True)
+
+    chunks=[]; start=0; hab=df_pos.loc[0,"Habitacion"]; ts=df_pos.loc[0,"Fecha_Entrada_dt"]
+    for i in range(1,len(df_pos)):
+        if df_pos.loc[i,"Habitacion"]!=hab:
+            te=df_pos.loc[i-1,"Fecha_Salida_dt"]
+            chunks.append((start,i-1,hab,ts,te))
+            start,hab,ts = i,df_pos.loc[i,"Habitacion"],df_pos.loc[i,"Fecha_Entrada_dt"]
+    te=df_pos.loc[len(df_pos)-1,"Fecha_Salida_dt"]
+    chunks.append((start,len(df_pos)-1,hab,ts,te))
+
+    lista_hab=[]
+    for a,b,h,stt,ett in chunks:
+        lista_hab.append({"Habitacion":h,
+                          "Fecha_Entrada_dt":stt,
+                          "Fecha_Salida_dt":ett,
+                          "Tiempo_en_la_habitacion_td":ett-stt})
+    df_hab = pd.DataFrame(lista_hab)
+    if df_hab.empty: return df_pos, pd.DataFrame()
+
+    df_pos["Fecha_Entrada"]=df_pos["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_pos["Fecha_Salida"]=df_pos["Fecha_Salida_dt"].dt.strftime("%d/%m/%Y %H:%M:%S")
+    df_pos["Tiempo_en_la_posicion"]=df_pos["Tiempo_en_la_posicion_td"].apply(format_timedelta)
+    df_pos = df_pos[["Habitacion","Posicion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_posicion"]]
+
+    df_hab["Fecha_Entrada"]=df_hab["Fecha_Entrada_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_hab["Fecha_Salida"]=df_hab["Fecha_Salida_dt"].dt.strftime("%d/%m/%y %H:%M:%S")
+    df_hab["Tiempo_en_la_habitacion"]=df_hab["Tiempo_en_la_habitacion_td"].apply(format_timedelta)
+    df_hab = df_hab[["Habitacion","Fecha_Entrada","Fecha_Salida","Tiempo_en_la_habitacion"]]
+
+    return df_pos, df_hab
+
+
+def generar_csv(ruta, n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    pares = [(h, p) for h, ps in VALID_POSITIONS_BY_ROOM.items() for p in ps]
+    pares += [('Duda', 'Duda'), ('Salon', 'Duda'), ('Cocina', 'Cama'), ('Exterior', 'Exterior')]
+    rachas = rng.integers(1, 40, size=n // 2 + 1)
+    elegidos = rng.integers(len(pares), size=len(rachas))
+    idx = np.repeat(elegidos, rachas)[:n]
+    # Pasos de 3 s con segundos repetidos y saltos; alguna fila se desordena
+    pasos = rng.choice([0, 3000, 3000, 3000, 4000, 60000], size=n)
+    tiempos = 1735689600000 + np.cumsum(pasos)
+    desorden = rng.random(n) < 0.001
+    tiempos[desorden] -= 9000
+    pd.DataFrame({
+        'time': tiempos,
+        'address': 'e34ce8b466a0',
+        'habitacion_predicha': [pares[i][0] for i in idx],
+        'posicion_predicha': [pares[i][1] for i in idx],
+    }).to_csv(ruta, index=False)
+    return serie_a_datetime(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[100000, 1000000, 3000000])
+    parser.add_argument('--max-anterior', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f"{'filas':>9} {'vectorizado s':>14} {'anterior s':>11} {'x':>7}  idénticos")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n in args.filas:
+            ruta = os.path.join(carpeta, f'predicciones_{n}.csv')
+            tiempos = generar_csv(ruta, n)
+            # Rango que deja fuera el primer y el último 10 % del periodo
+            dt_i = (tiempos.iloc[n // 10]).to_pydatetime()
+            dt_f = (tiempos.iloc[n - n // 10]).to_pydatetime()
+
+            t0 = time.perf_counter()
+            nuevo = generar_intervalos_separados(ruta, dt_i, dt_f)
+            t_nuevo = time.perf_counter() - t0
+
+            if n > args.max_anterior:
+                print(f"{n:>9} {t_nuevo:>14.2f} {'-':>11} {'-':>7}  -")
+                continue
+            t0 = time.perf_counter()
+            anterior = generar_intervalos_anterior(ruta, dt_i, dt_f)
+            t_anterior = time.perf_counter() - t0
+            iguales = all(a.equals(b) and list(a.dtypes) == list(b.dtypes) for a, b in zip(nuevo, anterior))
+            print(f"{n:>9} {t_nuevo:>14.2f} {t_anterior:>11.2f} {t_anterior / t_nuevo:>7.0f}  {'sí' if iguales else 'NO'}")
+            if not iguales:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Modelos de posición por habitación (MotorJerarquico) frente a los dos
+modelos planos de siempre (MotorInferencia).
+
+Entrena con xgboostmodel.py sobre --filas filas sintéticas (ver
+bench_busqueda.py), o usa los modelos de --logs, y predice --prueba filas
+nuevas de la misma casa con más ruido, para que haya habitaciones dudosas.
+Para cada motor, con booster y con árboles planos, muestra:
+
+  - latencia por fila (p50/p99) y árboles evaluados de media por fila,
+  - porcentaje de posiciones "Duda", y de ellas cuántas son porque el
+    modelo de posición dio una posición de otra habitación,
+  - aciertos de habitación y de posición (una "Duda" cuenta como fallo).
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_jerarquico.py [--filas 20000] [--prueba 3000] [--ruido 12]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import xgboostmodel  # noqa: E402
+from motor_inferencia import MotorInferencia, MotorJerarquico, ClasificadorPlano  # noqa: E402
+from bench_busqueda import datos_sinteticos, POSICIONES_POR_HABITACION  # noqa: E402
+
+UMBRALES = dict(umbral_habitacion=0.40, umbral_posicion=0.00)
+
+
+def arboles(clasificador):
+    """Árboles que evalúa el clasificador por fila."""
+    if isinstance(clasificador, str):
+        return 0
+    if isinstance(clasificador, ClasificadorPlano):
+        return clasificador.planos.n_arboles
+    return clasificador.booster.num_boosted_rounds() * (1 if clasificador.binario else len(clasificador.etiquetas))
+
+
+def medir(motor, X, jerarquico):
+    resultados, tiempos, evaluados, incoherentes = [], [], 0, 0
+    for x in X:
+        t0 = time.perf_counter()
+        resultado = motor.predecir_valores(x)
+        tiempos.append(time.perf_counter() - t0)
+        resultados.append(resultado)
+        habitacion = resultado[0]
+        if jerarquico:
+            evaluados += arboles(motor.habitacion)
+            if habitacion != "Duda":
+                evaluados += arboles(motor.posiciones.get(habitacion, ''))
+        else:
+            evaluados += arboles(motor.habitacion) + arboles(motor.posicion)
+            # La posición del modelo plano, antes de descartarla por incoherente
+            if habitacion != "Duda":
+                posicion = motor.posicion.clasificar(motor.vector)[0]
+                incoherentes += posicion not in POSICIONES_POR_HABITACION.get(habitacion, [])
+    tiempos = np.array(tiempos[20:]) * 1e6
+    return resultados, np.percentile(tiempos, 50), np.percentile(tiempos, 99), evaluados / len(X), incoherentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', default=None, help='carpeta con los modelos; por defecto se entrenan sintéticos')
+    parser.add_argument('--filas', type=int, default=20000)
+    parser.add_argument('--prueba', type=int, default=3000)
+    parser.add_argument('--ruido', type=float, default=12.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        logs = args.logs
+        if logs is None:
+            ruta = os.path.join(carpeta, 'datos.csv')
+            datos_sinteticos(args.filas).to_csv(ruta, index=False)
+            xgboostmodel.entrenar(*xgboostmodel.cargar_datos(ruta), carpeta=carpeta)
+            logs = carpeta
+        prueba = datos_sinteticos(args.prueba, semilla_filas=7, ruido=args.ruido)
+
+        def ruta(nombre):
+            return os.path.join(logs, nombre)
+
+        comun = dict(posiciones_por_habitacion=POSICIONES_POR_HABITACION, **UMBRALES)
+        motores = []
+        for planos in (False, True):
+            motores.append((f"planos ({'árboles planos' if planos else 'booster'})", False,
+                            MotorInferencia.desde_ficheros(
+                                ruta('xgboost_habitacion_model.pkl'), ruta('xgboost_label_encoder_habitacion.pkl'),
+                                ruta('xgboost_posicion_model.pkl'), ruta('xgboost_label_encoder_posicion.pkl'),
+                                planos=planos, **comun)))
+            motores.append((f"jerárquico ({'árboles planos' if planos else 'booster'})", True,
+                            MotorJerarquico.desde_ficheros(
+                                ruta('xgboost_habitacion_model.pkl'), ruta('xgboost_label_encoder_habitacion.pkl'),
+                                ruta(xgboostmodel.INDICE_POSICIONES), planos=planos, **comun)))
+
+        X = prueba[motores[0][2].columnas].to_numpy(np.float32)
+        print(f"\n{len(X)} filas de prueba (ruido {args.ruido} dB)")
+        print(f"{'motor':<30} {'p50 µs':>8} {'p99 µs':>8} {'árboles/fila':>13} {'Duda %':>7} "
+              f"{'incoherentes %':>15} {'hab. %':>7} {'pos. %':>7}")
+        for nombre, jerarquico, motor in motores:
+            resultados, p50, p99, evaluados, incoherentes = medir(motor, X, jerarquico)
+            habitaciones = np.array([r[0] for r in resultados])
+            posiciones = np.array([r[1] for r in resultados])
+            duda = (posiciones == "Duda").mean() * 100
+            print(f"{nombre:<30} {p50:>8.1f} {p99:>8.1f} {evaluados:>13.0f} {duda:>7.2f} "
+                  f"{incoherentes / len(X) * 100:>15.2f} "
+                  f"{(habitaciones == prueba['Habitacion'].to_numpy()).mean() * 100:>7.2f} "
+                  f"{(posiciones == prueba['Posicion'].to_numpy()).mean() * 100:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Coste por fila nueva del lector incremental frente a releer el CSV entero.
+
+Para ficheros de predicciones de distinto tamaño se añaden lotes de filas y
+se mide cuánto cuesta recuperar sólo esas filas con LectorIncremental y con
+el método anterior de monitor_positions (pd.read_csv + iloc). El primero
+debe mantenerse constante; el segundo crece con el tamaño del fichero.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_lector.py [--tamanos 1000 10000 100000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lector_csv import LectorIncremental  # noqa: E402
+
+CABECERA = [f'ESP32_{i}' for i in range(1, 11)] + ['time', 'address', 'habitacion_predicha', 'posicion_predicha']
+FILA = ','.join(['-70'] * 10 + ['1735722000000', 'e34ce8b466a0', 'Salon', 'Sofa']) + '\n'
+
+
+def medir(n_filas, lote, repeticiones):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'predicciones.csv')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(','.join(CABECERA) + '\n')
+            f.write(FILA * n_filas)
+
+        lector = LectorIncremental(ruta)
+        lector.leer()  # puesta al día inicial
+        ultimo = n_filas
+
+        t_lector = t_pandas = 0.0
+        for _ in range(repeticiones):
+            with open(ruta, 'a', encoding='utf-8') as f:
+                f.write(FILA * lote)
+
+            t0 = time.perf_counter()
+            nuevas = lector.leer()
+            t_lector += time.perf_counter() - t0
+            assert len(nuevas) == lote
+
+            t0 = time.perf_counter()
+            df = pd.read_csv(ruta)
+            nuevas = df.iloc[ultimo:]
+            t_pandas += time.perf_counter() - t0
+            ultimo += len(nuevas)
+
+        filas = lote * repeticiones
+        return t_lector / filas * 1e6, t_pandas / filas * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--lote', type=int, default=5, help='filas añadidas entre lecturas')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'filas':>9} {'lector us/fila':>15} {'read_csv us/fila':>17}")
+    for n in args.tamanos:
+        lector, pandas_ = medir(n, args.lote, args.repeticiones)
+        print(f"{n:>9} {lector:>15.1f} {pandas_:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
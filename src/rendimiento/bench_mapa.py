@@ -0,0 +1,152 @@
+"""
+Tiempo de dibujo por fotograma y bytes enviados al navegador del mapa del
+GUI: RenderizadorMapa (capa base en memoria, parches pequeños y PNG sólo si
+cambia algo) frente al dibujo anterior (abrir el plano del disco, capa de
+transiciones del tamaño del plano y PNG en cada tick).
+
+Simula --ticks segundos del GUI: llega una predicción cada 3 ticks con RSSI
+que varía y la posición estable cambia cada minuto, dejando una línea de
+transición que se desvanece. También comprueba que ambos dibujos salen
+idénticos píxel a píxel.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_mapa.py [--ticks 600] [--plano src/fotos/ParteDeAbajo.png]
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from PIL import Image, ImageDraw, ImageChops
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mapa import RenderizadorMapa  # noqa: E402
+
+ESP_POSICIONES = {
+    "ESP32_1": (200, 650), "ESP32_2": (220, 25), "ESP32_3": (170, 220), "ESP32_4": (790, 650),
+    "ESP32_5": (520, 520), "ESP32_6": (1350, 25), "ESP32_7": (150000, 50050), "ESP32_8": (1200, 240),
+    "ESP32_9": (200, 420), "ESP32_10": (1020, 650),
+}
+POSICIONES = {
+    "Cocina_Fregadero": (230, 50), "Cocina_Frigorifico": (120, 220), "Salon_Sofa": (740, 635),
+    "Dormitorio_Cama": (200, 635), "Baño_WC": (1100, 230),
+}
+TIEMPO_VISIBLE = 10
+
+
+class MapaAnterior:
+    """Copia de dibujar_mapa/dibujar_esps/dibujar_transiciones del GUI anterior."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.transiciones = []
+        self.ultima_habitacion = None
+        self.ultima_posicion = None
+
+    def dibujar(self, fila, nueva, now):
+        img = Image.open(self.ruta).convert("RGBA")
+        d = ImageDraw.Draw(img)
+        for esp, (x, y) in ESP_POSICIONES.items():
+            if esp in fila:
+                rssi = fila[esp]
+                color = "green" if rssi >= -75 else "yellow" if rssi >= -95 else "red"
+                d.ellipse((x - 6, y - 6, x + 6, y + 6), fill=color)
+        old_hab, old_pos = self.ultima_habitacion, self.ultima_posicion
+        if nueva:
+            self.ultima_habitacion, self.ultima_posicion = nueva
+        if self.ultima_habitacion and self.ultima_posicion:
+            coords = POSICIONES.get(f"{self.ultima_habitacion}_{self.ultima_posicion}", (0, 0))
+        else:
+            coords = (0, 0)
+        if coords != (0, 0) and old_hab and old_pos:
+            o = POSICIONES.get(f"{old_hab}_{old_pos}", (0, 0))
+            if o != (0, 0) and o != coords:
+                self.transiciones.append((*o, coords[0], coords[1], now))
+        if coords != (0, 0):
+            x, y = coords
+            r = 14
+            d.ellipse([x - r, y - r, x + r, y + r], fill="blue")
+
+        overlay = Image.new("RGBA", img.size, (255, 255, 255, 0))
+        od = ImageDraw.Draw(overlay)
+        for x1, y1, x2, y2, t in list(self.transiciones):
+            e = now - t
+            if e > TIEMPO_VISIBLE:
+                self.transiciones.remove((x1, y1, x2, y2, t))
+                continue
+            alpha = 255 if e < TIEMPO_VISIBLE / 2 else int(255 * (1 - (e - TIEMPO_VISIBLE / 2) / (TIEMPO_VISIBLE / 2)))
+            od.line([(x1, y1), (x2, y2)], fill=(255, 0, 0, alpha), width=3)
+        img = Image.alpha_composite(img, overlay)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return img, buf.getvalue()
+
+
+def plano_sintetico(ruta):
+    img = Image.new("RGB", (1400, 700), "white")
+    d = ImageDraw.Draw(img)
+    for caja in [(10, 10, 450, 340), (460, 10, 1390, 340), (10, 350, 690, 690), (700, 350, 1390, 690)]:
+        d.rectangle(caja, outline="black", width=4)
+    for i in range(0, 1400, 35):
+        d.line([(i, 0), (i, 8)], fill="gray")
+    img.save(ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--plano', help='PNG del plano; si no, se genera uno sintético')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pares = [tuple(k.split('_')) for k in POSICIONES]
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = args.plano
+        if not ruta:
+            ruta = os.path.join(carpeta, 'plano.png')
+            plano_sintetico(ruta)
+        anterior = MapaAnterior(ruta)
+        nuevo = RenderizadorMapa(ruta, ESP_POSICIONES, POSICIONES, TIEMPO_VISIBLE)
+
+        fila = {esp: -70 for esp in ESP_POSICIONES}
+        t_anterior = t_nuevo = 0.0
+        bytes_anterior = bytes_nuevo = 0
+        png_previo = None
+        fotogramas_distintos = 0
+        for tick in range(args.ticks):
+            if tick % 3 == 0:
+                fila = {esp: v + rng.choice([-6, -3, 0, 0, 3, 6]) for esp, v in fila.items()}
+                fila = {esp: max(-110, min(-50, v)) for esp, v in fila.items()}
+            nueva = pares[(tick // 60) % len(pares)]
+
+            t0 = time.perf_counter()
+            img_anterior, png = anterior.dibujar(fila, nueva, tick)
+            t_anterior += time.perf_counter() - t0
+            bytes_anterior += len(png)  # se enviaba en cada tick
+
+            t0 = time.perf_counter()
+            png = nuevo.renderizar(fila, nueva, tick)
+            t_nuevo += time.perf_counter() - t0
+            if png is not png_previo:
+                bytes_nuevo += len(png)
+                png_previo = png
+
+            diferencia = ImageChops.difference(img_anterior, Image.open(io.BytesIO(png)).convert("RGBA"))
+            if any(canal.getbbox() for canal in diferencia.split()):
+                fotogramas_distintos += 1
+
+    minutos = args.ticks / 60
+    stats = nuevo.estadisticas()
+    print(f"{'':>12} {'ms/fotograma':>13} {'KB/minuto':>10}")
+    print(f"{'anterior':>12} {t_anterior / args.ticks * 1e3:>13.2f} {bytes_anterior / 1024 / minutos:>10.0f}")
+    print(f"{'por capas':>12} {t_nuevo / args.ticks * 1e3:>13.2f} {bytes_nuevo / 1024 / minutos:>10.0f}")
+    print(f"PNG codificados: {stats['codificados']} de {stats['fotogramas']} fotogramas. "
+          f"Fotogramas con algún píxel distinto: {fotogramas_distintos}")
+
+
+if __name__ == '__main__':
+    main()
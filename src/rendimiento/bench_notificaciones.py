@@ -0,0 +1,210 @@
+"""
+Despachador de notificaciones (notificaciones.py) contra un servidor SMTP
+local de pruebas, frente al envío anterior (una conexión, EHLO y QUIT por
+alerta, en el mismo hilo que genera la alerta).
+
+El servidor de pruebas habla lo justo de SMTP, tarda --retraso segundos en
+aceptar cada mensaje y puede rechazar los primeros con un error temporal.
+Se comprueba:
+
+  1. Ráfaga: --alertas alertas repetidas de varias pulseras a tres
+     destinatarios. Se mide cuánto tarda enviar() como máximo (nunca debe
+     esperar al servidor), cuántos emails y conexiones hacen falta y
+     cuánto tardaba el envío anterior.
+  2. Errores temporales: el servidor rechaza los dos primeros mensajes con
+     451 y el lote se entrega en el tercer intento.
+  3. Límite por destinatario: con 2 emails por periodo, las alertas que
+     siguen llegando se agrupan y esperan al siguiente periodo.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_notificaciones.py [--alertas 300] [--retraso 0.05]
+"""
+
+import os
+import sys
+import time
+import smtplib
+import argparse
+import threading
+import socketserver
+from email import message_from_string
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from motor_alertas import Alerta  # noqa: E402
+from notificaciones import DespachadorNotificaciones  # noqa: E402
+
+
+class ServidorSMTPPrueba(socketserver.ThreadingTCPServer):
+    """SMTP mínimo en localhost: guarda los mensajes recibidos y cuenta conexiones."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, retraso=0.0, fallos=0):
+        self.retraso = retraso
+        self.fallos = fallos
+        self.mensajes = []
+        self.conexiones = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), ManejadorSMTP)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.conexiones += 1
+        self.responder('220 localhost prueba')
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            orden = linea.decode().strip().upper()
+            if orden.startswith(('EHLO', 'HELO')):
+                self.responder('250 localhost')
+            elif orden.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.responder('250 OK')
+            elif orden == 'DATA':
+                self.responder('354 fin con <CRLF>.<CRLF>')
+                datos = []
+                for linea in self.rfile:
+                    if linea in (b'.\r\n', b'.\n'):
+                        break
+                    datos.append(linea)
+                time.sleep(servidor.retraso)
+                with servidor.lock:
+                    fallar = servidor.fallos > 0
+                    if fallar:
+                        servidor.fallos -= 1
+                    else:
+                        mensaje = message_from_string(b''.join(datos).decode())
+                        servidor.mensajes.append(mensaje.get_payload(decode=True).decode())
+                self.responder('451 pruebe más tarde' if fallar else '250 aceptado')
+            elif orden == 'QUIT':
+                self.responder('221 adiós')
+                return
+            else:
+                self.responder('502 no implementado')
+
+
+def conectar_a(servidor):
+    def conectar():
+        sesion = smtplib.SMTP('127.0.0.1', servidor.puerto, timeout=10)
+        sesion.ehlo()
+        return sesion
+    return conectar
+
+
+def alertas_rafaga(n):
+    reglas = [('bano_largo', '¡Lleva demasiado tiempo en el baño!'), ('sin_senal', 'No se detecta señal de la pulsera')]
+    for k in range(n):
+        regla, mensaje = reglas[k % 2]
+        yield f'destino{k % 3}@ejemplo.com', Alerta(1735689600000 + 1000 * k, regla, f'pulsera{k % 10}', mensaje)
+
+
+def envio_anterior(servidor, destino, alerta):
+    """Como el GUI.enviar_email original: conexión nueva por alerta."""
+    msg = MIMEText(f"Alerta generada:\n\n{alerta.mensaje}")
+    msg['Subject'] = f"[IndoorPositioning] Alerta: {alerta.mensaje}"
+    msg['From'] = 'indoor@ejemplo.com'
+    msg['To'] = destino
+    sesion = smtplib.SMTP('127.0.0.1', servidor.puerto, timeout=10)
+    sesion.ehlo()
+    sesion.send_message(msg)
+    sesion.quit()
+
+
+def esperar(condicion, timeout=30):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+
+def rafaga(n, retraso):
+    servidor = ServidorSMTPPrueba(retraso)
+    despachador = DespachadorNotificaciones(remitente='indoor@ejemplo.com', ventana=0.5,
+                                            conectar=conectar_a(servidor))
+    peor = 0.0
+    t0 = time.perf_counter()
+    for destino, alerta in alertas_rafaga(n):
+        t = time.perf_counter()
+        despachador.enviar(destino, alerta)
+        peor = max(peor, time.perf_counter() - t)
+    t_encolar = time.perf_counter() - t0
+    ok = esperar(lambda: despachador.estadisticas()['pendientes'] == 0 and len(servidor.mensajes) > 0)
+    despachador.cerrar()
+    stats = despachador.estadisticas()
+    ok &= len(servidor.mensajes) == 3 and stats['conexiones'] == 1 and f'(x{n // 30},' in servidor.mensajes[0]
+    print(f"Ráfaga de {n} alertas: enviar() máx {peor * 1e6:.0f} µs (total {t_encolar * 1e3:.1f} ms), "
+          f"{stats['emails']} emails, {servidor.conexiones} conexión(es) -> {'bien' if ok else 'MAL'}")
+
+    servidor_anterior = ServidorSMTPPrueba(retraso)
+    t0 = time.perf_counter()
+    for destino, alerta in alertas_rafaga(n):
+        envio_anterior(servidor_anterior, destino, alerta)
+    t_anterior = time.perf_counter() - t0
+    print(f"Envío anterior: {t_anterior:.2f} s bloqueando al que genera las alertas, "
+          f"{len(servidor_anterior.mensajes)} emails, {servidor_anterior.conexiones} conexiones")
+    servidor.shutdown()
+    servidor_anterior.shutdown()
+    return ok
+
+
+def errores_temporales():
+    servidor = ServidorSMTPPrueba(fallos=2)
+    despachador = DespachadorNotificaciones(remitente='indoor@ejemplo.com', ventana=0.05, espera_inicial=0.1,
+                                            conectar=conectar_a(servidor))
+    despachador.enviar('a@ejemplo.com', Alerta(1735689600000, 'sin_senal', 'pulsera0', 'Sin señal'))
+    ok = esperar(lambda: len(servidor.mensajes) == 1, timeout=5)
+    stats = despachador.estadisticas()
+    despachador.cerrar()
+    ok &= stats['reintentos'] == 2
+    print(f"Errores temporales: {stats['reintentos']} reintentos, {len(servidor.mensajes)} entregado "
+          f"-> {'bien' if ok else 'MAL'}")
+    servidor.shutdown()
+    return ok
+
+
+def limite_por_destinatario():
+    servidor = ServidorSMTPPrueba()
+    despachador = DespachadorNotificaciones(remitente='indoor@ejemplo.com', ventana=0.05, max_por_periodo=2,
+                                            periodo=1.0, conectar=conectar_a(servidor))
+    for k in range(20):
+        despachador.enviar('a@ejemplo.com', Alerta(1735689600000 + k, f'regla{k}', 'pulsera0', f'Alerta {k}'))
+        time.sleep(0.025)
+    en_periodo = len(servidor.mensajes)
+    esperar(lambda: despachador.estadisticas()['pendientes'] == 0, timeout=5)
+    despachador.cerrar()
+    ok = en_periodo <= 2 and sum(m.count('Alerta ') for m in servidor.mensajes) == 20
+    print(f"Límite por destinatario: {en_periodo} emails en el primer periodo, {len(servidor.mensajes)} en total "
+          f"con las 20 alertas -> {'bien' if ok else 'MAL'}")
+    servidor.shutdown()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alertas', type=int, default=300)
+    parser.add_argument('--retraso', type=float, default=0.05, help='segundos que tarda el servidor por mensaje')
+    args = parser.parse_args()
+
+    ok = rafaga(args.alertas, args.retraso)
+    ok &= errores_temporales()
+    ok &= limite_por_destinatario()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+CPU del GUI según el número de sesiones abiertas: productor compartido
+frente a un bucle de lectura y dibujo por sesión (comportamiento anterior).
+
+Cada sesión es un hilo que durante --segundos recibe fotogramas y los
+"envía" (aquí sólo toca los bytes). Mientras, otro hilo va añadiendo filas
+al CSV de predicciones. El dibujo es el del GUI sin Streamlit: abrir el
+plano PNG, pintar receptores y posición y codificarlo de nuevo en PNG. Se
+mide el tiempo de CPU del proceso por segundo; con el productor compartido
+debe quedar plano al añadir sesiones.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_sesiones_gui.py [--sesiones 1 4 16] [--segundos 5]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from datos_gui import DatosGUI  # noqa: E402
+from productor_gui import ProductorFotogramas  # noqa: E402
+
+POSICIONES_VALIDAS = {"Salon": ["Sofa"], "Cocina": ["Fregadero"]}
+CABECERA = [f'ESP32_{i}' for i in range(1, 11)] + ['time', 'address', 'habitacion_predicha', 'posicion_predicha']
+
+
+def plano_sintetico():
+    buf = io.BytesIO()
+    Image.new('RGB', (1400, 700), 'white').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+PLANO = plano_sintetico()
+
+
+def renderizar(fila, posicion):
+    img = Image.open(io.BytesIO(PLANO)).convert('RGBA')
+    d = ImageDraw.Draw(img)
+    for i in range(10):
+        x, y = 100 + 120 * i, 350
+        d.ellipse((x - 6, y - 6, x + 6, y + 6), fill='green')
+    if posicion:
+        d.ellipse((686, 336, 714, 364), fill='blue')
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue(), None
+
+
+def escritor(ruta, parar, intervalo):
+    pares = [('Salon', 'Sofa'), ('Cocina', 'Fregadero')]
+    k = 0
+    while not parar.is_set():
+        hab, pos = pares[(k // 10) % 2]
+        with open(ruta, 'a', encoding='utf-8') as f:
+            f.write(','.join(['-70'] * 10 + [str(1735722000000 + 3000 * k), 'e34ce8b466a0', hab, pos]) + '\n')
+        k += 1
+        time.sleep(intervalo)
+
+
+def sesion_compartida(productor, parar):
+    version = 0
+    while not parar.is_set():
+        fotograma = productor.esperar(version, timeout=0.5)
+        if fotograma.version != version:
+            version = fotograma.version
+            len(fotograma.mapa or b'')
+
+
+def sesion_propia(ruta, parar, intervalo):
+    # Bucle anterior: cada sesión lee y dibuja por su cuenta
+    datos = DatosGUI(ruta, POSICIONES_VALIDAS)
+    while not parar.is_set():
+        datos.actualizar()
+        tabla = datos.ultimas_filas()
+        if not tabla.empty:
+            renderizar(tabla.iloc[-1], datos.posicion_estable)
+        time.sleep(intervalo)
+
+
+def medir(modo, n_sesiones, segundos, intervalo):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'predicciones.csv')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(','.join(CABECERA) + '\n')
+        parar = threading.Event()
+        hilos = [threading.Thread(target=escritor, args=(ruta, parar, intervalo / 2))]
+        productor = None
+        if modo == 'compartido':
+            productor = ProductorFotogramas(DatosGUI(ruta, POSICIONES_VALIDAS), renderizar, intervalo)
+            hilos += [threading.Thread(target=sesion_compartida, args=(productor, parar)) for _ in range(n_sesiones)]
+        else:
+            hilos += [threading.Thread(target=sesion_propia, args=(ruta, parar, intervalo)) for _ in range(n_sesiones)]
+
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        for h in hilos:
+            h.start()
+        time.sleep(segundos)
+        parar.set()
+        for h in hilos:
+            h.join()
+        if productor:
+            productor.detener()
+        return (time.process_time() - cpu0) / (time.perf_counter() - t0) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--intervalo', type=float, default=0.25, help='segundos por tick (el GUI usa 1)')
+    args = parser.parse_args()
+
+    print(f"{'sesiones':>8} {'compartido % CPU':>17} {'por sesión % CPU':>17}")
+    for n in args.sesiones:
+        compartido = medir('compartido', n, args.segundos, args.intervalo)
+        propio = medir('por_sesion', n, args.segundos, args.intervalo)
+        print(f"{n:>8} {compartido:>17.1f} {propio:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Vista de intervalos mantenida por el detector de acciones
+(vista_intervalos.py) frente a recalcular los intervalos desde las
+predicciones en cada exportación.
+
+Para cada número de días de --dias genera predicciones sintéticas de una
+pulsera (una fila cada 3 s, rachas de 2 a 30 minutos y filas "Duda"), las
+pasa por un ActionDetector con y sin vista para medir lo que cuesta
+mantenerla, y después exporta un día del medio leyendo la vista y
+recalculando desde el CSV. Comprueba que los intervalos de posición cerrados
+quedan encadenados (cada salida es la entrada del siguiente) y que las
+habitaciones suman el mismo tiempo que las posiciones.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_vista_intervalos.py [--dias 1 7 30]
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import accionNew  # noqa: E402
+from intervalos import VALID_POSITIONS_BY_ROOM, generar_intervalos_separados, leer_intervalos_materializados  # noqa: E402
+from vista_intervalos import VistaIntervalos, leer_cerrados  # noqa: E402
+
+FILAS_POR_DIA = 28800
+INICIO = 1735689600000  # 1/1/2025 UTC
+MS_POR_DIA = 24 * 3600 * 1000
+
+
+class LogNulo:
+    """Sustituye al RegistroAcciones para medir sólo el detector."""
+
+    def escribir(self, descripcion, ts, action_type, address=None):
+        return ts
+
+
+def generar_filas(dias, semilla=0):
+    rng = np.random.default_rng(semilla)
+    n = dias * FILAS_POR_DIA
+    pares = [(h, p) for h, ps in VALID_POSITIONS_BY_ROOM.items() for p in ps]
+    rachas = rng.integers(40, 600, size=n // 40 + 1)
+    idx = np.repeat(rng.integers(len(pares), size=len(rachas)), rachas)[:n]
+    duda = rng.random(n) < 0.05
+    filas = []
+    for k in range(n):
+        hab, pos = ('Duda', 'Duda') if duda[k] else pares[idx[k]]
+        filas.append({'time': INICIO + 3000 * k, 'address': 'e34ce8b466a0',
+                      'habitacion_predicha': hab, 'posicion_predicha': pos})
+    return filas
+
+
+def alimentar(filas, vista):
+    accionNew.detectors.clear()
+    detector = accionNew.ActionDetector(LogNulo(), 'e34ce8b466a0', vista)
+    t0 = time.perf_counter()
+    for fila in filas:
+        detector.detect_actions(fila)
+    return time.perf_counter() - t0
+
+
+def comprobar(carpeta):
+    pos, hab = leer_cerrados(carpeta, 0, 2 ** 62)
+    encadenadas = (pos['time'].to_numpy()[:-1] == pos['entrada'].to_numpy()[1:]).all()
+    mismo_total = (pos['time'] - pos['entrada']).sum() == (hab['time'] - hab['entrada']).sum()
+    return len(pos), len(hab), bool(encadenadas and mismo_total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, nargs='+', default=[1, 7, 30])
+    args = parser.parse_args()
+
+    print(f"{'días':>5} {'µs/fila sin':>12} {'µs/fila con':>12} {'intervalos':>11} "
+          f"{'CSV export s':>13} {'vista export s':>15}  coherentes")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for dias in args.dias:
+            filas = generar_filas(dias)
+            vista_dir = os.path.join(carpeta, f'vista_{dias}')
+            csv = os.path.join(carpeta, f'pred_{dias}.csv')
+            pd.DataFrame(filas).to_csv(csv, index=False)
+
+            t_sin = alimentar(filas, None)
+            vista = VistaIntervalos(vista_dir)
+            t_con = alimentar(filas, vista)
+            vista.cerrar()
+            n_pos, n_hab, ok = comprobar(vista_dir)
+
+            medio = datetime.datetime.fromtimestamp((INICIO + dias // 2 * MS_POR_DIA) / 1000)
+            dt_i = medio.replace(hour=0, minute=0, second=0, microsecond=0)
+            dt_f = dt_i.replace(hour=23, minute=59, second=59)
+            t0 = time.perf_counter()
+            generar_intervalos_separados(csv, dt_i, dt_f)
+            t_csv = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            df_pos, _ = leer_intervalos_materializados(vista_dir, dt_i, dt_f)
+            t_vista = time.perf_counter() - t0
+            ok &= len(df_pos) > 0
+
+            print(f"{dias:>5} {t_sin / len(filas) * 1e6:>12.2f} {t_con / len(filas) * 1e6:>12.2f} "
+                  f"{n_pos:>5}/{n_hab:<5} {t_csv:>13.3f} {t_vista:>15.3f}  {'sí' if ok else 'NO'}")
+            if not ok:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
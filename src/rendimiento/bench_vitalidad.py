@@ -0,0 +1,117 @@
+"""
+Tabla de vitalidad (vitalidad.py) con cientos de receptores.
+
+Para cada número de receptores de --receptores:
+
+  1. Mide lo que cuesta visto() por mensaje, con --pulseras pulseras.
+  2. Con tráfico en marcha desde otro hilo, deja de enviar de un 10 % de
+     los receptores y de una pulsera, y mide cuánto tarda cada aviso desde
+     el último mensaje. Debe quedar entre el plazo y el plazo más una
+     resolución de la rueda (más el retraso del hilo), sin falsos avisos de
+     los que siguen enviando.
+  3. Cuenta las veces que ha vencido un temporizador: depende del número
+     de entradas y del plazo, no del número de mensajes ni de ticks.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/bench_vitalidad.py [--receptores 10 100 500] [--plazo 0.5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from temporizadores import RuedaTemporizadores  # noqa: E402
+from vitalidad import TablaVitalidad  # noqa: E402
+
+
+class TablaContada(TablaVitalidad):
+    """Cuenta los vencimientos de temporizadores."""
+
+    vencimientos = 0
+
+    def _vencer(self, latido):
+        self.vencimientos += 1
+        super()._vencer(latido)
+
+
+def coste_visto(n_receptores, n_pulseras, mensajes):
+    receptores = [f'ESP32_{i}' for i in range(n_receptores)]
+    pulseras = [f'{i:012x}' for i in range(n_pulseras)]
+    rueda = RuedaTemporizadores()
+    tabla = TablaVitalidad(receptores, 30, 60, al_evento=lambda e: None, rueda=rueda)
+    t0 = time.perf_counter()
+    for k in range(mensajes):
+        tabla.visto(receptores[k % n_receptores], pulseras[k % n_pulseras])
+    t = time.perf_counter() - t0
+    rueda.detener()
+    return t / mensajes
+
+
+def deteccion(n_receptores, plazo, resolucion, duracion):
+    receptores = [f'ESP32_{i}' for i in range(n_receptores)]
+    pulseras = ['pulsera_viva', 'pulsera_perdida']
+    callados = set(receptores[:max(1, n_receptores // 10)])
+    eventos = []
+    ultimo = {}
+    rueda = RuedaTemporizadores(resolucion)
+    tabla = TablaContada(receptores, plazo, plazo, al_evento=eventos.append, rueda=rueda)
+    parar = threading.Event()
+    mensajes = 0
+
+    def trafico():
+        nonlocal mensajes
+        inicio = time.monotonic()
+        while not parar.is_set():
+            ahora = time.monotonic()
+            corte = ahora - inicio > plazo  # los callados y la pulsera perdida paran tras un plazo
+            for i, r in enumerate(receptores):
+                if corte and r in callados:
+                    continue
+                p = pulseras[0] if corte else pulseras[i % 2]
+                tabla.visto(r, p)
+                ultimo[r] = ultimo[p] = time.monotonic()
+                mensajes += 1
+            time.sleep(0.005)
+
+    hilo = threading.Thread(target=trafico)
+    hilo.start()
+    time.sleep(duracion)
+    parar.set()
+    hilo.join()
+    rueda.detener()
+
+    # Retraso de cada aviso desde el último mensaje de su receptor o pulsera
+    avisos = {e.nombre: e for e in eventos if e.tipo in ('receptor_caido', 'pulsera_perdida')}
+    esperados = callados | {'pulsera_perdida'}
+    retrasos = [avisos[n].segundos - plazo for n in esperados if n in avisos]
+    ok = set(avisos) == esperados and all(-1e-3 <= r <= resolucion + 0.1 for r in retrasos)
+    return ok, len(avisos), len(esperados), max(retrasos, default=0.0), mensajes, tabla.vencimientos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--receptores', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--pulseras', type=int, default=100)
+    parser.add_argument('--plazo', type=float, default=0.5)
+    parser.add_argument('--resolucion', type=float, default=0.01)
+    args = parser.parse_args()
+
+    duracion = 4 * args.plazo
+    print(f"{'receptores':>10} {'µs/visto':>9} {'avisos':>8} {'máx sobre plazo ms':>19} "
+          f"{'mensajes':>9} {'vencimientos':>13}  correcto")
+    ok_total = True
+    for n in args.receptores:
+        us = coste_visto(n, args.pulseras, 200000) * 1e6
+        ok, avisos, esperados, retraso, mensajes, vencimientos = deteccion(n, args.plazo, args.resolucion, duracion)
+        ok_total &= ok
+        print(f"{n:>10} {us:>9.2f} {avisos:>4}/{esperados:<3} {retraso * 1e3:>19.1f} "
+              f"{mensajes:>9} {vencimientos:>13}  {'sí' if ok else 'NO'}")
+    if not ok_total:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
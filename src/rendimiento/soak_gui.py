@@ -0,0 +1,82 @@
+"""
+Prueba de resistencia de memoria del GUI: simula días de funcionamiento
+del productor compartido (DatosGUI + historial de RSSI + RenderizadorMapa)
+y comprueba con tracemalloc que la memoria no crece.
+
+Se escribe una fila de predicción cada 3 s simulados (con RSSI variable y
+cambios de posición) y tras cada fila se produce un fotograma. Se anota la
+memoria trazada cada --cada horas simuladas. Termina con error si, pasada la
+primera hora, crece más de --limite-kb.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/soak_gui.py [--dias 1] [--limite-kb 256]
+"""
+
+import gc
+import os
+import sys
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from datos_gui import DatosGUI  # noqa: E402
+from mapa import RenderizadorMapa  # noqa: E402
+from productor_gui import ProductorFotogramas  # noqa: E402
+
+RECEPTORES = [f'ESP32_{i}' for i in range(1, 11)]
+CABECERA = RECEPTORES + ['time', 'address', 'habitacion_predicha', 'posicion_predicha']
+POSICIONES = {"Salon_Sofa": (50, 40), "Cocina_Fregadero": (150, 60), "Dormitorio_Cama": (100, 90)}
+POSICIONES_VALIDAS = {"Salon": ["Sofa"], "Cocina": ["Fregadero"], "Dormitorio": ["Cama"]}
+FILAS_POR_HORA = 1200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=float, default=1)
+    parser.add_argument('--cada', type=float, default=6, help='horas simuladas entre mediciones')
+    parser.add_argument('--limite-kb', type=float, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pares = [tuple(k.split('_')) for k in POSICIONES]
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'predicciones.csv')
+        plano = os.path.join(carpeta, 'plano.png')
+        Image.new('RGB', (200, 100), 'white').save(plano)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(','.join(CABECERA) + '\n')
+
+        mapa = RenderizadorMapa(plano, {esp: (15 * i + 10, 10) for i, esp in enumerate(RECEPTORES)}, POSICIONES)
+        # Intervalo enorme: los fotogramas se producen a mano tras cada fila
+        productor = ProductorFotogramas(DatosGUI(ruta, POSICIONES_VALIDAS), mapa.renderizar, intervalo=1e6)
+
+        total = int(args.dias * 24 * FILAS_POR_HORA)
+        cada = int(args.cada * FILAS_POR_HORA)
+        medidas = []
+        tracemalloc.start()
+        with open(ruta, 'a', encoding='utf-8') as f:
+            for k in range(total):
+                hab, pos = pares[(k // 200) % len(pares)]
+                rssi = [str(rng.choice([-150, rng.randint(-100, -50)])) for _ in RECEPTORES]
+                f.write(','.join(rssi + [str(1735689600000 + 3000 * k), 'e34ce8b466a0', hab, pos]) + '\n')
+                f.flush()
+                productor._producir()
+                if k + 1 == FILAS_POR_HORA or (k + 1) % cada == 0:
+                    gc.collect()  # los DataFrame tienen ciclos: sin esto se mide también basura pendiente
+                    medidas.append(((k + 1) / FILAS_POR_HORA, tracemalloc.get_traced_memory()[0] / 1024))
+                    print(f"{medidas[-1][0]:>7.1f} h  {medidas[-1][1]:>9.0f} KB")
+        tracemalloc.stop()
+        productor.detener()
+
+    crecimiento = medidas[-1][1] - medidas[0][1]
+    print(f"Crecimiento desde la primera hora: {crecimiento:.0f} KB")
+    if crecimiento > args.limite_kb:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
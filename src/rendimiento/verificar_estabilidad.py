@@ -0,0 +1,108 @@
+"""
+Comprueba que StabilityTracker decide exactamente igual que la comprobación
+de estabilidad anterior de accionNew (Counter sobre la ventana + copia de la
+cola) y mide el coste por fila de ambas.
+
+Se prueban secuencias aleatorias con pocos valores, para forzar empates en
+la moda, con todas las combinaciones de ventana y consecutivos hasta
+--ventana-max (incluidos consecutivos <= 0 y mayores que la ventana).
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/verificar_estabilidad.py [--ventana-max 9] [--filas 2000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import deque, Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from accionNew import StabilityTracker  # noqa: E402
+
+
+# Implementación anterior, copiada tal cual para comparar
+def get_stable_value(window, window_ts, window_size):
+    if len(window) < window_size:
+        return None, None
+    val, _ = Counter(window).most_common(1)[0]
+    # devolvemos la primera aparición de ese valor en la ventana
+    for v, t in zip(window, window_ts):
+        if v == val:
+            return val, t
+    return None, None
+
+
+def confirm_stability(value, window, min_consec, window_ts):
+    if value is None:
+        return None, None
+    tail = list(window)[-min_consec:]
+    tail_ts = list(window_ts)[-min_consec:]
+    if len(tail) == min_consec and all(v == value for v in tail):
+        return value, tail_ts[0]
+    return None, None
+
+
+def original(secuencia, W, K):
+    window, window_ts = deque(maxlen=W), deque(maxlen=W)
+    salida = []
+    for t, v in enumerate(secuencia):
+        window.append(v)
+        window_ts.append(t)
+        val, _ = get_stable_value(window, window_ts, W)
+        salida.append(confirm_stability(val, window, K, window_ts))
+    return salida
+
+
+def incremental(secuencia, W, K):
+    tracker = StabilityTracker(W, K)
+    salida = []
+    for t, v in enumerate(secuencia):
+        tracker.push(v, t)
+        salida.append(tracker.stable())
+    return salida
+
+
+def secuencia_aleatoria(rng, n, valores):
+    # Rachas de longitud variable para que haya tanto estabilidad como empates
+    secuencia = []
+    while len(secuencia) < n:
+        secuencia.extend([rng.randrange(valores)] * rng.choice([1, 1, 2, 3, 5, 8]))
+    return secuencia[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ventana-max', type=int, default=9)
+    parser.add_argument('--filas', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    casos = 0
+    for W in range(1, args.ventana_max + 1):
+        for K in range(-1, W + 3):
+            for valores in (1, 2, 3, 6):
+                secuencia = secuencia_aleatoria(rng, args.filas, valores)
+                if original(secuencia, W, K) != incremental(secuencia, W, K):
+                    print(f"Diferencia con ventana={W} consecutivos={K} valores={valores}")
+                    sys.exit(1)
+                casos += 1
+    print(f"{casos} combinaciones idénticas")
+
+    print(f"{'ventana':>8} {'original us/fila':>17} {'tracker us/fila':>16}")
+    secuencia = secuencia_aleatoria(rng, 50000, 6)
+    for W in (5, 20, 100):
+        K = max(1, W * 3 // 5)
+        t0 = time.perf_counter()
+        original(secuencia, W, K)
+        t_original = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        incremental(secuencia, W, K)
+        t_tracker = time.perf_counter() - t0
+        print(f"{W:>8} {t_original / len(secuencia) * 1e6:>17.2f} {t_tracker / len(secuencia) * 1e6:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
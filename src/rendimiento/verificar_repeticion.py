@@ -0,0 +1,112 @@
+"""
+Comprueba que la repetición por lotes de accionNew genera exactamente el
+mismo log de acciones que el camino en streaming, y mide ambos.
+
+Si no se indica --entrada, genera un CSV de predicciones sintético de
+--dias días (una fila cada 3 s, con ruido y filas "Duda"). Sirve también con
+ventanas distintas de las de producción (--ventana, --consecutivos) para
+cubrir los desempates de la moda.
+
+Uso (desde la raíz del proyecto):
+    python src/rendimiento/verificar_repeticion.py [--dias 30] [--entrada archivo.csv]
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import tempfile
+import filecmp
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import accionNew  # noqa: E402
+from registro_acciones import RegistroAcciones  # noqa: E402
+
+POSICIONES_POR_HABITACION = {
+    "Dormitorio": ["Cama", "Escritorio"],
+    "Salon": ["Sofa", "Mesa de juegos"],
+    "Cocina": ["Frigorifico", "Fregadero", "Vitroceramica"],
+    "Baño": ["WC", "Lavabo"]
+}
+
+
+def generar_predicciones(ruta, dias, semilla=0):
+    rng = np.random.default_rng(semilla)
+    pares = [(h, p) for h, ps in POSICIONES_POR_HABITACION.items() for p in ps]
+    habitaciones = list(POSICIONES_POR_HABITACION)
+    posiciones = [p for _, p in pares]
+    n = dias * 24 * 3600 // 3
+    t = 1735689600000  # 01/01/2025, en ms epoch
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'address', 'habitacion_predicha', 'posicion_predicha'])
+        escritas = 0
+        while escritas < n:
+            hab, pos = pares[rng.integers(len(pares))]
+            for _ in range(int(rng.integers(1, 200))):
+                ruido = rng.random()
+                h, p = hab, pos
+                if ruido < 0.08:
+                    h, p = 'Duda', 'Duda'
+                elif ruido < 0.12:
+                    p = 'Duda'
+                elif ruido < 0.20:
+                    h = habitaciones[rng.integers(len(habitaciones))]
+                    p = posiciones[rng.integers(len(posiciones))]
+                # Alguna fila repite segundo y alguna salta varios
+                t += int(rng.choice([0, 3000, 3000, 3000, 4000, 30000]))
+                writer.writerow([t, 'e34ce8b466a0', h, p])
+                escritas += 1
+
+
+def streaming(entrada, salida):
+    accionNew.detectors.clear()
+    accionNew.action_log = RegistroAcciones(salida, max_filas=10000, max_segundos=float('inf'))
+    with open(entrada, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            accionNew.detect_actions(row)
+    accionNew.action_log.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entrada', help='CSV de predicciones; si no, se genera uno sintético')
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--ventana', type=int, default=accionNew.WINDOW_SIZE)
+    parser.add_argument('--consecutivos', type=int, default=accionNew.MIN_STABLE_CONSECUTIVE)
+    args = parser.parse_args()
+
+    accionNew.WINDOW_SIZE = args.ventana
+    accionNew.MIN_STABLE_CONSECUTIVE = args.consecutivos
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        entrada = args.entrada
+        if not entrada:
+            entrada = os.path.join(carpeta, 'predicciones.csv')
+            generar_predicciones(entrada, args.dias)
+        log_streaming = os.path.join(carpeta, 'acciones_streaming.csv')
+        log_lotes = os.path.join(carpeta, 'acciones_lotes.csv')
+
+        t0 = time.perf_counter()
+        streaming(entrada, log_streaming)
+        t_streaming = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        accionNew.replay_predictions(entrada, log_lotes)
+        t_lotes = time.perf_counter() - t0
+
+        iguales = filecmp.cmp(log_streaming, log_lotes, shallow=False)
+        with open(log_lotes, encoding='utf-8') as f:
+            acciones = sum(1 for _ in f) - 1
+
+    print(f"Acciones: {acciones}  Logs idénticos: {'sí' if iguales else 'NO'}")
+    print(f"Streaming: {t_streaming:.2f} s  Lotes: {t_lotes:.2f} s  (x{t_streaming / t_lotes:.1f})")
+    if not iguales:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
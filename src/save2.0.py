@@ -5,6 +5,8 @@ import os
 import threading
 import time
 
+from temporizadores import RuedaTemporizadores
+
 # Configuración del broker MQTT
 MQTT_BROKER = "192.168.0.190" 
 MQTT_PORT = 1883
@@ -25,6 +27,7 @@ current_row = None  # Fila pendiente
 row_lock = threading.RLock()
 timeout_thread = None
 TIMEOUT_SECONDS = 3.5 # Tiempo de espera para completar la fila
+rueda = RuedaTemporizadores()  # Un único hilo para todos los tiempos de espera
 esp32_ids = {
     'receivers/1': 'ESP32_1',
     'receivers/2': 'ESP32_2',
@@ -76,9 +79,8 @@ def on_message(client, userdata, msg):
                         current_row[esp_id] = None
                     print(f"Fila pendiente creada: {current_row}")
 
-                    # Iniciar temporizador para cerrar la fila después de TIMEOUT_SECONDS
-                    timeout_thread = threading.Timer(TIMEOUT_SECONDS, write_row_to_csv)
-                    timeout_thread.start()
+                    # Programar el cierre de esta fila después de TIMEOUT_SECONDS
+                    timeout_thread = rueda.programar(TIMEOUT_SECONDS, write_row_to_csv, current_row)
 
                 # Actualizar la fila pendiente con los datos recibidos
                 current_row[esp32_id] = rssi
@@ -93,10 +95,13 @@ def on_message(client, userdata, msg):
         print("Error al procesar el mensaje:", e)
 
 # Función para escribir la fila pendiente en el CSV
-def write_row_to_csv():
+def write_row_to_csv(fila=None):
     global current_row, timeout_thread
 
     with row_lock:
+        # Un vencimiento atrasado no debe cerrar una fila posterior
+        if fila is not None and fila is not current_row:
+            return
         if current_row is not None:
             # Reemplazar None por -150
             for esp_id in all_esp32_ids:
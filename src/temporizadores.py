@@ -0,0 +1,92 @@
+"""
+Rueda de temporizadores (hashed timing wheel) servida por un único hilo.
+
+Sustituye a un threading.Timer por fila: programar y cancelar cuestan O(1)
+y no se crea ningún hilo nuevo por mucho que crezca el número de filas
+pendientes. Los vencimientos se atienden con un retraso máximo de una
+resolución.
+"""
+
+import math
+import threading
+import time
+
+
+class Temporizador:
+    """Entrada de la rueda. cancel() sólo la marca; la rueda la descarta al pasar."""
+
+    __slots__ = ('vueltas', 'callback', 'args', 'cancelado')
+
+    def __init__(self, vueltas, callback, args):
+        self.vueltas = vueltas
+        self.callback = callback
+        self.args = args
+        self.cancelado = False
+
+    def cancel(self):
+        self.cancelado = True
+
+
+class RuedaTemporizadores:
+    """
+    `ranuras` listas recorridas en círculo, una por tick de `resolucion`
+    segundos. Un temporizador más largo que una vuelta completa guarda las
+    vueltas que le faltan y se descuenta cada vez que su ranura se visita.
+    """
+
+    def __init__(self, resolucion=0.05, ranuras=256):
+        self.resolucion = resolucion
+        self.ranuras = [[] for _ in range(ranuras)]
+        self.tick = 0
+        self.lock = threading.Lock()
+        self.parar = threading.Event()
+        self.hilo = threading.Thread(target=self._bucle, name='rueda-temporizadores', daemon=True)
+        self.hilo.start()
+
+    def programar(self, retraso, callback, *args):
+        """Llama a callback(*args) dentro de `retraso` segundos. Devuelve el Temporizador."""
+        ticks = max(1, math.ceil(retraso / self.resolucion))
+        n = len(self.ranuras)
+        with self.lock:
+            temporizador = Temporizador((ticks - 1) // n, callback, args)
+            self.ranuras[(self.tick + ticks) % n].append(temporizador)
+        return temporizador
+
+    def detener(self):
+        self.parar.set()
+        self.hilo.join()
+
+    def _bucle(self):
+        siguiente = time.monotonic() + self.resolucion
+        while not self.parar.wait(max(0.0, siguiente - time.monotonic())):
+            # Si el hilo se ha retrasado se atienden todos los ticks atrasados
+            while siguiente <= time.monotonic():
+                self._avanzar()
+                siguiente += self.resolucion
+
+    def _avanzar(self):
+        vencidos = []
+        with self.lock:
+            self.tick += 1
+            indice = self.tick % len(self.ranuras)
+            ranura = self.ranuras[indice]
+            if not ranura:
+                return
+            quedan = []
+            for temporizador in ranura:
+                if temporizador.cancelado:
+                    continue
+                if temporizador.vueltas:
+                    temporizador.vueltas -= 1
+                    quedan.append(temporizador)
+                else:
+                    vencidos.append(temporizador)
+            self.ranuras[indice] = quedan
+
+        for temporizador in vencidos:
+            if temporizador.cancelado:
+                continue
+            try:
+                temporizador.callback(*temporizador.args)
+            except Exception as e:
+                print("Error en un temporizador:", e)
@@ -0,0 +1,89 @@
+"""
+Marcas de tiempo del sistema: enteros de milisegundos desde epoch (UTC).
+
+Todo el pipeline (ensamblador, predicciones, bus, detector de acciones y log
+de acciones) trabaja con estos enteros; el texto 'DD/MM/YYYY HH:MM:SS' en
+hora local sólo se genera al mostrar o exportar. a_ms, serie_a_ms y
+tiempos_validos aceptan también ese formato antiguo para poder leer los CSV
+ya existentes; tiempos_validos además marca los valores que no se pueden
+leer (filas cortadas o dañadas) en vez de fallar.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FORMATO = '%d/%m/%Y %H:%M:%S'
+MS_POR_HORA = 3600 * 1000
+
+
+def ahora_ms():
+    return time.time_ns() // 1_000_000
+
+
+def a_ms(valor):
+    """Convierte a ms epoch un entero, su texto, un datetime local o el formato antiguo."""
+    if isinstance(valor, (int, np.integer)):
+        return int(valor)
+    if isinstance(valor, datetime):
+        return int(valor.timestamp() * 1000)
+    valor = str(valor)
+    if valor.isdigit():
+        return int(valor)
+    return int(datetime.strptime(valor, FORMATO).timestamp() * 1000)
+
+
+def formatear(ms, formato=FORMATO):
+    """Texto en hora local de una marca en ms."""
+    return datetime.fromtimestamp(ms / 1000).strftime(formato)
+
+
+def _desfases_locales(ms):
+    """Desfase hora local - UTC (ms) en cada instante; se calcula una vez por hora distinta."""
+    horas, inversa = np.unique(ms // MS_POR_HORA, return_inverse=True)
+    desfases = np.array([time.localtime(h * 3600).tm_gmtoff * 1000 for h in horas.tolist()], dtype=np.int64)
+    return desfases[inversa.reshape(-1)]
+
+
+def tiempos_validos(serie):
+    """
+    Columna de tiempos (ms o formato antiguo) a (array int64 de ms epoch,
+    máscara de filas válidas). Los valores vacíos o que no se pueden leer
+    quedan a 0 y fuera de la máscara, para que quien llama los descarte.
+    """
+    serie = pd.Series(serie)
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.to_numpy(dtype=np.int64), np.ones(len(serie), dtype=bool)
+    numerica = pd.to_numeric(serie, errors='coerce')
+    antiguas = numerica.isna().to_numpy()
+    resultado = numerica.fillna(0).to_numpy(dtype=np.int64)
+    validas = ~antiguas
+    if antiguas.any():
+        # Formato antiguo en hora local: se lee como si fuera UTC y se corrige el desfase
+        fechas = pd.to_datetime(serie[antiguas], format=FORMATO, errors='coerce')
+        leidas = fechas.notna().to_numpy()
+        locales = fechas[leidas].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        epoch = locales - _desfases_locales(locales)
+        posiciones = np.flatnonzero(antiguas)[leidas]
+        resultado[posiciones] = locales - _desfases_locales(epoch)
+        validas[posiciones] = True
+    return resultado, validas
+
+
+def serie_a_ms(serie):
+    """Columna de tiempos (ms o formato antiguo) a array int64 de ms epoch; falla si alguno no se lee."""
+    resultado, validas = tiempos_validos(serie)
+    if not validas.all():
+        malo = pd.Series(serie).iloc[int(np.argmin(validas))]
+        raise ValueError(f"Tiempo no válido: {malo!r}")
+    return resultado
+
+
+def serie_a_datetime(ms):
+    """Columna de ms epoch a datetime64 en hora local (sin zona), para mostrar o filtrar."""
+    indice = ms.index if isinstance(ms, pd.Series) else None
+    ms = np.asarray(ms, dtype=np.int64)
+    locales = (ms + _desfases_locales(ms)).astype('datetime64[ms]').astype('datetime64[ns]')
+    return pd.Series(locales, index=indice)
@@ -0,0 +1,132 @@
+"""
+Vista materializada de los intervalos de permanencia, mantenida por el
+detector de acciones (accionNew.py).
+
+El detector ya sabe en qué instante cambia la habitación y la posición
+estables de cada pulsera; en cada transición se cierra el intervalo de
+posición anterior (y el de habitación, si cambia) y se añade al archivo por
+días (archivo.py), en las subcarpetas posiciones/ y habitaciones/. Los
+intervalos en curso de cada pulsera se guardan aparte en abiertos.json, con
+la hora de la última predicción vista, para que las exportaciones y los
+paneles incluyan también el tiempo que lleva en la posición actual. Al
+cerrar, los intervalos abiertos se cierran en esa última predicción.
+
+Así la exportación lee intervalos ya calculados (intervalos.py,
+leer_intervalos_materializados) y su coste no depende del número de
+predicciones. La vista sólo tiene intervalos desde la primera vez que se
+usó (inicio_vista); lo anterior se sigue calculando de las predicciones
+(intervalos_exportacion).
+"""
+
+import os
+import json
+import time
+
+from archivo import (EscritorArchivo, ArchivoDiario,
+                     ESQUEMA_INTERVALOS_POSICION, ESQUEMA_INTERVALOS_HABITACION)
+
+ABIERTOS = 'abiertos.json'
+
+
+class VistaIntervalos:
+    """Escritor de la vista; un solo proceso (el detector) por carpeta."""
+
+    def __init__(self, carpeta, max_segundos=5.0):
+        self.carpeta = carpeta
+        self.max_segundos = max_segundos
+        # Mismo plazo que abiertos.json, para que un intervalo recién cerrado no desaparezca de las consultas
+        self.posiciones = EscritorArchivo(os.path.join(carpeta, 'posiciones'), ESQUEMA_INTERVALOS_POSICION,
+                                          max_segundos=max_segundos)
+        self.habitaciones = EscritorArchivo(os.path.join(carpeta, 'habitaciones'), ESQUEMA_INTERVALOS_HABITACION,
+                                            max_segundos=max_segundos)
+        # address -> [habitacion, posicion, entrada habitación, entrada posición, última predicción]
+        self.abiertos = {}
+        self.cambios = False
+        self.ultimo_guardado = time.monotonic()
+        self._cerrar_anteriores()
+
+    def transicion(self, address, habitacion, posicion, ts):
+        """Nuevo par estable (habitación, posición) de `address` desde `ts` (ms epoch)."""
+        address = address or ''
+        abierto = self.abiertos.get(address)
+        if abierto is None:
+            self.abiertos[address] = [habitacion, posicion, ts, ts, ts]
+        else:
+            hab, pos, entrada_hab, entrada_pos, _ = abierto
+            ts = max(ts, entrada_pos)
+            if (hab, pos) != (habitacion, posicion):
+                self.posiciones.anadir([ts, entrada_pos, address, hab, pos])
+                abierto[1], abierto[3] = posicion, ts
+            if hab != habitacion:
+                self.habitaciones.anadir([ts, entrada_hab, address, hab])
+                abierto[0], abierto[2] = habitacion, ts
+            abierto[4] = max(abierto[4], ts)
+        self.cambios = True
+        self.volcar_si_toca()
+
+    def visto(self, address, ts):
+        """Última predicción de `address`: alarga sus intervalos abiertos."""
+        abierto = self.abiertos.get(address or '')
+        if abierto is not None and ts > abierto[4]:
+            abierto[4] = ts
+            self.cambios = True
+            if time.monotonic() - self.ultimo_guardado >= self.max_segundos:
+                self.volcar_si_toca()
+
+    def volcar_si_toca(self):
+        if self.cambios and time.monotonic() - self.ultimo_guardado >= self.max_segundos:
+            self._guardar_abiertos()
+        self.posiciones.volcar_si_toca()
+        self.habitaciones.volcar_si_toca()
+
+    def cerrar(self):
+        """Cierra los intervalos abiertos en la última predicción vista de cada pulsera."""
+        for address, (hab, pos, entrada_hab, entrada_pos, visto) in self.abiertos.items():
+            self.posiciones.anadir([visto, entrada_pos, address, hab, pos])
+            self.habitaciones.anadir([visto, entrada_hab, address, hab])
+        self.abiertos.clear()
+        self.posiciones.cerrar()
+        self.habitaciones.cerrar()
+        self._guardar_abiertos()
+
+    def _cerrar_anteriores(self):
+        """Si la ejecución anterior terminó sin cerrar, sus intervalos acaban en su última predicción."""
+        self.abiertos = leer_abiertos(self.carpeta)
+        if self.abiertos:
+            self.cerrar()
+
+    def _guardar_abiertos(self):
+        ruta = os.path.join(self.carpeta, ABIERTOS)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.abiertos, f)
+        os.replace(ruta + '.tmp', ruta)
+        self.cambios = False
+        self.ultimo_guardado = time.monotonic()
+
+
+def leer_abiertos(carpeta):
+    """Intervalos en curso: address -> [habitacion, posicion, entrada hab., entrada pos., última predicción]."""
+    try:
+        with open(os.path.join(carpeta, ABIERTOS), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def inicio_vista(carpeta):
+    """
+    Primera entrada (ms epoch) de la vista, o None si aún no tiene
+    intervalos. Antes de ese instante la vista no sabe nada: la historia
+    anterior hay que sacarla de las predicciones.
+    """
+    entradas = [v for a in leer_abiertos(carpeta).values() for v in a[2:4]]
+    for subcarpeta in ('posiciones', 'habitaciones'):
+        ficheros = ArchivoDiario(os.path.join(carpeta, subcarpeta)).indice()['ficheros']
+        entradas += [info[3] for info in ficheros.values()]
+    return min(entradas, default=None)
+
+
+def leer_cerrados(carpeta, desde, hasta):
+    """Intervalos cerrados de posición y de habitación que se solapan con desde..hasta (ms epoch)."""
+    return (ArchivoDiario(os.path.join(carpeta, 'posiciones')).leer_solapados(desde, hasta),
+            ArchivoDiario(os.path.join(carpeta, 'habitaciones')).leer_solapados(desde, hasta))
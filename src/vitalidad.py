@@ -0,0 +1,116 @@
+"""
+Tabla de vitalidad de receptores ESP32 y pulseras.
+
+Cada mensaje MQTT sólo apunta la última vez que se vio al receptor y a la
+pulsera (O(1), sin programar nada). Cada entrada tiene como mucho un
+temporizador en la RuedaTemporizadores, puesto a `visto + plazo`; cuando
+vence comprueba la última vez vista y, si ha habido mensajes desde entonces,
+se vuelve a poner a partir de ella. Así no se recorre la tabla en cada tick
+y el coste de los temporizadores es de uno por entrada y plazo, no por
+mensaje.
+
+Un receptor que deja de enviar genera 'receptor_caido' y una pulsera que
+ningún receptor ve genera 'pulsera_perdida', a lo sumo `plazo` más una
+resolución de la rueda después del último mensaje. Al volver se avisa con
+'receptor_recuperado' / 'pulsera_recuperada'. Los receptores conocidos se
+dan de alta al crear la tabla, de modo que uno que no llega a arrancar
+también se avisa.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+from temporizadores import RuedaTemporizadores
+from tiempo import ahora_ms
+
+RECEPTOR = 'receptor'
+PULSERA = 'pulsera'
+EVENTOS = {
+    RECEPTOR: ('receptor_caido', 'receptor_recuperado'),
+    PULSERA: ('pulsera_perdida', 'pulsera_recuperada'),
+}
+
+
+class EventoVitalidad(NamedTuple):
+    """`segundos`: tiempo sin mensajes al caer, o lo que duró el corte al recuperarse."""
+    time: int
+    tipo: str
+    nombre: str
+    segundos: float
+
+
+class Latido:
+    """Última vez vista (time.monotonic) de un receptor o una pulsera."""
+
+    __slots__ = ('clase', 'nombre', 'visto', 'caido', 'temporizador')
+
+    def __init__(self, clase, nombre, visto):
+        self.clase = clase
+        self.nombre = nombre
+        self.visto = visto
+        self.caido = False
+        self.temporizador = None
+
+
+class TablaVitalidad:
+    """
+    `al_evento(EventoVitalidad)` se llama fuera del cerrojo, desde el hilo
+    que recibe el mensaje (recuperaciones) o desde el de la rueda (caídas).
+    """
+
+    def __init__(self, receptores, plazo_receptor=30.0, plazo_pulsera=60.0, al_evento=print, rueda=None):
+        self.plazos = {RECEPTOR: plazo_receptor, PULSERA: plazo_pulsera}
+        self.al_evento = al_evento
+        self.rueda = rueda or RuedaTemporizadores()
+        self.receptores = {}
+        self.pulseras = {}
+        self.lock = threading.Lock()
+        ahora = time.monotonic()
+        with self.lock:
+            for receptor in receptores:
+                self.receptores[receptor] = self._alta(RECEPTOR, receptor, ahora)
+
+    def visto(self, receptor, address):
+        """Registra un mensaje de `receptor` que ha visto la pulsera `address`."""
+        ahora = time.monotonic()
+        eventos = []
+        with self.lock:
+            for tabla, clase, nombre in ((self.receptores, RECEPTOR, receptor), (self.pulseras, PULSERA, address)):
+                latido = tabla.get(nombre)
+                if latido is None:
+                    tabla[nombre] = self._alta(clase, nombre, ahora)
+                    continue
+                if latido.caido:
+                    latido.caido = False
+                    eventos.append(EventoVitalidad(ahora_ms(), EVENTOS[clase][1], nombre, ahora - latido.visto))
+                    latido.temporizador = self.rueda.programar(self.plazos[clase], self._vencer, latido)
+                latido.visto = ahora
+        for evento in eventos:
+            self.al_evento(evento)
+
+    def estado(self):
+        """Receptores caídos y pulseras perdidas en este momento."""
+        with self.lock:
+            return {'receptores_caidos': sorted(n for n, l in self.receptores.items() if l.caido),
+                    'pulseras_perdidas': sorted(n for n, l in self.pulseras.items() if l.caido)}
+
+    def _alta(self, clase, nombre, ahora):
+        latido = Latido(clase, nombre, ahora)
+        latido.temporizador = self.rueda.programar(self.plazos[clase], self._vencer, latido)
+        return latido
+
+    def _vencer(self, latido):
+        ahora = time.monotonic()
+        plazo = self.plazos[latido.clase]
+        with self.lock:
+            if latido.caido:
+                return
+            silencio = ahora - latido.visto
+            if silencio < plazo:
+                # Hubo mensajes desde que se programó: se vuelve a poner desde el último
+                latido.temporizador = self.rueda.programar(plazo - silencio, self._vencer, latido)
+                return
+            latido.caido = True
+            latido.temporizador = None
+        self.al_evento(EventoVitalidad(ahora_ms(), EVENTOS[latido.clase][0], latido.nombre, silencio))
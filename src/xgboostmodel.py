@@ -1,84 +1,670 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from xgboost import XGBClassifier
-import joblib
+"""
+Entrenamiento de los modelos XGBoost de habitación y posición.
 
-# Cargar los datos desde el archivo CSV
-file_path = 'src/logs/DatosparaEntrenar.csv'  # Cambia esta ruta a la ubicación de tu archivo
-df = pd.read_csv(file_path)
+Sin argumentos entrena los dos modelos con los parámetros fijos de siempre
+y los guarda en src/logs, junto con la huella de los datos usados
+(xgboost_huella.json) y su versión en árboles planos (arboles_planos.py).
+También entrena un modelo de posición pequeño por habitación, sólo con sus
+filas y sus posiciones, para MotorJerarquico (motor_inferencia.py); el
+índice de esos modelos es xgboost_posicion_por_habitacion.json. Con --incremental sólo se usan las filas añadidas
+al CSV desde esa huella (save2.0.py sólo añade al final):
 
-# Seleccionar las columnas relevantes
-features = [col for col in df.columns if col.startswith("ESP32")]
-df_filtered = df.dropna(subset=features)  # Eliminar filas con valores faltantes en RSSI
+  - Se comprueba con el SHA-256 de los bytes ya vistos que el principio del
+    fichero no ha cambiado; si ha cambiado, si no hay huella o si aparecen
+    etiquetas nuevas, se hace el entrenamiento completo.
+  - Las filas nuevas se dividen 80/20. Se añaden `rondas` árboles a cada
+    booster (xgb_model) con el 80 % y un repaso de filas de entrenamiento
+    antiguas (`repaso` veces las nuevas, al menos una por clase) para que
+    los árboles nuevos no olviden las demás habitaciones. Esos árboles
+    usan la tasa `tasa` y las filas nuevas pesan `peso` veces más que las
+    de repaso, para que la sesión nueva se note en pocas rondas.
+  - Se evalúa el modelo anterior y el nuevo sobre las filas de prueba de la
+    huella más el 20 % nuevo. Sólo si ninguno de los dos objetivos empeora
+    (más de `tolerancia`) se guarda la nueva versión (la anterior se copia a versiones/vN) y
+    avanza la huella; si no, la huella no cambia y las filas se vuelven a
+    usar la próxima vez.
 
-# Codificar las etiquetas de 'Habitacion' y 'Posicion'
-label_encoder_habitacion = LabelEncoder()
-df_filtered['habitacion_encoded'] = label_encoder_habitacion.fit_transform(df_filtered['Habitacion'])
+Los modelos de posición por habitación son pequeños y se rehacen enteros
+con todas las filas de entrenamiento (las nuevas con el mismo `peso`);
+entran en la misma comprobación y en la misma copia versiones/vN.
 
-label_encoder_posicion = LabelEncoder()
-df_filtered['posicion_encoded'] = label_encoder_posicion.fit_transform(df_filtered['Posicion'])
+Cada paso incremental alarga los modelos en `rondas` árboles; un
+entrenamiento completo de vez en cuando los devuelve a su tamaño.
 
-# Preparar características (X) y objetivos (y_habitacion y y_posicion)
-X = df_filtered[features]
-y_habitacion = df_filtered['habitacion_encoded']
-y_posicion = df_filtered['posicion_encoded']
+Con --buscar hace una búsqueda de parámetros con
+validación cruzada estratificada y escribe un informe ordenado por
+precisión, con la latencia de inferencia de cada candidato:
 
-# Dividir en conjunto de entrenamiento y prueba con estratificación
-X_train, X_test, y_habitacion_train, y_habitacion_test, y_posicion_train, y_posicion_test = train_test_split(
-    X, y_habitacion, y_posicion, test_size=0.2, random_state=42, stratify=y_habitacion
-)
+  - Cada (objetivo, pliegue) es una tarea de un ProcessPoolExecutor del
+    tamaño de la máquina, con las tareas de habitación y de posición en el
+    mismo pool, de modo que los dos objetivos se entrenan a la vez.
+  - Cada tarea construye sus DMatrix una sola vez y entrena sobre ellas
+    todas las combinaciones de la rejilla. Para n_estimators sólo se
+    entrena el mayor valor y los demás se evalúan con los primeros árboles
+    (iteration_range), que es el mismo modelo que entrenarlo más corto.
+  - La latencia se mide al final, en el proceso principal y sin
+    entrenamientos en paralelo, con la misma llamada que hace
+    MotorInferencia para una fila (inplace_predict sobre float32).
 
-# Marcar las filas usadas para entrenamiento y prueba en el DataFrame original
-df_filtered['Set'] = 'Sin asignar'
-df_filtered.loc[X_train.index, 'Set'] = 'Train'
-df_filtered.loc[X_test.index, 'Set'] = 'Test'
+Uso (desde la raíz del proyecto):
+    python src/xgboostmodel.py
+    python src/xgboostmodel.py --incremental [--rondas 50] [--repaso 4] [--tasa 0.05] [--peso 3]
+    python src/xgboostmodel.py --buscar [--pliegues 5] [--procesos N] [--rejilla rejilla.json]
+                               [--presupuesto-us 500] [--entrenar-mejor]
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import unicodedata
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier
+import xgboost as xgb
+import joblib
 
-# Guardar el DataFrame con las marcas de Train/Test
-df_filtered.to_csv('src/logs/dataset_conjuntos.csv', index=False)
+from arboles_planos import exportar
 
-# Entrenar el modelo para 'Habitacion' con XGBoost
-model_habitacion = XGBClassifier(
+# Cargar los datos desde el archivo CSV
+file_path = 'src/logs/DatosparaEntrenar.csv'  # Cambia esta ruta a la ubicación de tu archivo
+LOGS = 'src/logs'  # carpeta de los modelos, LabelEncoders y huella
+HUELLA = 'xgboost_huella.json'
+INFORME_BUSQUEDA = 'src/logs/busqueda_xgboost.csv'
+
+# Parámetros del entrenamiento normal
+PARAMETROS_HABITACION = dict(
     n_estimators=300,        # Número de árboles en el modelo
     max_depth=4,             # Profundidad máxima de los árboles
     learning_rate=0.025,     # Tasa de aprendizaje
     subsample=0.8,           # Submuestreo para mejorar la generalización
     colsample_bytree=0.8,    # Submuestreo de características
-    random_state=95,
-    eval_metric='mlogloss'   # Evitar warning
 )
-model_habitacion.fit(X_train, y_habitacion_train)
+PARAMETROS_POSICION = dict(
+    n_estimators=600,
+    max_depth=6,
+    learning_rate=0.025,
+    subsample=0.8,
+    colsample_bytree=0.8,
+)
+# Modelos de posición por habitación: dos o tres clases cada uno
+PARAMETROS_POSICION_HABITACION = dict(
+    n_estimators=300,
+    max_depth=4,
+    learning_rate=0.025,
+    subsample=0.8,
+    colsample_bytree=0.8,
+)
+INDICE_POSICIONES = 'xgboost_posicion_por_habitacion.json'
+POR_HABITACION = 'PosicionPorHabitacion'  # su clave en la precisión de la huella
 
-# Evaluar el modelo para 'Habitacion'
-accuracy_habitacion = model_habitacion.score(X_test, y_habitacion_test)
-print(f"Precisión del modelo 'Habitacion' en el conjunto de prueba: {accuracy_habitacion * 100:.2f}%")
+# Rejilla por defecto de --buscar (la misma para los dos objetivos)
+REJILLA = {
+    'n_estimators': [100, 200, 300, 600],
+    'max_depth': [3, 4, 6, 8],
+    'learning_rate': [0.025, 0.05, 0.1],
+    'subsample': [0.8],
+    'colsample_bytree': [0.8],
+}
+SEMILLA = 95
+# Caída de precisión (en tanto por uno) que --incremental aún no considera empeorar:
+# con unos miles de filas de prueba, un par de filas arriba o abajo es ruido
+TOLERANCIA = 0.002
+# Árboles de --incremental: con la tasa del entrenamiento completo (0.025) 50 árboles
+# apenas mueven el modelo; con más tasa hace falta más repaso para no perder
+# precisión en las filas antiguas (ver rendimiento/bench_incremental.py)
+TASA_INCREMENTAL = 0.05
+PESO_NUEVAS = 3.0
+REPASO = 4.0
+REPETICIONES_LATENCIA = 1000
 
-# Repetir la división para 'Posicion' con estratificación específica
-X_train, X_test, y_habitacion_train, y_habitacion_test, y_posicion_train, y_posicion_test = train_test_split(
-    X, y_habitacion, y_posicion, test_size=0.2, random_state=42, stratify=y_posicion
-)
 
-# Entrenar el modelo para 'Posicion' con XGBoost
-model_posicion = XGBClassifier(
-    n_estimators=600,        # Número de árboles en el modelo
-    max_depth=6,             # Profundidad máxima de los árboles
-    learning_rate=0.025,     # Tasa de aprendizaje
-    subsample=0.8,           # Submuestreo para mejorar la generalización
-    colsample_bytree=0.8,    # Submuestreo de características
-    random_state=95,
-    eval_metric='mlogloss'   # Evitar warning
-)
-model_posicion.fit(X_train, y_posicion_train)
+def leer_csv(ruta):
+    """
+    CSV hasta su último salto de línea (una fila a medio escribir se deja
+    para la próxima vez). Devuelve (df, origen) con lo que se guarda en la
+    huella: bytes leídos, su SHA-256 y número de filas.
+    """
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+    fin = contenido.rfind(b'\n') + 1
+    df = pd.read_csv(io.BytesIO(contenido[:fin]))
+    origen = dict(datos=ruta, bytes=fin, sha256=hashlib.sha256(contenido[:fin]).hexdigest(), filas=len(df))
+    return df, origen
+
+
+def _filtrar(df):
+    features = [col for col in df.columns if col.startswith("ESP32")]
+    return df.dropna(subset=features).copy(), features  # Eliminar filas con valores faltantes en RSSI
+
+
+def cargar_datos(ruta=file_path):
+    """
+    Filas con todos los RSSI, las columnas de receptores, las etiquetas
+    codificadas y el origen de los datos (ver leer_csv).
+    """
+    df, origen = leer_csv(ruta)
+
+    # Seleccionar las columnas relevantes
+    df_filtered, features = _filtrar(df)
+
+    # Codificar las etiquetas de 'Habitacion' y 'Posicion'
+    label_encoder_habitacion = LabelEncoder()
+    df_filtered['habitacion_encoded'] = label_encoder_habitacion.fit_transform(df_filtered['Habitacion'])
+
+    label_encoder_posicion = LabelEncoder()
+    df_filtered['posicion_encoded'] = label_encoder_posicion.fit_transform(df_filtered['Posicion'])
+    return df_filtered, features, label_encoder_habitacion, label_encoder_posicion, origen
+
+
+def _ruta_modelo(carpeta, objetivo):
+    return os.path.join(carpeta, f'xgboost_{objetivo.lower()}_model.pkl')
+
+
+def leer_huella(carpeta=LOGS):
+    ruta = os.path.join(carpeta, HUELLA)
+    if not os.path.isfile(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_huella(huella, carpeta=LOGS):
+    ruta = os.path.join(carpeta, HUELLA)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(huella, f)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def entrenar(df_filtered, features, label_encoder_habitacion, label_encoder_posicion, origen,
+             parametros_habitacion=PARAMETROS_HABITACION, parametros_posicion=PARAMETROS_POSICION, carpeta=LOGS):
+    """
+    Entrenamiento normal: una división 80/20 por objetivo. Guarda modelos,
+    LabelEncoders y la huella con las filas de prueba de cada objetivo.
+    """
+    # Preparar características (X) y objetivos (y_habitacion y y_posicion)
+    X = df_filtered[features]
+    y_habitacion = df_filtered['habitacion_encoded']
+    y_posicion = df_filtered['posicion_encoded']
+
+    # Dividir en conjunto de entrenamiento y prueba con estratificación
+    X_train, X_test, y_habitacion_train, y_habitacion_test, y_posicion_train, y_posicion_test = train_test_split(
+        X, y_habitacion, y_posicion, test_size=0.2, random_state=42, stratify=y_habitacion
+    )
+
+    # Marcar las filas usadas para entrenamiento y prueba en el DataFrame original
+    df_filtered['Set'] = 'Sin asignar'
+    df_filtered.loc[X_train.index, 'Set'] = 'Train'
+    entrenamiento_habitacion = X_train.index
+    df_filtered.loc[X_test.index, 'Set'] = 'Test'
+
+    # Guardar el DataFrame con las marcas de Train/Test
+    df_filtered.to_csv(os.path.join(carpeta, 'dataset_conjuntos.csv'), index=False)
+    prueba_habitacion = X_test.index
+
+    # Entrenar el modelo para 'Habitacion' con XGBoost
+    model_habitacion = XGBClassifier(
+        **parametros_habitacion,
+        random_state=SEMILLA,
+        eval_metric='mlogloss'   # Evitar warning
+    )
+    model_habitacion.fit(X_train, y_habitacion_train)
+
+    # Evaluar el modelo para 'Habitacion'
+    accuracy_habitacion = model_habitacion.score(X_test, y_habitacion_test)
+    print(f"Precisión del modelo 'Habitacion' en el conjunto de prueba: {accuracy_habitacion * 100:.2f}%")
+
+    # Repetir la división para 'Posicion' con estratificación específica
+    X_train, X_test, y_habitacion_train, y_habitacion_test, y_posicion_train, y_posicion_test = train_test_split(
+        X, y_habitacion, y_posicion, test_size=0.2, random_state=42, stratify=y_posicion
+    )
+
+    # Entrenar el modelo para 'Posicion' con XGBoost
+    model_posicion = XGBClassifier(
+        **parametros_posicion,
+        random_state=SEMILLA,
+        eval_metric='mlogloss'   # Evitar warning
+    )
+    model_posicion.fit(X_train, y_posicion_train)
+
+    # Evaluar el modelo para 'Posicion'
+    accuracy_posicion = model_posicion.score(X_test, y_posicion_test)
+    print(f"Precisión del modelo 'Posicion' en el conjunto de prueba: {accuracy_posicion * 100:.2f}%")
+
+    # Guardar los modelos y los LabelEncoders
+    joblib.dump(model_habitacion, _ruta_modelo(carpeta, 'Habitacion'))
+    joblib.dump(label_encoder_habitacion, os.path.join(carpeta, 'xgboost_label_encoder_habitacion.pkl'))
+
+    joblib.dump(model_posicion, _ruta_modelo(carpeta, 'Posicion'))
+    joblib.dump(label_encoder_posicion, os.path.join(carpeta, 'xgboost_label_encoder_posicion.pkl'))
+
+    accuracy_por_habitacion = entrenar_por_habitacion(df_filtered, features, entrenamiento_habitacion,
+                                                      prueba_habitacion, carpeta=carpeta)
+
+    anterior = leer_huella(carpeta)
+    guardar_huella(dict(origen, version=(anterior['version'] + 1) if anterior else 1, columnas=features,
+                        precision={'Habitacion': accuracy_habitacion, 'Posicion': accuracy_posicion,
+                                   POR_HABITACION: accuracy_por_habitacion},
+                        prueba={'Habitacion': prueba_habitacion.tolist(), 'Posicion': X_test.index.tolist()}),
+                   carpeta)
+
+    print("Modelos entrenados y guardados correctamente.")
+    exportar(carpeta)  # árboles planos para prediccion.py
+
+
+def _nombre_fichero(habitacion):
+    """'Baño' -> 'bano', para los nombres de fichero de los modelos por habitación."""
+    texto = unicodedata.normalize('NFKD', habitacion).encode('ascii', 'ignore').decode()
+    return texto.lower().replace(' ', '_')
+
+
+def entrenar_por_habitacion(df_filtered, features, filas_entrenamiento, filas_prueba,
+                            parametros=PARAMETROS_POSICION_HABITACION, carpeta=LOGS):
+    """
+    Un modelo de posición por habitación con las filas de entrenamiento de
+    esa habitación. Guarda modelos, LabelEncoders y el índice
+    INDICE_POSICIONES, y devuelve la precisión sobre las filas de prueba
+    dando la habitación real.
+    """
+    modelos = _modelos_por_habitacion(df_filtered, features, filas_entrenamiento, parametros=parametros)
+    _guardar_por_habitacion(modelos, carpeta)
+    precision = _precision_por_habitacion(modelos, df_filtered.loc[filas_prueba], features)
+    print(f"Precisión de los modelos de posición por habitación (con la habitación real): {precision * 100:.2f}%")
+    return precision
+
+
+def _modelos_por_habitacion(df_filtered, features, filas_entrenamiento, pesos=None,
+                            parametros=PARAMETROS_POSICION_HABITACION):
+    """
+    {habitación: (modelo, LabelEncoder)}, o su única posición si sólo tiene
+    una (no necesita modelo). `pesos` (Series por fila) pondera las filas.
+    """
+    modelos = {}
+    for habitacion, grupo in df_filtered.loc[filas_entrenamiento].groupby('Habitacion'):
+        posiciones = sorted(grupo['Posicion'].unique())
+        if len(posiciones) == 1:
+            modelos[habitacion] = posiciones[0]
+            continue
+        label_encoder = LabelEncoder().fit(grupo['Posicion'])
+        modelo = XGBClassifier(
+            **parametros,
+            random_state=SEMILLA,
+            eval_metric='mlogloss' if len(posiciones) > 2 else 'logloss'
+        )
+        modelo.fit(grupo[features], label_encoder.transform(grupo['Posicion']),
+                   sample_weight=None if pesos is None else pesos[grupo.index].to_numpy())
+        modelos[habitacion] = (modelo, label_encoder)
+    return modelos
+
+
+def _precision_por_habitacion(modelos, prueba, features):
+    """Precisión de los modelos por habitación sobre `prueba`, dando la habitación real."""
+    aciertos = 0
+    for habitacion, de_la_habitacion in prueba.groupby('Habitacion'):
+        modelo = modelos.get(habitacion)
+        if isinstance(modelo, str):
+            aciertos += int((de_la_habitacion['Posicion'] == modelo).sum())
+        elif modelo is not None:
+            modelo, label_encoder = modelo
+            conocidas = de_la_habitacion['Posicion'].isin(label_encoder.classes_)
+            if conocidas.any():
+                y = label_encoder.transform(de_la_habitacion.loc[conocidas, 'Posicion'])
+                aciertos += int((modelo.predict(de_la_habitacion.loc[conocidas, features]) == y).sum())
+    return aciertos / max(1, len(prueba))
+
+
+def _guardar_por_habitacion(modelos, carpeta):
+    """Guarda modelos y LabelEncoders y escribe el índice; devuelve las rutas de los modelos."""
+    indice, rutas = {}, []
+    for habitacion, modelo in modelos.items():
+        if isinstance(modelo, str):
+            indice[habitacion] = {'constante': modelo}
+            continue
+        nombre = _nombre_fichero(habitacion)
+        indice[habitacion] = {'modelo': f'xgboost_posicion_{nombre}_model.pkl',
+                              'encoder': f'xgboost_label_encoder_posicion_{nombre}.pkl'}
+        rutas.append(os.path.join(carpeta, indice[habitacion]['modelo']))
+        joblib.dump(modelo[0], rutas[-1])
+        joblib.dump(modelo[1], os.path.join(carpeta, indice[habitacion]['encoder']))
+    with open(os.path.join(carpeta, INDICE_POSICIONES), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+    return rutas
+
+
+def leer_indice_posiciones(carpeta=LOGS):
+    """Índice de los modelos por habitación, o None si no se han entrenado."""
+    ruta = os.path.join(carpeta, INDICE_POSICIONES)
+    if not os.path.isfile(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cargar_por_habitacion(carpeta=LOGS):
+    """Los modelos por habitación guardados, como los da _modelos_por_habitacion, o None."""
+    indice = leer_indice_posiciones(carpeta)
+    if indice is None:
+        return None
+    return {habitacion: entrada['constante'] if 'constante' in entrada else
+            (joblib.load(os.path.join(carpeta, entrada['modelo'])), joblib.load(os.path.join(carpeta, entrada['encoder'])))
+            for habitacion, entrada in indice.items()}
+
+
+def _dividir(indices, y):
+    """80/20 de las filas nuevas, estratificado si hay bastantes de cada clase."""
+    try:
+        return train_test_split(indices, test_size=0.2, random_state=42, stratify=y)
+    except ValueError:
+        return train_test_split(indices, test_size=0.2, random_state=42)
+
+
+def _repaso(df_viejas, columna, n, rng):
+    """`n` filas antiguas al azar más la primera de cada clase, para no olvidar ninguna."""
+    una_por_clase = df_viejas.groupby(columna, sort=False).head(1).index
+    azar = rng.choice(df_viejas.index, size=min(n, len(df_viejas)), replace=False)
+    return una_por_clase.union(azar)
+
+
+def entrenar_incremental(ruta=file_path, rondas=50, repaso=REPASO, tolerancia=TOLERANCIA, tasa=TASA_INCREMENTAL,
+                         peso=PESO_NUEVAS, carpeta=LOGS):
+    """
+    Continúa los modelos guardados con las filas añadidas desde la huella.
+    Devuelve True si se ha guardado una versión nueva.
+    """
+    huella = leer_huella(carpeta)
+    with open(ruta, 'rb') as f:
+        prefijo = f.read(huella['bytes']) if huella else b''
+    if huella is None or len(prefijo) < huella['bytes'] or hashlib.sha256(prefijo).hexdigest() != huella['sha256']:
+        print("No hay huella o el principio del CSV ha cambiado: entrenamiento completo")
+        entrenar(*cargar_datos(ruta), carpeta=carpeta)
+        return True
+
+    df, origen = leer_csv(ruta)
+    if origen['filas'] == huella['filas']:
+        print("No hay filas nuevas desde la última huella")
+        return False
+    df_filtered, features = _filtrar(df)
+    nuevas = df_filtered.index[df_filtered.index >= huella['filas']]
+    codificadores = {'Habitacion': joblib.load(os.path.join(carpeta, 'xgboost_label_encoder_habitacion.pkl')),
+                     'Posicion': joblib.load(os.path.join(carpeta, 'xgboost_label_encoder_posicion.pkl'))}
+    for objetivo, codificador in codificadores.items():
+        desconocidas = set(df_filtered[objetivo]) - set(codificador.classes_)
+        if desconocidas:
+            print(f"Etiquetas nuevas de '{objetivo}' ({', '.join(map(str, desconocidas))}): entrenamiento completo")
+            entrenar(*cargar_datos(ruta), carpeta=carpeta)
+            return True
+    if features != huella['columnas']:
+        print("Han cambiado las columnas de receptores: entrenamiento completo")
+        entrenar(*cargar_datos(ruta), carpeta=carpeta)
+        return True
+    if len(nuevas) == 0:
+        print("Las filas nuevas no tienen todos los RSSI; no hay nada que entrenar")
+        return False
+
+    rng = np.random.default_rng(len(nuevas))
+    modelos, precision, prueba, divisiones = {}, {}, {}, {}
+    for objetivo, codificador in codificadores.items():
+        y = pd.Series(codificador.transform(df_filtered[objetivo]), index=df_filtered.index)
+        nuevas_train, nuevas_test = _dividir(nuevas, y[nuevas])
+        prueba[objetivo] = huella['prueba'][objetivo] + [int(i) for i in nuevas_test]
+        evaluacion = df_filtered.index.intersection(prueba[objetivo])
+        viejas = df_filtered.index[df_filtered.index < huella['filas']].difference(evaluacion)
+        divisiones[objetivo] = (nuevas_train, evaluacion, viejas)
+        filas = nuevas_train.union(_repaso(y[viejas].to_frame('y'), 'y', int(len(nuevas_train) * repaso), rng))
+
+        anterior = joblib.load(_ruta_modelo(carpeta, objetivo))
+        X_eval, y_eval = df_filtered.loc[evaluacion, features], y[evaluacion]
+        t0 = time.perf_counter()
+        modelo = _continuar(anterior, df_filtered.loc[filas, features], y[filas],
+                            np.where(filas.isin(nuevas_train), peso, 1.0), rondas, tasa)
+        t = time.perf_counter() - t0
+        # Una predicción por modelo; la precisión en las filas nuevas sale de la misma
+        aciertos_antes = anterior.predict(X_eval) == y_eval.to_numpy()
+        aciertos_despues = modelo.predict(X_eval) == y_eval.to_numpy()
+        en_nuevas = evaluacion.isin(nuevas_test)
+        antes, despues = aciertos_antes.mean(), aciertos_despues.mean()
+        print(f"'{objetivo}': {len(nuevas_train)} filas nuevas + {len(filas) - len(nuevas_train)} de repaso, "
+              f"{rondas} árboles más en {t:.2f} s; precisión {antes * 100:.2f}% -> {despues * 100:.2f}% "
+              f"({len(evaluacion)} filas de prueba; en las nuevas {aciertos_antes[en_nuevas].mean() * 100:.2f}% "
+              f"-> {aciertos_despues[en_nuevas].mean() * 100:.2f}%)")
+        modelos[objetivo] = modelo
+        precision[objetivo] = (float(antes), float(despues))
+
+    # Los modelos por habitación son pequeños: se rehacen con todas las filas de
+    # entrenamiento (las nuevas con el mismo peso) y la división del de habitación
+    anteriores = cargar_por_habitacion(carpeta)
+    if anteriores is not None:
+        nuevas_train, evaluacion, viejas = divisiones['Habitacion']
+        entrenamiento = viejas.union(nuevas_train)
+        t0 = time.perf_counter()
+        por_habitacion = _modelos_por_habitacion(
+            df_filtered, features, entrenamiento,
+            pd.Series(np.where(entrenamiento.isin(nuevas_train), peso, 1.0), index=entrenamiento))
+        t = time.perf_counter() - t0
+        prueba_habitacion = df_filtered.loc[evaluacion]
+        antes = _precision_por_habitacion(anteriores, prueba_habitacion, features)
+        despues = _precision_por_habitacion(por_habitacion, prueba_habitacion, features)
+        print(f"'Posicion' por habitación: {len(por_habitacion)} modelos rehechos con {len(entrenamiento)} filas "
+              f"en {t:.2f} s; precisión con la habitación real {antes * 100:.2f}% -> {despues * 100:.2f}% "
+              f"({len(evaluacion)} filas de prueba)")
+        precision[POR_HABITACION] = (float(antes), float(despues))
+
+    if any(despues < antes - tolerancia for antes, despues in precision.values()):
+        print("La precisión empeora: se mantienen los modelos y la huella actuales")
+        return False
+
+    # La versión actual se conserva antes de sustituirla
+    version = huella['version']
+    copia = os.path.join(carpeta, 'versiones', f'v{version}')
+    os.makedirs(copia, exist_ok=True)
+    cambiados = []
+    for objetivo, modelo in modelos.items():
+        cambiados.append(_ruta_modelo(carpeta, objetivo))
+        shutil.copy2(cambiados[-1], copia)
+        joblib.dump(modelo, cambiados[-1])
+    if anteriores is not None:
+        for entrada in leer_indice_posiciones(carpeta).values():
+            if 'modelo' in entrada:
+                shutil.copy2(os.path.join(carpeta, entrada['modelo']), copia)
+                shutil.copy2(os.path.join(carpeta, entrada['encoder']), copia)
+        shutil.copy2(os.path.join(carpeta, INDICE_POSICIONES), copia)
+        cambiados += _guardar_por_habitacion(por_habitacion, carpeta)
+    shutil.copy2(os.path.join(carpeta, HUELLA), copia)
+    guardar_huella(dict(huella, **origen, version=version + 1, prueba=prueba,
+                        precision={o: p[1] for o, p in precision.items()}), carpeta)
+    print(f"Guardada la versión {version + 1} de los modelos (la anterior queda en {copia})")
+    exportar(carpeta, cambiados)  # sólo los que han cambiado
+    return True
+
+
+def _continuar(anterior, X, y, pesos, rondas, tasa):
+    """`rondas` árboles más sobre el booster de `anterior`, con la tasa `tasa`."""
+    modelo = XGBClassifier(**dict(anterior.get_params(), n_estimators=rondas, learning_rate=tasa))
+    modelo.fit(X, y, sample_weight=pesos, xgb_model=anterior.get_booster())
+    return modelo
+
+
+def _parametros_xgb(combinacion, n_clases, nthread):
+    """Parámetros de xgb.train equivalentes a los de XGBClassifier."""
+    parametros = dict(combinacion, seed=SEMILLA, nthread=nthread, tree_method='hist')
+    parametros['eta'] = parametros.pop('learning_rate')
+    if n_clases > 2:
+        parametros.update(objective='multi:softprob', num_class=n_clases, eval_metric='mlogloss')
+    else:
+        parametros.update(objective='binary:logistic', eval_metric='logloss')
+    return parametros
+
+
+def _combinaciones(rejilla):
+    """Combinaciones de la rejilla sin n_estimators (se evalúa por prefijos)."""
+    claves = [k for k in rejilla if k != 'n_estimators']
+    return [dict(zip(claves, valores)) for valores in itertools.product(*(rejilla[k] for k in claves))]
+
+
+def _evaluar_pliegue(objetivo, pliegue, X_train, y_train, X_test, y_test, n_clases, rejilla, nthread, features):
+    """
+    Entrena todas las combinaciones de la rejilla sobre un pliegue.
+
+    Devuelve las filas de resultados y, para el pliegue 0, los boosters
+    (save_raw) para medir luego la latencia.
+    """
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, feature_names=features, nthread=nthread)
+    dtest = xgb.DMatrix(X_test, feature_names=features, nthread=nthread)
+    n_estimators = sorted(rejilla['n_estimators'])
+    filas, boosters = [], {}
+    for combinacion in _combinaciones(rejilla):
+        t0 = time.perf_counter()
+        booster = xgb.train(_parametros_xgb(combinacion, n_clases, nthread), dtrain, num_boost_round=n_estimators[-1])
+        t_entrenar = time.perf_counter() - t0
+        for n in n_estimators:
+            proba = booster.predict(dtest, iteration_range=(0, n))
+            prediccion = proba.argmax(axis=1) if proba.ndim == 2 else (proba > 0.5).astype(int)
+            filas.append(dict(objetivo=objetivo, pliegue=pliegue, n_estimators=n, **combinacion,
+                              precision=float((prediccion == y_test).mean()),
+                              entrenamiento_s=t_entrenar * n / n_estimators[-1]))
+        if pliegue == 0:
+            boosters[tuple(combinacion.items())] = booster.save_raw()
+    return objetivo, filas, boosters
+
+
+def _latencias(booster_raw, n_estimators, X, repeticiones=REPETICIONES_LATENCIA):
+    """Mediana y p99 en µs de una predicción de una fila, para cada número de árboles."""
+    booster = xgb.Booster(model_file=bytearray(booster_raw))
+    vector = np.empty((1, X.shape[1]), dtype=np.float32)
+    indices = np.random.default_rng(0).integers(len(X), size=repeticiones)
+    resultado = {}
+    for n in n_estimators:
+        for i in indices[:50]:  # calentamiento
+            vector[0] = X[i]
+            booster.inplace_predict(vector, iteration_range=(0, n), validate_features=False)
+        tiempos = np.empty(repeticiones)
+        for k, i in enumerate(indices):
+            vector[0] = X[i]
+            t0 = time.perf_counter()
+            booster.inplace_predict(vector, iteration_range=(0, n), validate_features=False)
+            tiempos[k] = time.perf_counter() - t0
+        resultado[n] = (float(np.median(tiempos)) * 1e6, float(np.percentile(tiempos, 99)) * 1e6)
+    return resultado
+
+
+def buscar(df_filtered, features, rejilla=REJILLA, pliegues=5, procesos=None, informe=INFORME_BUSQUEDA,
+           presupuesto_us=None):
+    """
+    Búsqueda con validación cruzada estratificada de los dos objetivos a la
+    vez. Escribe el informe ordenado y devuelve (informe, mejores), con
+    mejores[objetivo] = parámetros del primero que cabe en el presupuesto.
+    """
+    X = df_filtered[features].to_numpy(dtype=np.float32)
+    objetivos = {'Habitacion': df_filtered['habitacion_encoded'].to_numpy(),
+                 'Posicion': df_filtered['posicion_encoded'].to_numpy()}
+
+    tareas = []
+    for objetivo, y in objetivos.items():
+        divisor = StratifiedKFold(n_splits=pliegues, shuffle=True, random_state=42)
+        for pliegue, (entrenamiento, prueba) in enumerate(divisor.split(X, y)):
+            tareas.append((objetivo, pliegue, X[entrenamiento], y[entrenamiento], X[prueba], y[prueba],
+                           int(y.max()) + 1))
+    procesos = procesos or min(len(tareas), os.cpu_count() or 1)
+    nthread = max(1, (os.cpu_count() or 1) // procesos)
+    print(f"Búsqueda: {len(_combinaciones(rejilla)) * len(rejilla['n_estimators'])} candidatos por objetivo, "
+          f"{pliegues} pliegues, {len(tareas)} tareas en {procesos} procesos de {nthread} hilo(s)")
+
+    t0 = time.perf_counter()
+    filas, boosters = [], {}
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(_evaluar_pliegue, *tarea, rejilla, nthread, features) for tarea in tareas]
+        for futuro in futuros:
+            objetivo, filas_tarea, boosters_tarea = futuro.result()
+            filas.extend(filas_tarea)
+            for combinacion, raw in boosters_tarea.items():
+                boosters[objetivo, combinacion] = raw
+    print(f"Validación cruzada terminada en {time.perf_counter() - t0:.1f} s")
+
+    resultados = pd.DataFrame(filas)
+    parametros = [k for k in rejilla]
+    informe_df = (resultados.groupby(['objetivo'] + parametros, sort=False)
+                  .agg(precision_media=('precision', 'mean'), precision_std=('precision', 'std'),
+                       entrenamiento_s=('entrenamiento_s', 'mean'))
+                  .reset_index())
+
+    n_estimators = sorted(rejilla['n_estimators'])
+    latencias = {}
+    for (objetivo, combinacion), raw in boosters.items():
+        for n, valores in _latencias(raw, n_estimators, X).items():
+            latencias[(objetivo, n) + tuple(v for _, v in combinacion)] = valores
+    claves = informe_df[['objetivo', 'n_estimators'] + [k for k in parametros if k != 'n_estimators']]
+    valores = [latencias[tuple(fila)] for fila in claves.itertuples(index=False)]
+    informe_df['latencia_us'] = [v[0] for v in valores]
+    informe_df['latencia_p99_us'] = [v[1] for v in valores]
+    if presupuesto_us is not None:
+        informe_df['en_presupuesto'] = informe_df['latencia_p99_us'] <= presupuesto_us
+
+    informe_df = informe_df.sort_values(['objetivo', 'precision_media', 'latencia_us'],
+                                        ascending=[True, False, True], kind='stable')
+    informe_df.insert(1, 'rango', informe_df.groupby('objetivo').cumcount() + 1)
+    informe_df.to_csv(informe, index=False, float_format='%.6g')
+    print(f"Informe guardado en {informe}")
+
+    mejores = {}
+    for objetivo, grupo in informe_df.groupby('objetivo', sort=False):
+        print(f"\n{objetivo}:")
+        print(grupo.head(5).to_string(index=False))
+        candidatos = grupo[grupo['en_presupuesto']] if presupuesto_us is not None else grupo
+        if candidatos.empty:
+            print(f"Ningún candidato de '{objetivo}' cabe en {presupuesto_us} µs (p99)")
+            continue
+        mejor = candidatos.iloc[0]
+        mejores[objetivo] = candidatos[parametros].iloc[:1].to_dict('records')[0]
+        print(f"Mejor de '{objetivo}': {mejores[objetivo]} ({mejor['precision_media'] * 100:.2f}%, "
+              f"{mejor['latencia_us']:.0f} µs)")
+    return informe_df, mejores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datos', default=file_path)
+    parser.add_argument('--incremental', action='store_true', help='continúa los modelos con las filas nuevas')
+    parser.add_argument('--rondas', type=int, default=50, help='árboles que se añaden en --incremental')
+    parser.add_argument('--repaso', type=float, default=REPASO, help='filas antiguas por cada fila nueva en --incremental')
+    parser.add_argument('--tasa', type=float, default=TASA_INCREMENTAL, help='learning_rate de los árboles de --incremental')
+    parser.add_argument('--peso', type=float, default=PESO_NUEVAS, help='peso de las filas nuevas frente a las de repaso')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help='caída de precisión admitida en --incremental')
+    parser.add_argument('--buscar', action='store_true', help='búsqueda con validación cruzada en vez de entrenar')
+    parser.add_argument('--pliegues', type=int, default=5)
+    parser.add_argument('--procesos', type=int, default=None, help='por defecto, tantos como CPUs')
+    parser.add_argument('--rejilla', default=None, help='JSON {parámetro: [valores]}; por defecto REJILLA')
+    parser.add_argument('--informe', default=INFORME_BUSQUEDA)
+    parser.add_argument('--presupuesto-us', type=float, default=None, help='latencia p99 máxima por modelo y fila')
+    parser.add_argument('--entrenar-mejor', action='store_true',
+                        help='tras la búsqueda, entrena y guarda los mejores dentro del presupuesto')
+    args = parser.parse_args()
 
-# Evaluar el modelo para 'Posicion'
-accuracy_posicion = model_posicion.score(X_test, y_posicion_test)
-print(f"Precisión del modelo 'Posicion' en el conjunto de prueba: {accuracy_posicion * 100:.2f}%")
+    if args.incremental:
+        entrenar_incremental(args.datos, args.rondas, args.repaso, args.tolerancia, args.tasa, args.peso)
+        return
+    df_filtered, features, label_encoder_habitacion, label_encoder_posicion, origen = cargar_datos(args.datos)
+    if not args.buscar:
+        entrenar(df_filtered, features, label_encoder_habitacion, label_encoder_posicion, origen)
+        return
 
-# Guardar los modelos y los LabelEncoders
-joblib.dump(model_habitacion, 'src/logs/xgboost_habitacion_model.pkl')
-joblib.dump(label_encoder_habitacion, 'src/logs/xgboost_label_encoder_habitacion.pkl')
+    rejilla = REJILLA
+    if args.rejilla:
+        with open(args.rejilla, encoding='utf-8') as f:
+            rejilla = json.load(f)
+    _, mejores = buscar(df_filtered, features, rejilla, args.pliegues, args.procesos, args.informe,
+                        args.presupuesto_us)
+    if args.entrenar_mejor and len(mejores) == 2:
+        entrenar(df_filtered, features, label_encoder_habitacion, label_encoder_posicion, origen,
+                 mejores['Habitacion'], mejores['Posicion'])
 
-joblib.dump(model_posicion, 'src/logs/xgboost_posicion_model.pkl')
-joblib.dump(label_encoder_posicion, 'src/logs/xgboost_label_encoder_posicion.pkl')
 
-print("Modelos entrenados y guardados correctamente.")
+if __name__ == '__main__':
+    main()